@@ -0,0 +1,471 @@
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterator, Optional
+from urllib.parse import quote
+
+import asyncpg
+import boto3
+from moto.server import ThreadedMotoServer
+from pyspark import Row
+from yoyo import get_backend, read_migrations
+
+from common.pgsql import PgsqlSettings, PSQLDatabase
+from common.settings import WorkerSettings
+from domain.file_data.file_processor import FileProcessor
+from domain.file_data.handler.pe_file import PeFileHandler
+from domain.file_data.model.extraction_cache import ExtractionCacheEntry
+from domain.file_data.model.file_sync_info import NotExtractedFile
+from domain.file_data.service.file_storage_service import StorageServiceInterface
+from presistence.repository.file import PgSqlFileRepository
+from presistence.service.aio_s3 import AioS3FileService
+from presistence.service.s3 import S3FileService
+
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+FIXTURES_DIR = ROOT_DIR / "tests" / "fixtures"
+MIGRATIONS_DIR = ROOT_DIR / "migrations"
+BUCKET_NAME = "benchmark-files"
+STAGES = ["pe_parse", "s3_download", "file_processor", "upsert_many", "extract"]
+
+
+class TimedFileProcessor(FileProcessor):
+    __slots__ = ("latencies",)
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.latencies: list[float] = []
+
+    async def _download_and_extract_file_data(
+        self, file_row: Row
+    ) -> tuple[Row, ExtractionCacheEntry]:
+        start_time = time.perf_counter()
+        try:
+            return await super()._download_and_extract_file_data(file_row)
+        finally:
+            self.latencies.append(time.perf_counter() - start_time)
+
+
+def iter_corpus(num_files: int) -> Iterator[tuple[NotExtractedFile, bytes]]:
+    fixtures = sorted(FIXTURES_DIR.iterdir())
+    contents = [fixture.read_bytes() for fixture in fixtures]
+    for i in range(num_files):
+        body = contents[i % len(contents)] + i.to_bytes(8, "big")
+        malicious = bool(i % 2)
+        file = NotExtractedFile(
+            name=f"{int(malicious)}/{i:08}{fixtures[i % len(fixtures)].suffix}",
+            hash=hashlib.md5(body).hexdigest(),
+            size=len(body),
+            malicious=malicious,
+        )
+        yield file, body
+
+
+def make_files(num_files: int) -> list[NotExtractedFile]:
+    return [file for file, _ in iter_corpus(num_files)]
+
+
+def start_storage(num_files: int) -> ThreadedMotoServer:
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+
+    client = boto3.client(
+        "s3",
+        endpoint_url=f"http://{host}:{port}",
+        region_name="us-east-1",
+        aws_access_key_id="benchmark",
+        aws_secret_access_key="benchmark",
+    )
+    client.create_bucket(Bucket=BUCKET_NAME)
+    for file, body in iter_corpus(num_files):
+        client.put_object(
+            Bucket=BUCKET_NAME, Key=file.name, Body=body, ACL="public-read"
+        )
+    return server
+
+
+def get_maintenance_settings() -> PgsqlSettings:
+    return PgsqlSettings(
+        host=os.environ["PGSQL_SERVER"],
+        port=int(os.environ["PGSQL_PORT"]),
+        database=os.environ["PGSQL_DATABASE"],
+        user=os.environ["PGSQL_USER"],
+        password=os.environ["PGSQL_PASSWORD"],
+    )
+
+
+def get_database_url(settings: PgsqlSettings, database: str) -> str:
+    credentials = f"{quote(settings.user)}:{quote(settings.password)}"
+    if settings.host.startswith("/"):
+        return (
+            f"postgresql://{credentials}@/{database}"
+            f"?host={settings.host}&port={settings.port}"
+        )
+    return f"postgresql://{credentials}@{settings.host}:{settings.port}/{database}"
+
+
+async def execute_maintenance(settings: PgsqlSettings, *queries: str) -> None:
+    connection = await asyncpg.connect(
+        host=settings.host,
+        port=settings.port,
+        database=settings.database,
+        user=settings.user,
+        password=settings.password,
+    )
+    try:
+        for query in queries:
+            await connection.execute(query)
+    finally:
+        await connection.close()
+
+
+def recreate_database(settings: PgsqlSettings, database: str) -> None:
+    asyncio.run(
+        execute_maintenance(
+            settings,
+            f'DROP DATABASE IF EXISTS "{database}"',
+            f'CREATE DATABASE "{database}"',
+        )
+    )
+    backend = get_backend(get_database_url(settings, database))
+    with backend.lock():
+        backend.apply_migrations(backend.to_apply(read_migrations(str(MIGRATIONS_DIR))))
+
+
+def drop_database(settings: PgsqlSettings, database: str) -> None:
+    asyncio.run(execute_maintenance(settings, f'DROP DATABASE IF EXISTS "{database}"'))
+
+
+def create_storage_service(settings: WorkerSettings) -> StorageServiceInterface:
+    if settings.S3_BACKEND == "aiobotocore":
+        return AioS3FileService(
+            bucket_name=settings.AWS_BUCKET_NAME,
+            max_pool_connections=settings.EXTRACT_CONCURRENCY,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+        )
+    return S3FileService(
+        bucket_name=settings.AWS_BUCKET_NAME,
+        max_pool_connections=settings.EXTRACT_CONCURRENCY,
+        endpoint_url=settings.S3_ENDPOINT_URL,
+    )
+
+
+def create_database(settings: WorkerSettings) -> PSQLDatabase:
+    return PSQLDatabase(
+        PgsqlSettings(
+            host=settings.PGSQL_SERVER,
+            port=settings.PGSQL_PORT,
+            database=settings.PGSQL_DATABASE,
+            user=settings.PGSQL_USER,
+            password=settings.PGSQL_PASSWORD,
+            pool_min_size=1,
+            pool_max_size=settings.PGSQL_POOL_MAX_SIZE,
+        )
+    )
+
+
+async def bench_pe_parse(
+    settings: WorkerSettings, num_files: int
+) -> tuple[list[float], int]:
+    latencies = []
+    num_bytes = 0
+    for _, body in iter_corpus(num_files):
+        start_time = time.perf_counter()
+        PeFileHandler.parse(body)
+        latencies.append(time.perf_counter() - start_time)
+        num_bytes += len(body)
+    return latencies, num_bytes
+
+
+async def bench_s3_download(
+    settings: WorkerSettings, num_files: int
+) -> tuple[list[float], int]:
+    storage_service = create_storage_service(settings)
+    pe_file_handler = PeFileHandler()
+    semaphore = asyncio.Semaphore(settings.EXTRACT_CONCURRENCY)
+    latencies = []
+    files = make_files(num_files)
+
+    async def download(file: NotExtractedFile) -> None:
+        async with semaphore:
+            start_time = time.perf_counter()
+            body = await storage_service.get_streaming_body_by_key(file_key=file.name)
+            await pe_file_handler.async_read_streaming_body(streaming_body=body)
+            latencies.append(time.perf_counter() - start_time)
+
+    await storage_service.initialize()
+    try:
+        await asyncio.gather(*[download(file) for file in files])
+    finally:
+        await storage_service.close()
+    return latencies, sum(file.size for file in files)
+
+
+async def bench_file_processor(
+    settings: WorkerSettings, num_files: int
+) -> tuple[list[float], int]:
+    storage_service = create_storage_service(settings)
+    parser_pool = (
+        ProcessPoolExecutor(
+            max_workers=settings.PE_PARSER_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        if settings.PE_PARSER_PROCESSES > 0
+        else None
+    )
+    file_processor = TimedFileProcessor(
+        s3_file_service=storage_service,
+        pe_file_handler=PeFileHandler(parser_pool=parser_pool),
+        concurrency=settings.EXTRACT_CONCURRENCY,
+    )
+    files = make_files(num_files)
+    file_rows = [
+        Row(name=file.name, hash=file.hash, size=file.size, malicious=file.malicious)
+        for file in files
+    ]
+
+    await storage_service.initialize()
+    try:
+        async for row in file_processor.process(file_rows):
+            if row.status != "EXTRACTED":
+                logger.warning(f"Extraction failed for {row.name}")
+    finally:
+        await storage_service.close()
+        if parser_pool is not None:
+            parser_pool.shutdown()
+    return file_processor.latencies, sum(file.size for file in files)
+
+
+async def bench_upsert_many(
+    settings: WorkerSettings, num_files: int
+) -> tuple[list[float], int]:
+    database = create_database(settings)
+    await database.initialize()
+    repository = PgSqlFileRepository(
+        table="storage_file_metadata",
+        psql_database=database,
+        upsert_method=settings.SYNC_UPSERT_METHOD,
+        batch_size=settings.SYNC_UPSERT_BATCH_SIZE,
+    )
+    files = make_files(num_files)
+    latencies = []
+
+    try:
+        sync_time = datetime.datetime.now(tz=datetime.timezone.utc)
+        for start in range(0, len(files), 1_000):
+            start_time = time.perf_counter()
+            await repository.upsert_many(
+                files=files[start : start + 1_000], sync_time=sync_time
+            )
+            latencies.append(time.perf_counter() - start_time)
+    finally:
+        async with database.pool.acquire() as connection:
+            await connection.execute("TRUNCATE storage_file_metadata")
+        await database.pool.close()
+    return latencies, 0
+
+
+async def bench_extract(
+    settings: WorkerSettings, num_files: int
+) -> tuple[list[float], int]:
+    from worker_extract.container import WorkerExtractContainer
+
+    container = WorkerExtractContainer(settings)
+    files = make_files(num_files)
+    await container.database.initialize()
+    await container.file_repository.upsert_many(
+        files=files, sync_time=datetime.datetime.now(tz=datetime.timezone.utc)
+    )
+    quotas = {
+        malicious: sum(file.malicious == malicious for file in files)
+        for malicious in (False, True)
+    }
+
+    try:
+        if settings.EXTRACT_ENGINE == "local":
+            await container.storage_service.initialize()
+            try:
+                await container.local_extract_command.execute(quotas=quotas)
+            finally:
+                await container.storage_service.close()
+        else:
+            container.extract_command.execute(quotas=quotas)
+
+        async with container.database.pool.acquire() as connection:
+            extracted = await connection.fetchval(
+                "SELECT count(*) FROM extracted_file_metadata"
+            )
+        if extracted != len(files):
+            logger.warning(f"Extracted {extracted} of {len(files)} files")
+    finally:
+        async with container.database.pool.acquire() as connection:
+            await connection.execute(
+                "TRUNCATE storage_file_metadata, extracted_file_metadata"
+            )
+        await container.close()
+    return [], sum(file.size for file in files)
+
+
+BENCHMARKS = {
+    "pe_parse": bench_pe_parse,
+    "s3_download": bench_s3_download,
+    "file_processor": bench_file_processor,
+    "upsert_many": bench_upsert_many,
+    "extract": bench_extract,
+}
+
+
+def percentile(latencies: list[float], percent: int) -> Optional[float]:
+    if not latencies:
+        return None
+    if len(latencies) == 1:
+        return latencies[0] * 1_000
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return quantiles[percent - 1] * 1_000
+
+
+def get_peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1_024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1_024
+
+
+def run_stage(stage: str, environment: dict[str, str], num_files: int) -> dict:
+    os.environ.update(environment)
+    logging.basicConfig(level=logging.WARNING)
+    settings = WorkerSettings()
+
+    start_time = time.perf_counter()
+    latencies, num_bytes = asyncio.run(BENCHMARKS[stage](settings, num_files))
+    seconds = time.perf_counter() - start_time
+
+    megabytes = num_bytes / 1_000_000
+    p50, p99 = percentile(latencies, 50), percentile(latencies, 99)
+    return {
+        "stage": stage,
+        "engine": settings.EXTRACT_ENGINE if stage == "extract" else None,
+        "files": num_files,
+        "megabytes": round(megabytes, 3),
+        "seconds": round(seconds, 3),
+        "files_per_second": round(num_files / seconds, 1),
+        "mb_per_second": round(megabytes / seconds, 3) if num_bytes else None,
+        "p50_ms": round(p50, 3) if p50 is not None else None,
+        "p99_ms": round(p99, 3) if p99 is not None else None,
+        "peak_rss_mb": round(get_peak_rss_mb(), 1),
+        "peak_children_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1_024, 1
+        ),
+    }
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> bool:
+    baseline_by_stage = {(row["stage"], row["engine"]): row for row in baseline}
+    passed = True
+    for result in results:
+        previous = baseline_by_stage.get((result["stage"], result["engine"]))
+        if previous is None:
+            continue
+        ratio = result["files_per_second"] / previous["files_per_second"]
+        result["baseline_ratio"] = round(ratio, 3)
+        if ratio < 1 - tolerance:
+            logger.error(
+                f"{result['stage']} regressed: {result['files_per_second']} files/s "
+                f"vs {previous['files_per_second']} files/s"
+            )
+            passed = False
+    return passed
+
+
+def run(args: argparse.Namespace) -> list[dict]:
+    settings = get_maintenance_settings()
+    server = start_storage(args.files)
+    host, port = server.get_host_and_port()
+    recreate_database(settings, args.database)
+
+    environment = {
+        "AWS_BUCKET_NAME": BUCKET_NAME,
+        "S3_ENDPOINT_URL": f"http://{host}:{port}",
+        "PGSQL_DATABASE": args.database,
+        "SPARK_MASTER_URL": args.spark_master,
+    }
+    results = []
+    try:
+        for stage in args.stages:
+            engines = args.engines if stage == "extract" else [None]
+            for engine in engines:
+                stage_environment = dict(environment)
+                if engine is not None:
+                    stage_environment["EXTRACT_ENGINE"] = engine
+                with ProcessPoolExecutor(
+                    max_workers=1, mp_context=multiprocessing.get_context("spawn")
+                ) as pool:
+                    result = pool.submit(
+                        run_stage, stage, stage_environment, args.files
+                    ).result()
+                logger.info(result)
+                results.append(result)
+    finally:
+        server.stop()
+        if not args.keep_database:
+            drop_database(settings, args.database)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure throughput of the extraction hot path per stage."
+    )
+    parser.add_argument("--files", type=int, default=1_000)
+    parser.add_argument(
+        "--stages", nargs="+", default=STAGES, choices=STAGES, dest="stages"
+    )
+    parser.add_argument(
+        "--engines", nargs="+", default=["local"], choices=["local", "spark"]
+    )
+    parser.add_argument("--database", type=str, default="file_processor_benchmark")
+    parser.add_argument("--keep-database", action="store_true")
+    parser.add_argument("--spark-master", type=str, default="local[*]")
+    parser.add_argument("--baseline", type=str, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    results = run(args)
+
+    passed = True
+    if args.baseline:
+        with open(args.baseline) as file:
+            passed = compare(results, json.load(file), args.tolerance)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
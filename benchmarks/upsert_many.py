@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import time
+
+from common.pgsql import PgsqlSettings, PSQLDatabase
+from domain.file_data.model.file_sync_info import NotExtractedFile
+from presistence.repository.file import PgSqlFileRepository
+
+
+logger = logging.getLogger(__name__)
+
+TABLE = "benchmark_storage_file_metadata"
+
+
+def make_files(rows: int) -> list[NotExtractedFile]:
+    return [
+        NotExtractedFile(
+            name=f"{i % 2}/{i:012}",
+            hash=f"{i:032x}",
+            size=i % 10_000_000,
+            malicious=bool(i % 2),
+        )
+        for i in range(rows)
+    ]
+
+
+async def reset_table(database: PSQLDatabase) -> None:
+    async with database.pool.acquire() as connection:
+        await connection.execute(
+            f"""
+            DROP TABLE IF EXISTS {TABLE};
+            CREATE TABLE {TABLE} (
+                id SERIAL PRIMARY KEY,
+                name TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                size INT NOT NULL,
+                malicious BOOLEAN NOT NULL,
+                sync_time TIMESTAMP WITH TIME ZONE NOT NULL
+            );
+            CREATE UNIQUE INDEX {TABLE}_name_hash ON {TABLE} (name, hash);
+            """
+        )
+
+
+async def run(args: argparse.Namespace) -> list[dict]:
+    database = PSQLDatabase(
+        PgsqlSettings(
+            host=os.environ["PGSQL_SERVER"],
+            port=int(os.environ["PGSQL_PORT"]),
+            database=os.environ["PGSQL_DATABASE"],
+            user=os.environ["PGSQL_USER"],
+            password=os.environ["PGSQL_PASSWORD"],
+        )
+    )
+    await database.initialize()
+    files = make_files(args.rows)
+    results = []
+
+    try:
+        for method in args.methods:
+            await reset_table(database)
+            repository = PgSqlFileRepository(
+                table=TABLE,
+                psql_database=database,
+                upsert_method=method,
+                batch_size=args.batch_size,
+            )
+
+            for phase in ("insert", "update"):
+                sync_time = datetime.datetime.now(tz=datetime.timezone.utc)
+                start_time = time.perf_counter()
+                for start in range(0, len(files), args.page_size):
+                    await repository.upsert_many(
+                        files=files[start : start + args.page_size],
+                        sync_time=sync_time,
+                    )
+                seconds = time.perf_counter() - start_time
+
+                result = {
+                    "method": method,
+                    "phase": phase,
+                    "rows": args.rows,
+                    "page_size": args.page_size,
+                    "batch_size": args.batch_size,
+                    "seconds": round(seconds, 3),
+                    "rows_per_second": round(args.rows / seconds),
+                }
+                logger.info(result)
+                results.append(result)
+    finally:
+        async with database.pool.acquire() as connection:
+            await connection.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        await database.pool.close()
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare PgSqlFileRepository.upsert_many methods."
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=1_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument(
+        "--methods", nargs="+", default=["executemany", "copy"], dest="methods"
+    )
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    results = asyncio.run(run(args))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
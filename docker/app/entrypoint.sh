@@ -6,7 +6,9 @@ if [ "$1" = 'worker_sync' ]; then
   exec python -u src/worker_sync/main.py $@
 elif [ "$1" = 'worker_extract' ]; then
   shift
-  eval python src/wait_spark.py
+  if [ "$EXTRACT_ENGINE" != 'local' ] && [ "$EXTRACT_MODE" != 'stream' ]; then
+    eval python src/wait_spark.py
+  fi
   exec python -u src/worker_extract/main.py $@
 elif [ "$1" = 'lint' ]; then
     shift
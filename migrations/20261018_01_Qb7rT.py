@@ -0,0 +1,25 @@
+"""
+Incremental sync: per-shard listing checkpoints.
+"""
+
+from yoyo import step
+
+
+__depends__ = {"20231205_01_irBcy"}
+
+steps = [
+    step(
+        """
+        CREATE TABLE storage_sync_checkpoint (
+            shard TEXT PRIMARY KEY,
+            completed BOOLEAN NOT NULL,
+            last_key TEXT,
+            watermark TIMESTAMP WITH TIME ZONE,
+            updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+        );
+    """,
+        """
+DROP TABLE storage_sync_checkpoint;
+""",
+    )
+]
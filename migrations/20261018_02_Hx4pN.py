@@ -0,0 +1,19 @@
+"""
+Index extracted file hashes for the pushed-down extract candidate lookup.
+"""
+
+from yoyo import step
+
+
+__depends__ = {"20261018_01_Qb7rT"}
+
+steps = [
+    step(
+        """
+        CREATE INDEX extracted_idx_hash ON extracted_file_metadata (hash);
+    """,
+        """
+DROP INDEX extracted_idx_hash;
+""",
+    )
+]
@@ -0,0 +1,35 @@
+"""
+Hash-keyed extraction cache shared by extract workers.
+"""
+
+from yoyo import step
+
+
+__depends__ = {"20261018_02_Hx4pN"}
+
+steps = [
+    step(
+        """
+        CREATE TABLE extracted_file_cache (
+            hash TEXT PRIMARY KEY,
+            architecture TEXT,
+            num_imports INT,
+            num_exports INT,
+            type TEXT,
+            status TEXT NOT NULL,
+            updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+        );
+
+        INSERT INTO extracted_file_cache
+        (hash, architecture, num_imports, num_exports, type, status, updated_at)
+        SELECT DISTINCT ON (hash)
+            hash, architecture, num_imports, num_exports, type, status, now()
+        FROM extracted_file_metadata
+        WHERE status = 'EXTRACTED'
+        ORDER BY hash, created_at DESC;
+    """,
+        """
+DROP TABLE extracted_file_cache;
+""",
+    )
+]
@@ -0,0 +1,29 @@
+"""
+Queue of synced files awaiting streaming extraction.
+"""
+
+from yoyo import step
+
+
+__depends__ = {"20261018_03_Tc8mW"}
+
+steps = [
+    step(
+        """
+        CREATE TABLE extract_queue (
+            id BIGSERIAL PRIMARY KEY,
+            name TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            size INT NOT NULL,
+            malicious BOOLEAN NOT NULL,
+            claimed_at TIMESTAMP WITH TIME ZONE
+        );
+        CREATE UNIQUE INDEX extract_queue_idx_name_hash ON
+        extract_queue (name, hash);
+    """,
+        """
+DROP INDEX extract_queue_idx_name_hash;
+DROP TABLE extract_queue;
+""",
+    )
+]
@@ -0,0 +1,92 @@
+import time
+from typing import Callable, Optional
+
+from common.metrics import metrics
+
+
+class AdaptiveConcurrencyLimiter:
+    __slots__ = (
+        "_name",
+        "_min_limit",
+        "_max_limit",
+        "_limit",
+        "_backoff",
+        "_latency_tolerance",
+        "_smoothing",
+        "_baseline_smoothing",
+        "_latency",
+        "_baseline",
+        "_slow_start",
+        "_cooldown_until",
+        "_clock",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.2,
+        baseline_smoothing: float = 0.01,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._name = name
+        self._min_limit = max(1, min_limit)
+        self._max_limit = max(self._min_limit, max_limit)
+        self._limit = float(self._min_limit)
+        self._backoff = backoff
+        self._latency_tolerance = latency_tolerance
+        self._smoothing = smoothing
+        self._baseline_smoothing = baseline_smoothing
+        self._latency: Optional[float] = None
+        self._baseline: Optional[float] = None
+        self._slow_start = True
+        self._cooldown_until = 0.0
+        self._clock = clock
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def on_success(self, latency: float) -> None:
+        if self._latency is None or self._baseline is None:
+            self._latency = self._baseline = latency
+        else:
+            self._latency += self._smoothing * (latency - self._latency)
+            self._baseline = min(
+                self._latency,
+                self._baseline + self._baseline_smoothing * (latency - self._baseline),
+            )
+
+        if self._latency > self._baseline * self._latency_tolerance:
+            self._decrease(cause="latency")
+            return
+
+        increase = 1.0 if self._slow_start else 1.0 / self._limit
+        self._limit = min(float(self._max_limit), self._limit + increase)
+        self._publish()
+
+    def on_throttle(self) -> None:
+        self._decrease(cause="throttle")
+
+    def on_overload(self) -> None:
+        self._decrease(cause="overload")
+
+    def _decrease(self, cause: str) -> None:
+        now = self._clock()
+        if now < self._cooldown_until:
+            return
+
+        self._slow_start = False
+        self._limit = max(float(self._min_limit), self._limit * self._backoff)
+        self._cooldown_until = now + (self._latency or 0.0)
+        metrics.inc(
+            "concurrency_limit_decreases_total", limiter=self._name, cause=cause
+        )
+        self._publish()
+
+    def _publish(self) -> None:
+        metrics.set_gauge("concurrency_limit", self.limit, limiter=self._name)
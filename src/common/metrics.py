@@ -0,0 +1,219 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, Optional
+
+
+logger = logging.getLogger(__name__)
+
+LabelSet = tuple[tuple[str, str], ...]
+MetricKey = tuple[str, LabelSet]
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class MetricsRegistry:
+    __slots__ = ("_lock", "_counters", "_gauges", "_histograms")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[MetricKey, float] = {}
+        self._gauges: dict[MetricKey, float] = {}
+        self._histograms: dict[MetricKey, list[float]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add_gauge(self, name: str, value: float, **labels: str) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.setdefault(key, [0.0] * (len(BUCKETS) + 3))
+            histogram[bisect_left(BUCKETS, value)] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start_time, **labels)
+
+    @contextmanager
+    def in_flight(self, name: str, **labels: str) -> Iterator[None]:
+        self.add_gauge(name, 1, **labels)
+        try:
+            yield
+        finally:
+            self.add_gauge(name, -1, **labels)
+
+    def drain(self) -> dict[str, Any]:
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            histograms, self._histograms = self._histograms, {}
+        return {"counters": counters, "histograms": histograms}
+
+    def merge(self, drained: dict[str, Any]) -> None:
+        with self._lock:
+            for key, value in drained["counters"].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, values in drained["histograms"].items():
+                histogram = self._histograms.setdefault(key, [0.0] * len(values))
+                for index, value in enumerate(values):
+                    histogram[index] += value
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "gauges": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._gauges.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "count": histogram[-1],
+                        "sum": histogram[-2],
+                        "buckets": dict(
+                            zip([*map(str, BUCKETS), "+Inf"], histogram[:-2])
+                        ),
+                    }
+                    for (name, labels), histogram in sorted(self._histograms.items())
+                ],
+            }
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items())
+
+        lines = []
+        for metric_type, samples in (("counter", counters), ("gauge", gauges)):
+            for name in sorted({name for (name, _), _ in samples}):
+                lines.append(f"# TYPE {name} {metric_type}")
+                lines.extend(
+                    f"{name}{self._format_labels(labels)} {value}"
+                    for (sample_name, labels), value in samples
+                    if sample_name == name
+                )
+        for name in sorted({name for (name, _), _ in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (sample_name, labels), histogram in histograms:
+                if sample_name != name:
+                    continue
+                cumulative = 0.0
+                for bound, count in zip([*map(str, BUCKETS), "+Inf"], histogram[:-2]):
+                    cumulative += count
+                    bucket_labels = self._format_labels((*labels, ("le", bound)))
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {histogram[-2]}")
+                lines.append(
+                    f"{name}_count{self._format_labels(labels)} {histogram[-1]}"
+                )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _key(name: str, labels: dict[str, str]) -> MetricKey:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    @staticmethod
+    def _format_labels(labels: LabelSet) -> str:
+        if not labels:
+            return ""
+        escaped = (
+            (key, value.replace("\\", "\\\\").replace('"', '\\"'))
+            for key, value in labels
+        )
+        return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class MetricsExporter:
+    __slots__ = (
+        "_registry",
+        "_port",
+        "_dump_path",
+        "_dump_interval",
+        "_server",
+        "_stop",
+    )
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        port: int = 0,
+        dump_path: Optional[str] = None,
+        dump_interval: float = 60.0,
+    ):
+        self._registry = registry
+        self._port = port
+        self._dump_path = dump_path
+        self._dump_interval = dump_interval
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self._port > 0:
+            registry = self._registry
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self) -> None:
+                    body = registry.render_prometheus().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args: Any) -> None:
+                    pass
+
+            self._server = ThreadingHTTPServer(("", self._port), MetricsHandler)
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+            logger.info(f"Serving metrics on port {self._port}")
+
+        if self._dump_path:
+            threading.Thread(target=self._dump_periodically, daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._dump_path:
+            self.dump()
+
+    def dump(self) -> None:
+        assert self._dump_path is not None
+        with open(self._dump_path, "w") as file:
+            json.dump(self._registry.snapshot(), file, indent=2)
+
+    def _dump_periodically(self) -> None:
+        while not self._stop.wait(self._dump_interval):
+            self.dump()
+
+
+metrics = MetricsRegistry()
@@ -14,6 +14,8 @@ class PgsqlSettings:
     database: str
     user: str
     password: str
+    pool_min_size: int = 10
+    pool_max_size: int = 10
 
 
 class PSQLDatabase:
@@ -31,4 +33,9 @@ class PSQLDatabase:
                 database=self.pgsql_settings.database,
                 user=self.pgsql_settings.user,
                 password=self.pgsql_settings.password,
+                min_size=min(
+                    self.pgsql_settings.pool_min_size,
+                    self.pgsql_settings.pool_max_size,
+                ),
+                max_size=self.pgsql_settings.pool_max_size,
             )
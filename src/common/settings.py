@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -7,9 +9,63 @@ class WorkerSettings(BaseSettings):
     PGSQL_PASSWORD: str
     PGSQL_DATABASE: str
     PGSQL_PORT: int
+    PGSQL_POOL_MAX_SIZE: int = 10
 
     AWS_BUCKET_NAME: str
 
     SPARK_MASTER_URL: str
 
     NUM_FILES: int = 1000
+
+    SYNC_SHARD_ALPHABET: str = ""
+    SYNC_SHARD_DEPTH: int = 1
+    SYNC_MAX_LISTERS: int = 8
+    SYNC_QUEUE_DEPTH: int = 16
+    SYNC_UPSERT_WORKERS: int = 4
+    SYNC_UPSERT_METHOD: Literal["executemany", "copy"] = "executemany"
+    SYNC_UPSERT_BATCH_SIZE: int = 10_000
+    SYNC_MODE: Literal["full", "incremental"] = "full"
+    SYNC_WATERMARK_LAG_SECONDS: int = 3_600
+    SYNC_DETECT_DELETIONS: bool = False
+    SYNC_PUBLISH_QUEUE: bool = False
+
+    EXTRACT_MODE: Literal["batch", "stream"] = "batch"
+    EXTRACT_ENGINE: Literal["spark", "local"] = "spark"
+    EXTRACT_STREAM_BATCH_SIZE: int = 100
+    EXTRACT_STREAM_IDLE_TIMEOUT_SECONDS: float = 5.0
+    EXTRACT_STREAM_LEASE_SECONDS: float = 600
+    EXTRACT_CONCURRENCY: int = 32
+    EXTRACT_ADAPTIVE_CONCURRENCY: bool = False
+    EXTRACT_MIN_CONCURRENCY: int = 4
+    EXTRACT_LATENCY_TOLERANCE: float = 2.0
+    PE_PARSER_PROCESSES: int = 0
+    EXTRACT_JDBC_PARTITIONS: int = 0
+    EXTRACT_JDBC_FETCH_SIZE: int = 10_000
+    EXTRACT_PROCESS_PARTITIONS: int = 0
+    EXTRACT_PARTITION_TARGET_BYTES: int = 0
+    EXTRACT_PARTITIONER: Literal["hash", "size"] = "hash"
+    EXTRACT_ISOLATE_FILE_BYTES: int = 0
+    EXTRACT_FILE_COST_BYTES: int = 0
+    EXTRACT_PACK_MAX_HASHES: int = 1_000_000
+    EXTRACT_WRITE_PARTITIONS: int = 0
+    EXTRACT_WRITE_BATCH_SIZE: int = 10_000
+    EXTRACT_RESULT_BATCH_SIZE: int = 10_000
+
+    EXTRACTION_CACHE_ENABLED: bool = False
+    EXTRACTION_CACHE_CLAIM_TIMEOUT_SECONDS: float = 300
+    EXTRACTION_CACHE_POLL_INTERVAL_SECONDS: float = 1.0
+
+    EXTRACT_HEADERS_ONLY: bool = False
+    PE_HEADER_PROBE_SIZE: int = 4_096
+    PE_HEADER_MAX_BYTES: int = 8 * 1024 * 1024
+    PE_SPILL_THRESHOLD_BYTES: int = 0
+    PE_SPILL_DIR: Optional[str] = None
+    PE_READ_CHUNK_SIZE: int = 1024 * 1024
+
+    METRICS_PORT: int = 0
+    METRICS_DUMP_PATH: Optional[str] = None
+    METRICS_DUMP_INTERVAL_SECONDS: float = 60.0
+
+    S3_BACKEND: Literal["boto3", "aiobotocore"] = "boto3"
+    S3_ENDPOINT_URL: Optional[str] = None
+    S3_MAX_POOL_CONNECTIONS: Optional[int] = None
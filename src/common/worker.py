@@ -3,6 +3,7 @@ import asyncio
 import logging
 from typing import Optional
 
+from common.metrics import MetricsExporter, metrics
 from common.settings import WorkerSettings
 
 
@@ -42,7 +43,19 @@ class Bootstrap:
             application = (
                 self.tasks.get(cmd_args.command) if self.tasks else self.application
             )
-            loop.run_until_complete(application(self.settings).run())  # type: ignore
+            exporter = MetricsExporter(
+                registry=metrics,
+                port=self.settings.METRICS_PORT,
+                dump_path=self.settings.METRICS_DUMP_PATH,
+                dump_interval=self.settings.METRICS_DUMP_INTERVAL_SECONDS,
+            )
+            exporter.start()
+            try:
+                loop.run_until_complete(
+                    application(self.settings).run()  # type: ignore
+                )
+            finally:
+                exporter.stop()
 
         else:
             self.parser.print_usage()
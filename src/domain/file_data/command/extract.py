@@ -1,7 +1,18 @@
 import logging
+import math
+from functools import partial
+from typing import Optional
 
+from pyspark import Accumulator, StorageLevel
 from pyspark.sql import DataFrame, SparkSession
-from pyspark.sql.functions import col, current_timestamp
+from pyspark.sql.functions import broadcast, coalesce, col, count, current_timestamp
+from pyspark.sql.functions import hash as hash_
+from pyspark.sql.functions import lit
+from pyspark.sql.functions import max as max_
+from pyspark.sql.functions import min as min_
+from pyspark.sql.functions import pmod
+from pyspark.sql.functions import sum as sum_
+from pyspark.sql.pandas.types import to_arrow_schema
 from pyspark.sql.types import (
     BooleanType,
     IntegerType,
@@ -11,11 +22,20 @@ from pyspark.sql.types import (
     TimestampType,
 )
 
+from common.metrics import metrics
 from common.pgsql import PgsqlSettings
-from domain.file_data.file_processor import process_partition
+from domain.file_data.executor import (
+    MetricsAccumulatorParam,
+    foreach_with_metrics,
+    map_with_metrics,
+    process_record_batches,
+    write_partition,
+)
+from domain.file_data.partitioner import SizeBalancedPartitioner
 from domain.file_data.repository.interface import FileRepositoryInterface
 from domain.file_data.service.file_storage_service import StorageServiceInterface
 from presistence.repository.mapper.fields.file import FileRepositoryFields
+from presistence.repository.query.extract_candidate import ExtractCandidateQuery
 
 
 logger = logging.getLogger(__name__)
@@ -31,7 +51,17 @@ class ExtractCommand:
         "_source_table",
         "_target_table",
         "_db_table_fields",
+        "_query",
         "_schema",
+        "_jdbc_partitions",
+        "_jdbc_fetch_size",
+        "_process_partitions",
+        "_partition_target_bytes",
+        "_partitioner",
+        "_isolate_file_bytes",
+        "_file_cost_bytes",
+        "_pack_max_hashes",
+        "_write_partitions",
     )
 
     def __init__(
@@ -43,6 +73,15 @@ class ExtractCommand:
         target_table: str,
         spark_url: str,
         db_table_fields: type[FileRepositoryFields],
+        jdbc_partitions: int = 0,
+        jdbc_fetch_size: int = 10_000,
+        process_partitions: int = 0,
+        partition_target_bytes: int = 0,
+        partitioner: str = "hash",
+        isolate_file_bytes: int = 0,
+        file_cost_bytes: int = 0,
+        pack_max_hashes: int = 1_000_000,
+        write_partitions: int = 0,
     ):
         self._file_repository = file_repository
         self._storage_service = storage_service
@@ -55,6 +94,20 @@ class ExtractCommand:
         self._source_table = source_table
         self._target_table = target_table
         self._db_table_fields = db_table_fields
+        self._query = ExtractCandidateQuery(
+            source_table=source_table,
+            target_table=target_table,
+            fields=db_table_fields,
+        )
+        self._jdbc_partitions = jdbc_partitions
+        self._jdbc_fetch_size = jdbc_fetch_size
+        self._process_partitions = process_partitions
+        self._partition_target_bytes = partition_target_bytes
+        self._partitioner = partitioner
+        self._isolate_file_bytes = isolate_file_bytes
+        self._file_cost_bytes = file_cost_bytes
+        self._pack_max_hashes = pack_max_hashes
+        self._write_partitions = write_partitions
 
         self._schema = StructType(
             [
@@ -71,38 +124,65 @@ class ExtractCommand:
             ]
         )
 
-    def execute(self, malicious: bool, num_files: int) -> None:
+    def execute(self, quotas: dict[bool, int]) -> None:
+        quotas = {malicious: num for malicious, num in quotas.items() if num > 0}
+        if not quotas:
+            return
         spark = self._create_spark_session()
-
-        storage_df = self._load_data(spark=spark, table_name=self._source_table)
-        extracted_df = self._load_data(spark=spark, table_name=self._target_table)
-
-        unprocessed_files_df = self._extract_unprocessed_files(
-            storage_df=storage_df,
-            extracted_df=extracted_df,
-            malicious=malicious,
-            num_files=num_files,
-        )
-
-        matching_rows_df = self._get_unique_extracted_rows_with_matching_hashes(
-            unprocessed_files_df=unprocessed_files_df, extracted_df=extracted_df
+        metrics_param = MetricsAccumulatorParam()
+        metrics_accumulator = spark.sparkContext.accumulator(
+            metrics_param.zero({}), metrics_param
         )
 
-        unprocessed_files_matching_rows_df = self._join_unprocessed_and_matched_data(
-            unprocessed_files_df=unprocessed_files_df,
-            matching_rows_df=matching_rows_df,
-        )
-
-        unprocessed_files_df = self._get_unprocessed_files(
-            unprocessed_files_df=unprocessed_files_df,
-            unprocessed_files_matching_rows_df=unprocessed_files_matching_rows_df,
-        )
-
-        processed_files_df = self._process_distinct_files_and_update_metadata(
-            unprocessed_files_df=unprocessed_files_df, spark=spark
-        )
-        self._write_to_database(dataframe=processed_files_df)
-        self._write_to_database(dataframe=unprocessed_files_matching_rows_df)
+        unprocessed_files_df = self._load_unprocessed_files(
+            spark=spark, quotas=quotas
+        ).persist(StorageLevel.MEMORY_AND_DISK)
+
+        try:
+            with metrics.timer("spark_stage_seconds", stage="select"):
+                totals = unprocessed_files_df.agg(
+                    count("*").alias("num_files"),
+                    sum_(self._db_table_fields.SIZE).alias("num_bytes"),
+                ).first()
+            if totals is None or totals.num_files == 0:
+                logger.info(f"No unprocessed files, quotas: {quotas}")
+                return
+
+            matching_rows_df = self._load_extracted_files(
+                spark=spark, unprocessed_files_df=unprocessed_files_df
+            )
+            unprocessed_files_matching_rows_df = (
+                self._join_unprocessed_and_matched_data(
+                    unprocessed_files_df=unprocessed_files_df,
+                    matching_rows_df=matching_rows_df,
+                ).persist(StorageLevel.MEMORY_AND_DISK)
+            )
+
+            try:
+                files_to_process_df = self._get_unprocessed_files(
+                    unprocessed_files_df=unprocessed_files_df,
+                    unprocessed_files_matching_rows_df=(
+                        unprocessed_files_matching_rows_df
+                    ),
+                )
+                processed_files_df = self._process_distinct_files_and_update_metadata(
+                    unprocessed_files_df=files_to_process_df,
+                    spark=spark,
+                    metrics_accumulator=metrics_accumulator,
+                    num_bytes=totals.num_bytes or 0,
+                )
+                with metrics.timer("spark_stage_seconds", stage="extract_and_write"):
+                    self._write_to_database(
+                        dataframe=processed_files_df.unionByName(
+                            unprocessed_files_matching_rows_df
+                        ),
+                        metrics_accumulator=metrics_accumulator,
+                    )
+                metrics.merge(metrics_accumulator.value)
+            finally:
+                unprocessed_files_matching_rows_df.unpersist()
+        finally:
+            unprocessed_files_df.unpersist()
 
     def _create_spark_session(self) -> SparkSession:
         return (
@@ -111,54 +191,110 @@ class ExtractCommand:
             .getOrCreate()
         )
 
-    def _load_data(self, spark: SparkSession, table_name: str) -> DataFrame:
-        return (
+    def _load_data(
+        self,
+        spark: SparkSession,
+        query: str,
+        id_bounds: Optional[tuple[int, int]] = None,
+    ) -> DataFrame:
+        reader = (
             spark.read.format("jdbc")
             .option("url", self._jbdc_url)
-            .option("dbtable", table_name)
+            .option("dbtable", f"({query}) AS selected")
             .option("user", self._psql_settings.user)
             .option("password", self._psql_settings.password)
-            .load()
+            .option("fetchsize", self._jdbc_fetch_size)
         )
-
-    def _extract_unprocessed_files(
-        self,
-        storage_df: DataFrame,
-        extracted_df: DataFrame,
-        malicious: bool,
-        num_files: int,
+        if id_bounds is not None:
+            lower_bound, upper_bound = id_bounds
+            reader = (
+                reader.option("partitionColumn", self._db_table_fields.ID)
+                .option("lowerBound", lower_bound)
+                .option("upperBound", upper_bound + 1)
+                .option(
+                    "numPartitions",
+                    min(
+                        self._get_num_partitions(spark, self._jdbc_partitions),
+                        upper_bound - lower_bound + 1,
+                    ),
+                )
+            )
+        return reader.load()
+
+    def _load_unprocessed_files(
+        self, spark: SparkSession, quotas: dict[bool, int]
     ) -> DataFrame:
         _ = self._db_table_fields
-        storage_filtered_df = storage_df.filter(col(_.MALICIOUS) == malicious)
-
-        df_result = storage_filtered_df.join(
-            extracted_df,
-            (storage_df[_.NAME] == extracted_df[_.NAME])
-            & (storage_df[_.HASH] == extracted_df[_.HASH]),
-            "left_anti",
+        unprocessed_files_query = self._query.quota(quotas=quotas)
+
+        bounds = self._load_data(
+            spark=spark,
+            query=f"""
+                SELECT u.{_.MALICIOUS}, min(u.{_.ID}) AS lower_bound,
+                    max(u.{_.ID}) AS upper_bound
+                FROM ({unprocessed_files_query}) AS u
+                GROUP BY u.{_.MALICIOUS}
+            """,
+        ).collect()
+        if not bounds:
+            return self._load_data(spark=spark, query=unprocessed_files_query)
+
+        return self._load_data(
+            spark=spark,
+            query=self._query.union(
+                [
+                    self._query.unprocessed_files(
+                        malicious=row[_.MALICIOUS], max_id=row.upper_bound
+                    )
+                    for row in bounds
+                ]
+            ),
+            id_bounds=(
+                min(row.lower_bound for row in bounds),
+                max(row.upper_bound for row in bounds),
+            ),
         )
 
-        first_files_df = df_result.limit(num_files)
-        return first_files_df
+    def _get_num_partitions(self, spark: SparkSession, num_partitions: int) -> int:
+        if num_partitions > 0:
+            return num_partitions
+        return spark.sparkContext.defaultParallelism
+
+    def _get_process_partitions(self, spark: SparkSession, num_bytes: int) -> int:
+        if self._process_partitions <= 0 and self._partition_target_bytes > 0:
+            return max(1, math.ceil(num_bytes / self._partition_target_bytes))
+        return self._get_num_partitions(spark, self._process_partitions)
 
-    def _get_unique_extracted_rows_with_matching_hashes(
-        self, unprocessed_files_df: DataFrame, extracted_df: DataFrame
+    def _load_extracted_files(
+        self, spark: SparkSession, unprocessed_files_df: DataFrame
     ) -> DataFrame:
         _ = self._db_table_fields
-
-        unprocessed_distinct_hashes_df = (
-            unprocessed_files_df.select(_.HASH).distinct().alias("a")
+        hashes = sorted(
+            row[_.HASH]
+            for row in unprocessed_files_df.select(_.HASH).distinct().collect()
         )
 
-        extracted_df_alias = extracted_df.alias("b")
-
-        unique_extracted_rows_df = extracted_df_alias.join(
-            unprocessed_distinct_hashes_df, col(f"a.{_.HASH}") == col(f"b.{_.HASH}")
+        return self._load_data(
+            spark=spark,
+            query=self._get_extracted_rows_with_matching_hashes_query(hashes=hashes),
         )
 
-        unique_extracted_rows_df = unique_extracted_rows_df.drop(col(f"a.{_.HASH}"))
+    def _get_extracted_rows_with_matching_hashes_query(self, hashes: list[str]) -> str:
+        _ = self._db_table_fields
+        hash_list = ", ".join(
+            "'{}'".format(file_hash.replace("'", "''")) for file_hash in hashes
+        )
 
-        return unique_extracted_rows_df
+        return f"""
+            SELECT e.*
+            FROM {self._target_table} AS e
+            WHERE e.{_.ID} IN (
+                SELECT min(m.{_.ID})
+                FROM {self._target_table} AS m
+                WHERE m.{_.HASH} IN ({hash_list})
+                GROUP BY m.{_.HASH}
+            )
+        """
 
     def _join_unprocessed_and_matched_data(
         self, unprocessed_files_df: DataFrame, matching_rows_df: DataFrame
@@ -182,7 +318,7 @@ class ExtractCommand:
             col(f"b.{_.NUM_IMPORTS}"),
             col(f"b.{_.NUM_EXPORTS}"),
             col(f"b.{_.STATUS}"),
-            col(f"b.{_.MALICIOUS}"),
+            col(f"a.{_.MALICIOUS}"),
             col(f"b.{_.TYPE}"),
             current_timestamp().alias(_.CREATED_AT),
         )
@@ -201,44 +337,106 @@ class ExtractCommand:
         )
 
     def _process_distinct_files_and_update_metadata(
-        self, unprocessed_files_df: DataFrame, spark: SparkSession
+        self,
+        unprocessed_files_df: DataFrame,
+        spark: SparkSession,
+        metrics_accumulator: Optional[Accumulator] = None,
+        num_bytes: int = 0,
     ) -> DataFrame:
         _ = self._db_table_fields
 
-        distinct_files_df = unprocessed_files_df.dropDuplicates([_.HASH])
-        distinct_files_rdd = distinct_files_df.rdd
+        files_df = unprocessed_files_df.select(_.NAME, _.HASH, _.SIZE, _.MALICIOUS)
+        num_partitions = self._get_process_partitions(spark, num_bytes)
+        if self._partitioner == "size":
+            files_df = self._pack_by_size(
+                files_df=files_df, spark=spark, num_partitions=num_partitions
+            )
+        else:
+            files_df = files_df.repartition(num_partitions, _.HASH)
+        files_df = files_df.sortWithinPartitions(_.HASH)
+
+        return files_df.mapInArrow(
+            map_with_metrics(
+                partial(process_record_batches, to_arrow_schema(self._schema)),
+                stage="process",
+                accumulator=metrics_accumulator,
+            ),
+            self._schema,
+        )
 
-        extracted_data = distinct_files_rdd.mapPartitions(process_partition)
+    def _pack_by_size(
+        self, files_df: DataFrame, spark: SparkSession, num_partitions: int
+    ) -> DataFrame:
+        _ = self._db_table_fields
 
-        extracted_data_df = spark.createDataFrame(
-            extracted_data.filter(lambda x: x is not None), self._schema
+        sizes_df = files_df.groupBy(_.HASH).agg(
+            coalesce(max_(_.SIZE), lit(0)).alias(_.SIZE)
         )
-        extracted_data_df = extracted_data_df.alias("a")
-        unprocessed_files_df = unprocessed_files_df.alias("b")
-
-        final_metadata_df = unprocessed_files_df.join(
-            extracted_data_df, _.HASH, "left"
-        ).select(
-            col(f"b.{_.NAME}"),
-            col(f"a.{_.HASH}"),
-            col(f"a.{_.SIZE}"),
-            col(f"a.{_.ARCHITECTURE}"),
-            col(f"a.{_.NUM_IMPORTS}"),
-            col(f"a.{_.NUM_EXPORTS}"),
-            col(f"a.{_.TYPE}"),
-            col(f"a.{_.STATUS}"),
-            col(f"a.{_.MALICIOUS}"),
-            current_timestamp().alias(_.CREATED_AT),
+        if self._pack_max_hashes > 0:
+            sizes_df = sizes_df.limit(self._pack_max_hashes + 1)
+        sizes = sizes_df.collect()
+        if 0 < self._pack_max_hashes < len(sizes):
+            logger.warning(
+                f"More than {self._pack_max_hashes} hashes to pack, "
+                "falling back to hash partitioning"
+            )
+            return files_df.repartition(num_partitions, _.HASH)
+
+        assignment, num_partitions = SizeBalancedPartitioner(
+            num_partitions=num_partitions,
+            isolate_bytes=self._isolate_file_bytes,
+            file_cost_bytes=self._file_cost_bytes,
+        ).assign((row[_.HASH], row[_.SIZE]) for row in sizes)
+        partition_keys = self._get_partition_keys(spark, num_partitions)
+        logger.info(f"Packed {len(assignment)} hashes into {num_partitions} partitions")
+
+        partitions_df = spark.createDataFrame(
+            [
+                (file_hash, partition_keys[index])
+                for file_hash, index in assignment.items()
+            ],
+            StructType(
+                [
+                    StructField(_.HASH, StringType(), False),
+                    StructField("partition_key", IntegerType(), False),
+                ]
+            ),
         )
-        return final_metadata_df
-
-    def _write_to_database(self, dataframe: DataFrame) -> None:
-        dataframe.write.jdbc(
-            url=self._jbdc_url,
-            table=self._target_table,
-            mode="append",
-            properties={
-                "user": self._psql_settings.user,
-                "password": self._psql_settings.password,
-            },
+        return (
+            files_df.join(broadcast(partitions_df), _.HASH)
+            .repartition(num_partitions, "partition_key")
+            .drop("partition_key")
+        )
+
+    def _get_partition_keys(
+        self, spark: SparkSession, num_partitions: int
+    ) -> dict[int, int]:
+        partition_keys: dict[int, int] = {}
+        num_candidates = 64 * num_partitions
+        while len(partition_keys) < num_partitions:
+            candidates = spark.range(num_candidates).select(
+                col("id").cast(IntegerType()).alias("key")
+            )
+            partition_keys = {
+                row.partition: row.key
+                for row in candidates.groupBy(
+                    pmod(hash_(col("key")), lit(num_partitions)).alias("partition")
+                )
+                .agg(min_("key").alias("key"))
+                .collect()
+            }
+            num_candidates *= 2
+        return partition_keys
+
+    def _write_to_database(
+        self,
+        dataframe: DataFrame,
+        metrics_accumulator: Optional[Accumulator] = None,
+    ) -> None:
+        if self._write_partitions > 0:
+            dataframe = dataframe.repartition(self._write_partitions)
+        dataframe.foreachPartition(
+            foreach_with_metrics(
+                write_partition, stage="write", accumulator=metrics_accumulator
+            )
         )
@@ -0,0 +1,105 @@
+import datetime
+import logging
+
+from pyspark import Row
+
+from domain.file_data.file_processor import FileProcessor
+from domain.file_data.model.extracted_file import ExtractedFile
+from domain.file_data.model.file_sync_info import NotExtractedFile
+from domain.file_data.repository.interface import (
+    ExtractCandidateRepositoryInterface,
+    ExtractedFileRepositoryInterface,
+)
+from domain.file_data.repository.mapper.spark_row import SparkRowMapper
+
+
+logger = logging.getLogger(__name__)
+
+
+class LocalExtractCommand:
+    __slots__ = (
+        "_extract_candidate_repository",
+        "_extracted_file_repository",
+        "_file_processor",
+        "_write_batch_size",
+    )
+
+    def __init__(
+        self,
+        extract_candidate_repository: ExtractCandidateRepositoryInterface,
+        extracted_file_repository: ExtractedFileRepositoryInterface,
+        file_processor: FileProcessor,
+        write_batch_size: int = 10_000,
+    ):
+        self._extract_candidate_repository = extract_candidate_repository
+        self._extracted_file_repository = extracted_file_repository
+        self._file_processor = file_processor
+        self._write_batch_size = write_batch_size
+
+    async def execute(self, quotas: dict[bool, int]) -> None:
+        unprocessed_files = (
+            await self._extract_candidate_repository.get_unprocessed_many(quotas=quotas)
+        )
+        if not unprocessed_files:
+            logger.info(f"No unprocessed files, quotas: {quotas}")
+            return
+
+        files_by_hash: dict[str, list[NotExtractedFile]] = {}
+        for file in unprocessed_files:
+            files_by_hash.setdefault(file.hash, []).append(file)
+
+        matching_files = (
+            await self._extract_candidate_repository.get_extracted_by_hashes(
+                hashes=list(files_by_hash)
+            )
+        )
+        created_at = datetime.datetime.now(tz=datetime.timezone.utc)
+        pending = [
+            self._copy_for(file=file, extracted=extracted, created_at=created_at)
+            for extracted in matching_files
+            for file in files_by_hash.pop(extracted.hash, [])
+        ]
+        logger.info(
+            f"Selected {len(unprocessed_files)} files, reused {len(pending)}, "
+            f"extracting {len(files_by_hash)} distinct hashes"
+        )
+
+        file_rows = [
+            Row(
+                name=file.name, hash=file.hash, size=file.size, malicious=file.malicious
+            )
+            for file, *_ in files_by_hash.values()
+        ]
+        async for row in self._file_processor.process(file_rows):
+            extracted = SparkRowMapper.to_extracted_file(row)
+            pending.extend(
+                self._copy_for(
+                    file=file, extracted=extracted, created_at=row.created_at
+                )
+                for file in files_by_hash[row.hash]
+            )
+            if len(pending) >= self._write_batch_size:
+                await self._extracted_file_repository.upsert_many(files=pending)
+                pending = []
+
+        if pending:
+            await self._extracted_file_repository.upsert_many(files=pending)
+
+    @staticmethod
+    def _copy_for(
+        file: NotExtractedFile,
+        extracted: ExtractedFile,
+        created_at: datetime.datetime,
+    ) -> ExtractedFile:
+        return ExtractedFile(
+            name=file.name,
+            hash=extracted.hash,
+            size=extracted.size,
+            architecture=extracted.architecture,
+            num_imports=extracted.num_imports,
+            num_exports=extracted.num_exports,
+            type=extracted.type,
+            status=extracted.status,
+            malicious=file.malicious,
+            created_at=created_at,
+        )
@@ -0,0 +1,68 @@
+import logging
+from typing import Callable
+
+from pyspark import Row
+
+from domain.file_data.file_processor import FileProcessor
+from domain.file_data.repository.interface import (
+    ExtractedFileRepositoryInterface,
+    ExtractQueueRepositoryInterface,
+)
+from domain.file_data.repository.mapper.spark_row import SparkRowMapper
+
+
+logger = logging.getLogger(__name__)
+
+
+class StreamExtractCommand:
+    __slots__ = (
+        "_extract_queue",
+        "_file_processor",
+        "_extracted_file_repository",
+        "_batch_size",
+        "_idle_timeout",
+    )
+
+    def __init__(
+        self,
+        extract_queue: ExtractQueueRepositoryInterface,
+        file_processor: FileProcessor,
+        extracted_file_repository: ExtractedFileRepositoryInterface,
+        batch_size: int = 100,
+        idle_timeout: float = 5.0,
+    ):
+        self._extract_queue = extract_queue
+        self._file_processor = file_processor
+        self._extracted_file_repository = extracted_file_repository
+        self._batch_size = batch_size
+        self._idle_timeout = idle_timeout
+
+    async def execute(self, should_stop: Callable[[], bool]) -> None:
+        logger.info(f"Streaming extraction started, batch size: {self._batch_size}")
+        await self._extract_queue.listen()
+
+        try:
+            while not should_stop():
+                items = await self._extract_queue.claim(limit=self._batch_size)
+                if not items:
+                    await self._extract_queue.wait(timeout=self._idle_timeout)
+                    continue
+
+                file_rows = [
+                    Row(
+                        name=item.name,
+                        hash=item.hash,
+                        size=item.size,
+                        malicious=item.malicious,
+                    )
+                    for item in items
+                ]
+                extracted_files = [
+                    SparkRowMapper.to_extracted_file(row)
+                    async for row in self._file_processor.process(file_rows)
+                ]
+                await self._extracted_file_repository.upsert_many(files=extracted_files)
+                await self._extract_queue.complete(items=items)
+                logger.info(f"Extracted {len(items)} queued files")
+        finally:
+            await self._extract_queue.close()
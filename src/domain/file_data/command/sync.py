@@ -1,30 +1,305 @@
+import asyncio
 import datetime
+import itertools
 import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncGenerator, Optional
 
-from domain.file_data.repository.interface import FileRepositoryInterface
+from domain.file_data.model.file_sync_info import NotExtractedFile
+from domain.file_data.model.sync_checkpoint import SyncCheckpoint
+from domain.file_data.repository.interface import (
+    FileRepositoryInterface,
+    SyncCheckpointRepositoryInterface,
+)
 from domain.file_data.service.file_storage_service import StorageServiceInterface
 
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True, slots=True)
+class SyncBatch:
+    files: list[NotExtractedFile]
+    insert_only: bool
+    ack: asyncio.Future
+
+
 class SyncCommand:
-    __slots__ = ("_storage_service", "_file_repository")
+    __slots__ = (
+        "_storage_service",
+        "_file_repository",
+        "_checkpoint_repository",
+        "_mode",
+        "_watermark_lag",
+        "_shard_alphabet",
+        "_shard_depth",
+        "_max_listers",
+        "_queue_depth",
+        "_upsert_workers",
+    )
 
     def __init__(
         self,
         storage_service: StorageServiceInterface,
         file_repository: FileRepositoryInterface,
+        checkpoint_repository: Optional[SyncCheckpointRepositoryInterface] = None,
+        mode: str = "full",
+        watermark_lag: datetime.timedelta = datetime.timedelta(hours=1),
+        shard_alphabet: str = "",
+        shard_depth: int = 1,
+        max_listers: int = 1,
+        queue_depth: int = 16,
+        upsert_workers: int = 1,
     ):
+        if mode == "incremental" and checkpoint_repository is None:
+            raise ValueError("Incremental sync requires a checkpoint repository")
+
         self._storage_service = storage_service
         self._file_repository = file_repository
+        self._checkpoint_repository = checkpoint_repository
+        self._mode = mode
+        self._watermark_lag = watermark_lag
+        self._shard_alphabet = "".join(sorted(set(shard_alphabet)))
+        self._shard_depth = shard_depth
+        self._max_listers = max_listers
+        self._queue_depth = queue_depth
+        self._upsert_workers = upsert_workers
 
     async def execute(self, prefix: str, malicious: bool) -> None:
         sync_time = datetime.datetime.now(tz=datetime.timezone.utc)
-        logger.info(f"Execution started with prefix: {prefix}, malicious: {malicious}")
+        shards = self._get_shards(prefix=prefix)
+        logger.info(
+            f"Execution started with prefix: {prefix}, malicious: {malicious}, "
+            f"mode: {self._mode}, shards: {len(shards)}"
+        )
+
+        queue: asyncio.Queue[Optional[SyncBatch]] = asyncio.Queue(
+            maxsize=self._queue_depth
+        )
+        producer = asyncio.ensure_future(
+            self._list_shards(
+                prefix=prefix, malicious=malicious, shards=shards, queue=queue
+            )
+        )
+        consumers = [
+            asyncio.ensure_future(self._upsert(queue=queue, sync_time=sync_time))
+            for _ in range(self._upsert_workers)
+        ]
+
+        try:
+            await asyncio.gather(producer, *consumers)
+        finally:
+            for task in (producer, *consumers):
+                task.cancel()
+
+    async def prune(self, prefix: str, malicious: bool) -> int:
+        synced_before = datetime.datetime.now(tz=datetime.timezone.utc)
+        logger.info(f"Deletion pass started with prefix: {prefix}")
+        return await self._file_repository.delete_missing(
+            prefix=prefix,
+            pages=self._list_pages(prefix=prefix, malicious=malicious),
+            synced_before=synced_before,
+        )
+
+    async def _list_shards(
+        self,
+        prefix: str,
+        malicious: bool,
+        shards: list[tuple[Optional[str], Optional[str]]],
+        queue: asyncio.Queue[Optional[SyncBatch]],
+    ) -> None:
+        semaphore = asyncio.Semaphore(self._max_listers)
+        await asyncio.gather(
+            *[
+                self._list_shard(
+                    prefix=prefix,
+                    malicious=malicious,
+                    start_after=start_after,
+                    end_at=end_at,
+                    semaphore=semaphore,
+                    queue=queue,
+                )
+                for start_after, end_at in shards
+            ]
+        )
+        for _ in range(self._upsert_workers):
+            await queue.put(None)
+
+    async def _list_shard(
+        self,
+        prefix: str,
+        malicious: bool,
+        start_after: Optional[str],
+        end_at: Optional[str],
+        semaphore: asyncio.Semaphore,
+        queue: asyncio.Queue[Optional[SyncBatch]],
+    ) -> None:
+        async with semaphore:
+            if self._mode == "incremental":
+                await self._list_shard_incremental(
+                    prefix=prefix,
+                    malicious=malicious,
+                    start_after=start_after,
+                    end_at=end_at,
+                    queue=queue,
+                )
+                return
+
+            async for files in self._storage_service.paginate_by_prefix(
+                prefix=prefix,
+                malicious=malicious,
+                page_size=1_000,
+                start_after=start_after,
+                end_at=end_at,
+            ):
+                ack = asyncio.get_running_loop().create_future()
+                await queue.put(SyncBatch(files=files, insert_only=False, ack=ack))
+
+    async def _list_shard_incremental(
+        self,
+        prefix: str,
+        malicious: bool,
+        start_after: Optional[str],
+        end_at: Optional[str],
+        queue: asyncio.Queue[Optional[SyncBatch]],
+    ) -> None:
+        assert self._checkpoint_repository is not None
+        shard = f"{prefix}|{start_after or ''}|{end_at or ''}"
+        checkpoint = await self._checkpoint_repository.get(shard)
+
+        watermark = checkpoint.watermark if checkpoint else None
+        if (
+            checkpoint is not None
+            and not checkpoint.completed
+            and checkpoint.last_key is not None
+        ):
+            start_after = max(start_after or "", checkpoint.last_key)
+            logger.info(f"Resuming shard {shard} after {start_after}")
+
+        skip_until = watermark - self._watermark_lag if watermark else None
+        max_watermark = watermark
+        pending: deque[tuple[str, asyncio.Future]] = deque()
 
         async for files in self._storage_service.paginate_by_prefix(
-            prefix=prefix, malicious=malicious, page_size=1_000
+            prefix=prefix,
+            malicious=malicious,
+            page_size=1_000,
+            start_after=start_after,
+            end_at=end_at,
         ):
-            logger.info(f"Upserting {len(files)} files")
-            await self._file_repository.upsert_many(files=files, sync_time=sync_time)
+            max_watermark = max(
+                [file.last_modified for file in files if file.last_modified]
+                + ([max_watermark] if max_watermark else []),
+                default=None,
+            )
+
+            changed_files = [
+                file
+                for file in files
+                if skip_until is None
+                or file.last_modified is None
+                or file.last_modified > skip_until
+            ]
+            ack = asyncio.get_running_loop().create_future()
+            if changed_files:
+                await queue.put(
+                    SyncBatch(files=changed_files, insert_only=True, ack=ack)
+                )
+            else:
+                ack.set_result(None)
+            pending.append((files[-1].name, ack))
+
+            last_key = None
+            while pending and pending[0][1].done():
+                last_key, _ = pending.popleft()
+            if last_key is not None:
+                await self._checkpoint_repository.save(
+                    SyncCheckpoint(
+                        shard=shard,
+                        completed=False,
+                        last_key=last_key,
+                        watermark=watermark,
+                    )
+                )
+
+        await asyncio.gather(*[ack for _, ack in pending])
+        await self._checkpoint_repository.save(
+            SyncCheckpoint(
+                shard=shard,
+                completed=True,
+                watermark=max_watermark,
+            )
+        )
+
+    async def _list_pages(
+        self, prefix: str, malicious: bool
+    ) -> AsyncGenerator[list[NotExtractedFile], None]:
+        queue: asyncio.Queue[Optional[list[NotExtractedFile]]] = asyncio.Queue(
+            maxsize=self._queue_depth
+        )
+        semaphore = asyncio.Semaphore(self._max_listers)
+
+        async def list_shard(start_after: Optional[str], end_at: Optional[str]) -> None:
+            async with semaphore:
+                async for files in self._storage_service.paginate_by_prefix(
+                    prefix=prefix,
+                    malicious=malicious,
+                    page_size=1_000,
+                    start_after=start_after,
+                    end_at=end_at,
+                ):
+                    await queue.put(files)
+
+        async def list_shards() -> None:
+            await asyncio.gather(
+                *[
+                    list_shard(start_after=start_after, end_at=end_at)
+                    for start_after, end_at in self._get_shards(prefix=prefix)
+                ]
+            )
+            await queue.put(None)
+
+        def stop_on_error(task: asyncio.Future) -> None:
+            if not task.cancelled() and task.exception() is not None:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+        producer = asyncio.ensure_future(list_shards())
+        producer.add_done_callback(stop_on_error)
+        try:
+            while (files := await queue.get()) is not None:
+                yield files
+            await producer
+        finally:
+            producer.cancel()
+
+    async def _upsert(
+        self,
+        queue: asyncio.Queue[Optional[SyncBatch]],
+        sync_time: datetime.datetime,
+    ) -> None:
+        while (batch := await queue.get()) is not None:
+            logger.info(f"Upserting {len(batch.files)} files")
+            if batch.insert_only:
+                await self._file_repository.insert_new_many(
+                    files=batch.files, sync_time=sync_time
+                )
+            else:
+                await self._file_repository.upsert_many(
+                    files=batch.files, sync_time=sync_time
+                )
+            batch.ack.set_result(None)
+
+    def _get_shards(self, prefix: str) -> list[tuple[Optional[str], Optional[str]]]:
+        if not self._shard_alphabet:
+            return [(None, None)]
+
+        boundaries = [
+            prefix + "".join(chars)
+            for chars in itertools.product(
+                self._shard_alphabet, repeat=self._shard_depth
+            )
+        ]
+        return list(zip([None, *boundaries], [*boundaries, None]))
@@ -1,24 +1,52 @@
+import datetime
 from functools import cached_property
+from typing import Optional
 
 from common.pgsql import PgsqlSettings
 from common.settings import WorkerSettings
 from domain.file_data.command.extract import ExtractCommand
+from domain.file_data.command.local_extract import LocalExtractCommand
+from domain.file_data.command.stream_extract import StreamExtractCommand
 from domain.file_data.command.sync import SyncCommand
-from domain.file_data.repository.interface import FileRepositoryInterface
+from domain.file_data.processor_container import FileProcessorContainer
+from domain.file_data.repository.interface import (
+    ExtractCandidateRepositoryInterface,
+    ExtractedFileRepositoryInterface,
+    ExtractionCacheRepositoryInterface,
+    ExtractQueueRepositoryInterface,
+    FileRepositoryInterface,
+    SyncCheckpointRepositoryInterface,
+)
 from domain.file_data.service.file_storage_service import StorageServiceInterface
 from presistence.repository.mapper.fields.file import FileRepositoryFields
 
 
-class FileDataContainer:
+class FileDataContainer(FileProcessorContainer):
     storage_service: StorageServiceInterface
     file_repository: FileRepositoryInterface
+    checkpoint_repository: SyncCheckpointRepositoryInterface
+    extracted_file_repository: ExtractedFileRepositoryInterface
+    extraction_cache: Optional[ExtractionCacheRepositoryInterface]
+    extract_queue: ExtractQueueRepositoryInterface
+    extract_candidate_repository: ExtractCandidateRepositoryInterface
     pgsql_settings: PgsqlSettings
     settings: WorkerSettings
 
     @cached_property
     def sync_command(self) -> SyncCommand:
         return SyncCommand(
-            storage_service=self.storage_service, file_repository=self.file_repository
+            storage_service=self.storage_service,
+            file_repository=self.file_repository,
+            checkpoint_repository=self.checkpoint_repository,
+            mode=self.settings.SYNC_MODE,
+            watermark_lag=datetime.timedelta(
+                seconds=self.settings.SYNC_WATERMARK_LAG_SECONDS
+            ),
+            shard_alphabet=self.settings.SYNC_SHARD_ALPHABET,
+            shard_depth=self.settings.SYNC_SHARD_DEPTH,
+            max_listers=self.settings.SYNC_MAX_LISTERS,
+            queue_depth=self.settings.SYNC_QUEUE_DEPTH,
+            upsert_workers=self.settings.SYNC_UPSERT_WORKERS,
         )
 
     @cached_property
@@ -31,4 +59,32 @@ class FileDataContainer:
             target_table="extracted_file_metadata",
             spark_url=self.settings.SPARK_MASTER_URL,
             db_table_fields=FileRepositoryFields,
+            jdbc_partitions=self.settings.EXTRACT_JDBC_PARTITIONS,
+            jdbc_fetch_size=self.settings.EXTRACT_JDBC_FETCH_SIZE,
+            process_partitions=self.settings.EXTRACT_PROCESS_PARTITIONS,
+            partition_target_bytes=self.settings.EXTRACT_PARTITION_TARGET_BYTES,
+            partitioner=self.settings.EXTRACT_PARTITIONER,
+            isolate_file_bytes=self.settings.EXTRACT_ISOLATE_FILE_BYTES,
+            file_cost_bytes=self.settings.EXTRACT_FILE_COST_BYTES,
+            pack_max_hashes=self.settings.EXTRACT_PACK_MAX_HASHES,
+            write_partitions=self.settings.EXTRACT_WRITE_PARTITIONS,
+        )
+
+    @cached_property
+    def local_extract_command(self) -> LocalExtractCommand:
+        return LocalExtractCommand(
+            extract_candidate_repository=self.extract_candidate_repository,
+            extracted_file_repository=self.extracted_file_repository,
+            file_processor=self.file_processor,
+            write_batch_size=self.settings.EXTRACT_WRITE_BATCH_SIZE,
+        )
+
+    @cached_property
+    def stream_extract_command(self) -> StreamExtractCommand:
+        return StreamExtractCommand(
+            extract_queue=self.extract_queue,
+            file_processor=self.file_processor,
+            extracted_file_repository=self.extracted_file_repository,
+            batch_size=self.settings.EXTRACT_STREAM_BATCH_SIZE,
+            idle_timeout=self.settings.EXTRACT_STREAM_IDLE_TIMEOUT_SECONDS,
         )
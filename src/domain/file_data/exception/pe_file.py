@@ -1,5 +1,7 @@
 class ExtractingFileError(Exception):
-    __slots__ = ("message",)
+    __slots__ = ("message", "cause", "transient")
 
-    def __init__(self, message: str):
+    def __init__(self, message: str, cause: str = "unknown", transient: bool = False):
         self.message = message
+        self.cause = cause
+        self.transient = transient
@@ -0,0 +1,5 @@
+class StorageThrottledError(Exception):
+    __slots__ = ("message",)
+
+    def __init__(self, message: str):
+        self.message = message
@@ -0,0 +1,193 @@
+import asyncio
+import atexit
+from dataclasses import replace
+from functools import cached_property, partial
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import pyarrow as pa
+from pyspark import Accumulator, AccumulatorParam, Row
+
+from common.metrics import MetricsRegistry, metrics
+from common.pgsql import PSQLDatabase
+from common.settings import WorkerSettings
+from domain.file_data.processor_container import FileProcessorContainer
+from domain.file_data.repository.mapper.spark_row import SparkRowMapper
+from domain.file_data.service.file_storage_service import StorageServiceInterface
+from presistence.container import PersistentLayerContainer
+
+
+class ExecutorContainer(PersistentLayerContainer, FileProcessorContainer):
+    def __init__(self, settings: WorkerSettings):
+        self.settings = settings
+
+    @cached_property
+    def max_pool_connections(self) -> int:
+        return (
+            self.settings.S3_MAX_POOL_CONNECTIONS or self.settings.EXTRACT_CONCURRENCY
+        )
+
+    @cached_property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return asyncio.new_event_loop()
+
+    @cached_property
+    def storage_service(self) -> StorageServiceInterface:
+        storage_service = super().storage_service
+        self.loop.run_until_complete(storage_service.initialize())
+        return storage_service
+
+    @cached_property
+    def database(self) -> PSQLDatabase:
+        database = PSQLDatabase(replace(self.pgsql_settings, pool_min_size=1))
+        self.loop.run_until_complete(database.initialize())
+        return database
+
+    def close(self) -> None:
+        if "database" in self.__dict__:
+            self.loop.run_until_complete(self.database.pool.close())
+        if "storage_service" in self.__dict__:
+            self.loop.run_until_complete(self.storage_service.close())
+        self.shutdown_pools()
+        if "loop" in self.__dict__:
+            self.loop.close()
+
+
+class MetricsAccumulatorParam(AccumulatorParam):
+    def zero(self, value: dict[str, Any]) -> dict[str, Any]:
+        return {"counters": {}, "histograms": {}}
+
+    def addInPlace(
+        self, value1: dict[str, Any], value2: dict[str, Any]
+    ) -> dict[str, Any]:
+        registry = MetricsRegistry()
+        registry.merge(value1)
+        registry.merge(value2)
+        return registry.drain()
+
+
+_executor_container: Optional[ExecutorContainer] = None
+
+
+def get_executor_container() -> ExecutorContainer:
+    global _executor_container
+
+    if _executor_container is None:
+        _executor_container = ExecutorContainer(WorkerSettings())
+        atexit.register(_executor_container.close)
+    return _executor_container
+
+
+def process_record_batches(
+    schema: pa.Schema, batches: Iterator[pa.RecordBatch]
+) -> Iterator[pa.RecordBatch]:
+    container = get_executor_container()
+    duplicate_files: dict[str, list[tuple[str, bool]]] = {}
+
+    def representatives() -> Iterator[Row]:
+        rows = (row for batch in batches for row in batch.to_pylist())
+        for file_hash, group in groupby(rows, key=itemgetter("hash")):
+            representative, *duplicates = group
+            files = [
+                (duplicate["name"], duplicate["malicious"]) for duplicate in duplicates
+            ]
+            if file_hash in duplicate_files:
+                duplicate_files[file_hash].extend(
+                    [(representative["name"], representative["malicious"]), *files]
+                )
+                continue
+            duplicate_files[file_hash] = files
+            yield Row(**representative)
+
+    for extracted_batch in container.file_processor.stream_batches(
+        representatives(),
+        batch_size=container.settings.EXTRACT_RESULT_BATCH_SIZE,
+        loop=container.loop,
+    ):
+        yield _fan_out(extracted_batch.to_arrow(schema), duplicate_files)
+
+
+def _fan_out(
+    batch: pa.RecordBatch, duplicate_files: dict[str, list[tuple[str, bool]]]
+) -> pa.RecordBatch:
+    indices: list[int] = []
+    names: list[str] = []
+    malicious: list[bool] = []
+    for index, (name, is_malicious, file_hash) in enumerate(
+        zip(
+            batch.column("name").to_pylist(),
+            batch.column("malicious").to_pylist(),
+            batch.column("hash").to_pylist(),
+        )
+    ):
+        files = ((name, is_malicious), *duplicate_files.pop(file_hash, ()))
+        for file_name, file_malicious in files:
+            indices.append(index)
+            names.append(file_name)
+            malicious.append(file_malicious)
+
+    if len(indices) == batch.num_rows:
+        return batch
+    expanded = batch.take(pa.array(indices))
+    replaced = {"name": names, "malicious": malicious}
+    return pa.RecordBatch.from_arrays(
+        [
+            (
+                pa.array(replaced[field.name], field.type)
+                if field.name in replaced
+                else column
+            )
+            for field, column in zip(expanded.schema, expanded.columns)
+        ],
+        schema=expanded.schema,
+    )
+
+
+def write_partition(partition: Iterator[Row]) -> None:
+    container = get_executor_container()
+    container.loop.run_until_complete(
+        container.extracted_file_repository.upsert_many(
+            files=(SparkRowMapper.to_extracted_file(row) for row in partition)
+        )
+    )
+
+
+def map_with_metrics(
+    function: Callable[[Iterator[Any]], Iterable[Any]],
+    stage: str,
+    accumulator: Optional[Accumulator] = None,
+) -> Callable[[Iterator[Any]], Iterator[Any]]:
+    return partial(_map_with_metrics, function, stage, accumulator)
+
+
+def foreach_with_metrics(
+    function: Callable[[Iterator[Row]], None],
+    stage: str,
+    accumulator: Optional[Accumulator] = None,
+) -> Callable[[Iterator[Row]], None]:
+    return partial(_foreach_with_metrics, function, stage, accumulator)
+
+
+def _map_with_metrics(
+    function: Callable[[Iterator[Any]], Iterable[Any]],
+    stage: str,
+    accumulator: Optional[Accumulator],
+    partition: Iterator[Any],
+) -> Iterator[Any]:
+    with metrics.timer("spark_task_seconds", stage=stage):
+        yield from function(partition)
+    if accumulator is not None:
+        accumulator.add(metrics.drain())
+
+
+def _foreach_with_metrics(
+    function: Callable[[Iterator[Row]], None],
+    stage: str,
+    accumulator: Optional[Accumulator],
+    partition: Iterator[Row],
+) -> None:
+    with metrics.timer("spark_task_seconds", stage=stage):
+        function(partition)
+    if accumulator is not None:
+        accumulator.add(metrics.drain())
@@ -1,76 +1,278 @@
 import asyncio
 import datetime
 import logging
-from typing import Iterator
+import time
+from typing import AsyncGenerator, Iterable, Iterator, Optional, TypeVar
 
 from pyspark import Row
 
-from common.settings import WorkerSettings
+from common.concurrency import AdaptiveConcurrencyLimiter
+from common.metrics import metrics
 from domain.file_data.exception.pe_file import ExtractingFileError
+from domain.file_data.exception.storage import StorageThrottledError
 from domain.file_data.handler.pe_file import PeFileHandler
-from presistence.service.s3 import S3FileService
+from domain.file_data.handler.pe_header import PeHeaderFileHandler
+from domain.file_data.model.extracted_batch import ExtractedBatch
+from domain.file_data.model.extraction_cache import ExtractionCacheEntry
+from domain.file_data.model.pe_file_data import PeFileData
+from domain.file_data.repository.interface import ExtractionCacheRepositoryInterface
+from domain.file_data.service.file_storage_service import StorageServiceInterface
 
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class FileProcessor:
-    __slots__ = ("_s3_file_service", "_pe_file_handler")
+    __slots__ = (
+        "_s3_file_service",
+        "_pe_file_handler",
+        "_pe_header_handler",
+        "_concurrency",
+        "_extraction_cache",
+        "_cache_poll_interval",
+        "_concurrency_limiter",
+        "_throttle_retries",
+        "_throttle_backoff",
+    )
 
-    def __init__(self, s3_file_service: S3FileService, pe_file_handler: PeFileHandler):
+    def __init__(
+        self,
+        s3_file_service: StorageServiceInterface,
+        pe_file_handler: PeFileHandler,
+        pe_header_handler: Optional[PeHeaderFileHandler] = None,
+        concurrency: int = 32,
+        extraction_cache: Optional[ExtractionCacheRepositoryInterface] = None,
+        cache_poll_interval: float = 1.0,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        throttle_retries: int = 3,
+        throttle_backoff: float = 0.1,
+    ):
         self._s3_file_service = s3_file_service
         self._pe_file_handler = pe_file_handler
+        self._pe_header_handler = pe_header_handler
+        self._concurrency = concurrency
+        self._extraction_cache = extraction_cache
+        self._cache_poll_interval = cache_poll_interval
+        self._concurrency_limiter = concurrency_limiter
+        self._throttle_retries = throttle_retries
+        self._throttle_backoff = throttle_backoff
+
+    async def _extract_file_data(self, file_row: Row) -> PeFileData:
+        if self._pe_header_handler is not None:
+            try:
+                return await self._pe_header_handler.execute(file_key=file_row.name)
+            except ExtractingFileError as error:
+                metrics.inc("pe_header_fallbacks_total", cause=error.cause)
+                logger.info(
+                    f"Falling back to full download of {file_row.name}: "
+                    f"{error.message}"
+                )
 
-    async def _download_and_extract_file_data(self, file_row: Row) -> Row:
         file_obj = await self._s3_file_service.get_streaming_body_by_key(
             file_key=file_row.name
         )
+        return await self._pe_file_handler.execute(file_data=file_obj)
+
+    async def _extract_file_data_adaptively(self, file_row: Row) -> PeFileData:
+        limiter = self._concurrency_limiter
+        attempt = 0
+        while True:
+            start_time = time.perf_counter()
+            try:
+                pe_file_data = await self._extract_file_data(file_row)
+            except StorageThrottledError as error:
+                if limiter is not None:
+                    limiter.on_throttle()
+                if attempt >= self._throttle_retries:
+                    raise
+                logger.info(f"Retrying {file_row.name}: {error.message}")
+                await asyncio.sleep(self._throttle_backoff * 2**attempt)
+                attempt += 1
+                continue
+
+            if limiter is not None:
+                limiter.on_success(latency=time.perf_counter() - start_time)
+                if self._pe_file_handler.saturated:
+                    limiter.on_overload()
+            return pe_file_data
+
+    async def _get_cached_entry(self, file_row: Row) -> Optional[ExtractionCacheEntry]:
+        if self._extraction_cache is None:
+            return None
+
+        while True:
+            claim = await self._extraction_cache.claim(hash=file_row.hash)
+            if claim.claimed:
+                return None
+            if claim.entry is not None:
+                return claim.entry
+            await asyncio.sleep(self._cache_poll_interval)
+
+    async def _download_and_extract_file_data(
+        self, file_row: Row
+    ) -> tuple[Row, ExtractionCacheEntry]:
+        with metrics.in_flight("file_processor_in_flight"):
+            entry = await self._get_file_data(file_row)
+        metrics.inc("extracted_files_total", status=entry.status)
+        return file_row, entry
+
+    async def _get_file_data(self, file_row: Row) -> ExtractionCacheEntry:
+        entry = await self._get_cached_entry(file_row)
+        if entry is not None:
+            return entry
 
+        stored = False
         try:
-            pe_file_data = await self._pe_file_handler.execute(file_data=file_obj)
+            entry, cacheable = await self._extract_entry(file_row)
+            if cacheable and self._extraction_cache is not None:
+                await self._extraction_cache.store(entry=entry)
+                stored = True
+            return entry
+        finally:
+            if not stored and self._extraction_cache is not None:
+                await self._extraction_cache.release(hash=file_row.hash)
 
+    async def _extract_entry(self, file_row: Row) -> tuple[ExtractionCacheEntry, bool]:
+        try:
+            pe_file_data = await self._extract_file_data_adaptively(file_row)
         except ExtractingFileError as error:
             logger.error(error, exc_info=True)
-            return Row(
-                name=file_row.name,
-                hash=file_row.hash,
-                size=file_row.size,
-                architecture=None,
-                num_imports=None,
-                num_exports=None,
-                type=None,
-                status="ERROR",
-                malicious=file_row.malicious,
-                created_at=datetime.datetime.now(tz=datetime.timezone.utc),
+            metrics.inc("extract_errors_total", cause=error.cause)
+            return (
+                ExtractionCacheEntry(hash=file_row.hash, status="ERROR"),
+                not error.transient,
             )
+        except StorageThrottledError as error:
+            logger.error(f"Giving up on {file_row.name}: {error.message}")
+            metrics.inc("extract_errors_total", cause=type(error).__name__)
+            return ExtractionCacheEntry(hash=file_row.hash, status="ERROR"), False
+        except Exception as error:
+            logger.exception(f"Failed to extract {file_row.name}: {error}")
+            metrics.inc("extract_errors_total", cause=type(error).__name__)
+            return ExtractionCacheEntry(hash=file_row.hash, status="ERROR"), False
 
-        return Row(
-            name=file_row.name,
+        entry = ExtractionCacheEntry(
             hash=file_row.hash,
-            size=file_row.size,
+            status="EXTRACTED",
             architecture=pe_file_data.arch,
             num_imports=pe_file_data.num_imports,
             num_exports=pe_file_data.num_exports,
             type=pe_file_data.file_type,
-            status="EXTRACTED",
+        )
+        return entry, True
+
+    @staticmethod
+    def _to_row(file_row: Row, entry: ExtractionCacheEntry) -> Row:
+        return Row(
+            name=file_row.name,
+            hash=file_row.hash,
+            size=file_row.size,
+            architecture=entry.architecture,
+            num_imports=entry.num_imports,
+            num_exports=entry.num_exports,
+            type=entry.type,
+            status=entry.status,
             malicious=file_row.malicious,
             created_at=datetime.datetime.now(tz=datetime.timezone.utc),
         )
 
-    async def _process_files_async(self, file_rows: list[Row]) -> list[Row]:
-        tasks = [
-            self._download_and_extract_file_data(file_row) for file_row in file_rows
-        ]
-        return await asyncio.gather(*tasks)
+    async def process(self, file_rows: Iterable[Row]) -> AsyncGenerator[Row, None]:
+        entries = self._process_entries(file_rows)
+        try:
+            async for file_row, entry in entries:
+                yield self._to_row(file_row=file_row, entry=entry)
+        finally:
+            await entries.aclose()
 
-    def execute(self, file_rows: list[Row]) -> list[Row]:
-        return asyncio.run(self._process_files_async(file_rows))
+    async def process_batches(
+        self, file_rows: Iterable[Row], batch_size: int
+    ) -> AsyncGenerator[ExtractedBatch, None]:
+        entries = self._process_entries(file_rows)
+        batch = ExtractedBatch(capacity=batch_size)
+        try:
+            async for file_row, entry in entries:
+                batch.append(file_row=file_row, entry=entry)
+                if batch.full:
+                    yield batch
+                    batch = ExtractedBatch(capacity=batch_size)
+        finally:
+            await entries.aclose()
+        if len(batch):
+            yield batch
 
+    async def _process_entries(
+        self, file_rows: Iterable[Row]
+    ) -> AsyncGenerator[tuple[Row, ExtractionCacheEntry], None]:
+        rows = iter(file_rows)
+        pending: set[asyncio.Future[tuple[Row, ExtractionCacheEntry]]] = set()
+        exhausted = False
 
-def process_partition(partition: Iterator[Row]) -> list[Row]:
-    settings = WorkerSettings()
-    processor = FileProcessor(
-        s3_file_service=S3FileService(bucket_name=settings.AWS_BUCKET_NAME),
-        pe_file_handler=PeFileHandler(),
-    )
-    return processor.execute(list(partition))
+        try:
+            while True:
+                while not exhausted and len(pending) < self._get_concurrency():
+                    file_row = next(rows, None)
+                    if file_row is None:
+                        exhausted = True
+                        break
+                    pending.add(
+                        asyncio.ensure_future(
+                            self._download_and_extract_file_data(file_row)
+                        )
+                    )
+
+                if not pending:
+                    return
+
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def _get_concurrency(self) -> int:
+        if self._concurrency_limiter is None:
+            return self._concurrency
+        return self._concurrency_limiter.limit
+
+    def stream(
+        self,
+        file_rows: Iterable[Row],
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> Iterator[Row]:
+        return self._iterate(self.process(file_rows), loop=loop)
+
+    def stream_batches(
+        self,
+        file_rows: Iterable[Row],
+        batch_size: int,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> Iterator[ExtractedBatch]:
+        return self._iterate(
+            self.process_batches(file_rows, batch_size=batch_size), loop=loop
+        )
+
+    @staticmethod
+    def _iterate(
+        results: AsyncGenerator[T, None],
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> Iterator[T]:
+        event_loop = loop or asyncio.new_event_loop()
+        try:
+            while True:
+                try:
+                    yield event_loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            event_loop.run_until_complete(results.aclose())
+            if loop is None:
+                event_loop.close()
+
+    def execute(self, file_rows: list[Row]) -> list[Row]:
+        return list(self.stream(file_rows))
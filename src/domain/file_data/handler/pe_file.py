@@ -1,11 +1,15 @@
 import asyncio
 import logging
-from concurrent.futures import ThreadPoolExecutor
+import os
+import tempfile
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, cast
 
 import pefile
 from botocore.exceptions import BotoCoreError
 from botocore.response import StreamingBody
 
+from common.metrics import metrics
 from domain.file_data.exception.pe_file import ExtractingFileError
 from domain.file_data.model.pe_file_data import PeFileData
 
@@ -14,44 +18,145 @@ logger = logging.getLogger(__name__)
 
 
 class PeFileHandler:
-    __slots__ = ("_pool",)
+    __slots__ = (
+        "_pool",
+        "_parser_pool",
+        "_spill_threshold",
+        "_spill_dir",
+        "_chunk_size",
+        "_max_pending_parses",
+        "_pending_parses",
+    )
 
-    def __init__(self) -> None:
-        self._pool = ThreadPoolExecutor()
+    def __init__(
+        self,
+        parser_pool: Optional[Executor] = None,
+        pool: Optional[ThreadPoolExecutor] = None,
+        spill_threshold: int = 0,
+        spill_dir: Optional[str] = None,
+        chunk_size: int = 1024 * 1024,
+        max_pending_parses: int = 0,
+    ) -> None:
+        self._pool = pool or ThreadPoolExecutor()
+        self._parser_pool = parser_pool
+        self._spill_threshold = spill_threshold
+        self._spill_dir = spill_dir
+        self._chunk_size = chunk_size
+        self._max_pending_parses = max_pending_parses
+        self._pending_parses = 0
+
+    @property
+    def saturated(self) -> bool:
+        return 0 < self._max_pending_parses <= self._pending_parses
 
     async def execute(self, file_data: StreamingBody) -> PeFileData:
+        spill_path = None
         try:
-            pe = pefile.PE(
-                data=await self.async_read_streaming_body(streaming_body=file_data),
-                fast_load=True,
-            )
-            pe.parse_data_directories(
-                directories=[
-                    pefile.DIRECTORY_ENTRY["IMAGE_DIRECTORY_ENTRY_IMPORT"],
-                    pefile.DIRECTORY_ENTRY["IMAGE_DIRECTORY_ENTRY_EXPORT"],
-                ]
-            )
-        except (
-            pefile.PEFormatError,
-            BotoCoreError,
-            IOError,
-            asyncio.CancelledError,
-        ) as error:
+            data, spill_path = await self._read(streaming_body=file_data)
+            if spill_path is None:
+                pe_file_data = await self._parse(self.parse, data)
+            else:
+                pe_file_data = await self._parse(self.parse_file, spill_path)
+        except (pefile.PEFormatError, BotoCoreError, IOError) as error:
             logger.exception(error, exc_info=True)
+            metrics.inc("pe_extract_errors_total", cause=type(error).__name__)
             raise ExtractingFileError(
-                f"Error: The file is not a valid PE file or is corrupted. {error}"
+                f"Error: The file is not a valid PE file or is corrupted. {error}",
+                cause=type(error).__name__,
+                transient=not isinstance(error, pefile.PEFormatError),
             )
+        finally:
+            if spill_path is not None:
+                os.remove(spill_path)
+
+        return pe_file_data
+
+    async def _read(self, streaming_body: StreamingBody) -> tuple[bytes, Optional[str]]:
+        if self._spill_threshold <= 0:
+            return await self.async_read_streaming_body(streaming_body), None
+
+        loop = asyncio.get_event_loop()
+        chunks: list[bytes] = []
+        size = 0
+        spill_file = None
+        try:
+            while chunk := await self.async_read_streaming_body(
+                streaming_body, chunk_size=self._chunk_size
+            ):
+                size += len(chunk)
+                if spill_file is None and size > self._spill_threshold:
+                    spill_file = tempfile.NamedTemporaryFile(
+                        dir=self._spill_dir, suffix=".pe", delete=False
+                    )
+                    await loop.run_in_executor(
+                        self._pool, spill_file.writelines, chunks
+                    )
+                    chunks = []
+                if spill_file is None:
+                    chunks.append(chunk)
+                else:
+                    await loop.run_in_executor(self._pool, spill_file.write, chunk)
+        except BaseException:
+            if spill_file is not None:
+                spill_file.close()
+                os.remove(spill_file.name)
+            raise
+
+        if spill_file is None:
+            return b"".join(chunks), None
 
-        file_type = self._get_file_type(pe)
-        arch = self._get_arch(pe)
-        num_imports = self._get_number_of_imports(pe)
-        num_exports = self._get_number_of_exports(pe)
+        spill_file.close()
+        metrics.inc("pe_spilled_files_total")
+        metrics.inc("pe_spilled_bytes_total", size)
+        return b"", spill_file.name
 
+    async def _parse(
+        self, parse: Callable[[Any], PeFileData], source: bytes | str
+    ) -> PeFileData:
+        with metrics.timer("pe_parse_seconds"):
+            if self._parser_pool is None:
+                return parse(source)
+
+            loop = asyncio.get_event_loop()
+            self._pending_parses += 1
+            try:
+                return await loop.run_in_executor(self._parser_pool, parse, source)
+            finally:
+                self._pending_parses -= 1
+
+    @classmethod
+    def parse(cls, data: bytes) -> PeFileData:
+        return cls.get_pe_file_data(cls.load(data))
+
+    @classmethod
+    def parse_file(cls, path: str) -> PeFileData:
+        pe = pefile.PE(name=path, fast_load=True)
+        try:
+            return cls.get_pe_file_data(cls._parse_data_directories(pe))
+        finally:
+            pe.close()
+
+    @classmethod
+    def load(cls, data: bytes) -> pefile.PE:
+        return cls._parse_data_directories(pefile.PE(data=data, fast_load=True))
+
+    @classmethod
+    def _parse_data_directories(cls, pe: pefile.PE) -> pefile.PE:
+        pe.parse_data_directories(
+            directories=[
+                pefile.DIRECTORY_ENTRY["IMAGE_DIRECTORY_ENTRY_IMPORT"],
+                pefile.DIRECTORY_ENTRY["IMAGE_DIRECTORY_ENTRY_EXPORT"],
+            ]
+        )
+        return pe
+
+    @classmethod
+    def get_pe_file_data(cls, pe: pefile.PE) -> PeFileData:
         return PeFileData(
-            file_type=file_type,
-            arch=arch,
-            num_imports=num_imports,
-            num_exports=num_exports,
+            file_type=cls._get_file_type(pe),
+            arch=cls._get_arch(pe),
+            num_imports=cls._get_number_of_imports(pe),
+            num_exports=cls._get_number_of_exports(pe),
         )
 
     @classmethod
@@ -88,6 +193,9 @@ class PeFileHandler:
     async def async_read_streaming_body(
         self, streaming_body: StreamingBody, chunk_size: int | None = None
     ) -> bytes:
+        if asyncio.iscoroutinefunction(streaming_body.read):
+            return await cast(Any, streaming_body).read(chunk_size)
+
         loop = asyncio.get_event_loop()
         data = await loop.run_in_executor(self._pool, streaming_body.read, chunk_size)
         return data
@@ -0,0 +1,175 @@
+import asyncio
+import bisect
+import logging
+import mmap
+from typing import Optional, Union, cast
+
+import pefile
+from botocore.exceptions import BotoCoreError, ClientError
+
+from domain.file_data.exception.pe_file import ExtractingFileError
+from domain.file_data.exception.storage import StorageThrottledError
+from domain.file_data.handler.pe_file import PeFileHandler
+from domain.file_data.model.pe_file_data import PeFileData
+from domain.file_data.service.file_storage_service import StorageServiceInterface
+
+
+logger = logging.getLogger(__name__)
+
+
+class SparseFileImage:
+    __slots__ = ("_buffer", "_starts", "_ends", "missing")
+
+    def __init__(self, size: int):
+        self._buffer = mmap.mmap(-1, size)
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        self.missing: list[tuple[int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[int, bytes]:
+        if isinstance(key, slice):
+            start, stop, _ = key.indices(len(self._buffer))
+            self._touch(start, stop)
+        else:
+            index = key if key >= 0 else len(self._buffer) + key
+            self._touch(index, index + 1)
+        return self._buffer[key]
+
+    def find(self, sub: bytes, start: int = 0, end: Optional[int] = None) -> int:
+        end = len(self._buffer) if end is None else min(end, len(self._buffer))
+        self._touch(start, end)
+        return self._buffer.find(sub, start, end)
+
+    def write(self, start: int, data: bytes) -> None:
+        end = start + len(data)
+        self._buffer[start:end] = data
+
+        index = bisect.bisect_left(self._ends, start)
+        while index < len(self._starts) and self._starts[index] <= end:
+            start = min(start, self._starts[index])
+            end = max(end, self._ends[index])
+            del self._starts[index]
+            del self._ends[index]
+        self._starts.insert(index, start)
+        self._ends.insert(index, end)
+
+    def close(self) -> None:
+        self._buffer.close()
+
+    def _touch(self, start: int, stop: int) -> None:
+        index = bisect.bisect_right(self._ends, start)
+        while start < stop:
+            if index >= len(self._starts) or stop <= self._starts[index]:
+                self.missing.append((start, stop))
+                return
+            if start < self._starts[index]:
+                self.missing.append((start, self._starts[index]))
+            start = self._ends[index]
+            index += 1
+
+
+class PeHeaderFileHandler:
+    __slots__ = (
+        "_storage_service",
+        "_probe_size",
+        "_max_bytes",
+        "_max_rounds",
+        "_merge_gap",
+    )
+
+    def __init__(
+        self,
+        storage_service: StorageServiceInterface,
+        probe_size: int = 4_096,
+        max_bytes: int = 8 * 1024 * 1024,
+        max_rounds: int = 8,
+        merge_gap: int = 4_096,
+    ):
+        self._storage_service = storage_service
+        self._probe_size = probe_size
+        self._max_bytes = max_bytes
+        self._max_rounds = max_rounds
+        self._merge_gap = merge_gap
+
+    async def execute(self, file_key: str) -> PeFileData:
+        try:
+            probe = await self._storage_service.get_range_by_key(
+                file_key=file_key, start=0, end=self._probe_size - 1
+            )
+            if not probe.total_size:
+                raise ExtractingFileError(
+                    f"Error: The file {file_key} is empty.", cause="Empty"
+                )
+
+            image = SparseFileImage(size=probe.total_size)
+            try:
+                image.write(probe.start, probe.data)
+                return await self._extract(
+                    file_key=file_key, image=image, fetched=len(probe.data)
+                )
+            finally:
+                image.close()
+
+        except (
+            pefile.PEFormatError,
+            BotoCoreError,
+            ClientError,
+            StorageThrottledError,
+            IOError,
+        ) as error:
+            raise ExtractingFileError(
+                f"Error: Could not extract {file_key} from its headers. {error}",
+                cause=type(error).__name__,
+            )
+
+    async def _extract(
+        self, file_key: str, image: SparseFileImage, fetched: int
+    ) -> PeFileData:
+        for _ in range(self._max_rounds):
+            image.missing.clear()
+            try:
+                pe: Optional[pefile.PE] = PeFileHandler.load(cast(bytes, image))
+            except pefile.PEFormatError:
+                if not image.missing:
+                    raise
+                pe = None
+
+            if pe is not None and not image.missing:
+                logger.debug(f"Extracted {file_key} from {fetched} bytes")
+                return PeFileHandler.get_pe_file_data(pe)
+
+            ranges = self._merge_ranges(image.missing)
+            fetched += sum(end - start for start, end in ranges)
+            if fetched > self._max_bytes:
+                raise ExtractingFileError(
+                    f"Error: Headers of {file_key} exceed {self._max_bytes} bytes.",
+                    cause="HeadersTooLarge",
+                )
+
+            file_ranges = await asyncio.gather(
+                *[
+                    self._storage_service.get_range_by_key(
+                        file_key=file_key, start=start, end=end - 1
+                    )
+                    for start, end in ranges
+                ]
+            )
+            for file_range in file_ranges:
+                image.write(file_range.start, file_range.data)
+
+        raise ExtractingFileError(
+            f"Error: Headers of {file_key} not resolved in {self._max_rounds} rounds.",
+            cause="HeadersUnresolved",
+        )
+
+    def _merge_ranges(self, ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        merged: list[tuple[int, int]] = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + self._merge_gap:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class ExtractQueueItem:
+    id: int
+    name: str
+    hash: str
+    size: int
+    malicious: bool
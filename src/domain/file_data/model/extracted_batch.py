@@ -0,0 +1,116 @@
+import datetime
+from typing import Optional
+
+import numpy as np
+import pyarrow as pa
+from pyspark import Row
+
+from domain.file_data.model.extraction_cache import ExtractionCacheEntry
+
+
+class StringDictionary:
+    __slots__ = ("_values", "_codes")
+
+    def __init__(self) -> None:
+        self._values: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._values)
+            self._values.append(value)
+        return code
+
+    def to_arrow(self, codes: np.ndarray) -> pa.DictionaryArray:
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, mask=codes < 0), pa.array(self._values, pa.string())
+        )
+
+
+class ExtractedBatch:
+    __slots__ = (
+        "_capacity",
+        "_size",
+        "_created_at",
+        "_names",
+        "_hashes",
+        "_sizes",
+        "_malicious",
+        "_num_imports",
+        "_num_exports",
+        "_architectures",
+        "_types",
+        "_statuses",
+        "_architecture_dictionary",
+        "_type_dictionary",
+        "_status_dictionary",
+    )
+
+    def __init__(self, capacity: int):
+        self._capacity = capacity
+        self._size = 0
+        self._created_at = datetime.datetime.now(tz=datetime.timezone.utc)
+        self._names: list[str] = [""] * capacity
+        self._hashes: list[str] = [""] * capacity
+        self._sizes = np.zeros(capacity, dtype=np.int64)
+        self._malicious = np.zeros(capacity, dtype=np.bool_)
+        self._num_imports = np.full(capacity, -1, dtype=np.int64)
+        self._num_exports = np.full(capacity, -1, dtype=np.int64)
+        self._architectures = np.full(capacity, -1, dtype=np.int32)
+        self._types = np.full(capacity, -1, dtype=np.int32)
+        self._statuses = np.full(capacity, -1, dtype=np.int32)
+        self._architecture_dictionary = StringDictionary()
+        self._type_dictionary = StringDictionary()
+        self._status_dictionary = StringDictionary()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def full(self) -> bool:
+        return self._size == self._capacity
+
+    def append(self, file_row: Row, entry: ExtractionCacheEntry) -> None:
+        if self.full:
+            raise IndexError(f"Batch is full, capacity: {self._capacity}")
+
+        index = self._size
+        self._names[index] = file_row.name
+        self._hashes[index] = file_row.hash
+        self._sizes[index] = file_row.size
+        self._malicious[index] = file_row.malicious
+        if entry.num_imports is not None:
+            self._num_imports[index] = entry.num_imports
+        if entry.num_exports is not None:
+            self._num_exports[index] = entry.num_exports
+        self._architectures[index] = self._architecture_dictionary.encode(
+            entry.architecture
+        )
+        self._types[index] = self._type_dictionary.encode(entry.type)
+        self._statuses[index] = self._status_dictionary.encode(entry.status)
+        self._size += 1
+
+    def to_arrow(self, schema: pa.Schema) -> pa.RecordBatch:
+        size = self._size
+        num_imports = self._num_imports[:size]
+        num_exports = self._num_exports[:size]
+        columns: dict[str, pa.Array] = {
+            "name": pa.array(self._names[:size], pa.string()),
+            "hash": pa.array(self._hashes[:size], pa.string()),
+            "size": pa.array(self._sizes[:size]),
+            "architecture": self._architecture_dictionary.to_arrow(
+                self._architectures[:size]
+            ),
+            "num_imports": pa.array(num_imports, mask=num_imports < 0),
+            "num_exports": pa.array(num_exports, mask=num_exports < 0),
+            "type": self._type_dictionary.to_arrow(self._types[:size]),
+            "status": self._status_dictionary.to_arrow(self._statuses[:size]),
+            "malicious": pa.array(self._malicious[:size]),
+            "created_at": pa.repeat(pa.scalar(self._created_at), size),
+        }
+        return pa.RecordBatch.from_arrays(
+            [columns[field.name].cast(field.type) for field in schema], schema=schema
+        )
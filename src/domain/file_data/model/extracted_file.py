@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass(frozen=True, slots=True)
+class ExtractedFile:
+    name: str
+    hash: str
+    size: int
+    architecture: Optional[str]
+    num_imports: Optional[int]
+    num_exports: Optional[int]
+    type: Optional[str]
+    status: str
+    malicious: bool
+    created_at: datetime
@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True, slots=True)
+class ExtractionCacheEntry:
+    hash: str
+    status: str
+    architecture: Optional[str] = None
+    num_imports: Optional[int] = None
+    num_exports: Optional[int] = None
+    type: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class ExtractionCacheClaim:
+    claimed: bool
+    entry: Optional[ExtractionCacheEntry] = None
@@ -0,0 +1,8 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class FileRange:
+    data: bytes
+    start: int
+    total_size: int
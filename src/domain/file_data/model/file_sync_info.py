@@ -1,4 +1,6 @@
 from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
 
 
 @dataclass(frozen=True, slots=True)
@@ -7,3 +9,4 @@ class NotExtractedFile:
     hash: str
     size: int
     malicious: bool
+    last_modified: Optional[datetime] = None
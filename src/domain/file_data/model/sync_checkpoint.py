@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass(frozen=True, slots=True)
+class SyncCheckpoint:
+    shard: str
+    completed: bool
+    last_key: Optional[str] = None
+    watermark: Optional[datetime] = None
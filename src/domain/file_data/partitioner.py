@@ -0,0 +1,35 @@
+import heapq
+from typing import Iterable
+
+
+class SizeBalancedPartitioner:
+    __slots__ = ("_num_partitions", "_isolate_bytes", "_file_cost_bytes")
+
+    def __init__(
+        self, num_partitions: int, isolate_bytes: int = 0, file_cost_bytes: int = 0
+    ):
+        self._num_partitions = max(1, num_partitions)
+        self._isolate_bytes = isolate_bytes
+        self._file_cost_bytes = file_cost_bytes
+
+    def assign(self, sizes: Iterable[tuple[str, int]]) -> tuple[dict[str, int], int]:
+        assignment: dict[str, int] = {}
+        packed: list[tuple[int, str]] = []
+        num_partitions = self._num_partitions
+
+        for key, size in sizes:
+            if 0 < self._isolate_bytes <= size:
+                assignment[key] = num_partitions
+                num_partitions += 1
+            else:
+                packed.append((size, key))
+
+        partitions = [(0, 0, index) for index in range(self._num_partitions)]
+        for size, key in sorted(packed, reverse=True):
+            cost, num_files, index = heapq.heappop(partitions)
+            assignment[key] = index
+            heapq.heappush(
+                partitions,
+                (cost + size + self._file_cost_bytes, num_files + 1, index),
+            )
+        return assignment, num_partitions
@@ -0,0 +1,82 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import cached_property
+from typing import Optional
+
+from common.concurrency import AdaptiveConcurrencyLimiter
+from common.settings import WorkerSettings
+from domain.file_data.file_processor import FileProcessor
+from domain.file_data.handler.pe_file import PeFileHandler
+from domain.file_data.handler.pe_header import PeHeaderFileHandler
+from domain.file_data.repository.interface import ExtractionCacheRepositoryInterface
+from domain.file_data.service.file_storage_service import StorageServiceInterface
+
+
+class FileProcessorContainer:
+    storage_service: StorageServiceInterface
+    extraction_cache: Optional[ExtractionCacheRepositoryInterface]
+    max_pool_connections: int
+    settings: WorkerSettings
+
+    @cached_property
+    def io_pool(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.max_pool_connections)
+
+    @cached_property
+    def parser_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.settings.PE_PARSER_PROCESSES <= 0:
+            return None
+        return ProcessPoolExecutor(
+            max_workers=self.settings.PE_PARSER_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    @cached_property
+    def pe_file_handler(self) -> PeFileHandler:
+        return PeFileHandler(
+            parser_pool=self.parser_pool,
+            pool=self.io_pool,
+            spill_threshold=self.settings.PE_SPILL_THRESHOLD_BYTES,
+            spill_dir=self.settings.PE_SPILL_DIR,
+            chunk_size=self.settings.PE_READ_CHUNK_SIZE,
+            max_pending_parses=2 * self.settings.PE_PARSER_PROCESSES,
+        )
+
+    @cached_property
+    def pe_header_handler(self) -> Optional[PeHeaderFileHandler]:
+        if not self.settings.EXTRACT_HEADERS_ONLY:
+            return None
+        return PeHeaderFileHandler(
+            storage_service=self.storage_service,
+            probe_size=self.settings.PE_HEADER_PROBE_SIZE,
+            max_bytes=self.settings.PE_HEADER_MAX_BYTES,
+        )
+
+    @cached_property
+    def concurrency_limiter(self) -> Optional[AdaptiveConcurrencyLimiter]:
+        if not self.settings.EXTRACT_ADAPTIVE_CONCURRENCY:
+            return None
+        return AdaptiveConcurrencyLimiter(
+            name="file_processor",
+            min_limit=self.settings.EXTRACT_MIN_CONCURRENCY,
+            max_limit=self.settings.EXTRACT_CONCURRENCY,
+            latency_tolerance=self.settings.EXTRACT_LATENCY_TOLERANCE,
+        )
+
+    @cached_property
+    def file_processor(self) -> FileProcessor:
+        return FileProcessor(
+            s3_file_service=self.storage_service,
+            pe_file_handler=self.pe_file_handler,
+            pe_header_handler=self.pe_header_handler,
+            concurrency=self.settings.EXTRACT_CONCURRENCY,
+            extraction_cache=self.extraction_cache,
+            cache_poll_interval=self.settings.EXTRACTION_CACHE_POLL_INTERVAL_SECONDS,
+            concurrency_limiter=self.concurrency_limiter,
+        )
+
+    def shutdown_pools(self) -> None:
+        if "parser_pool" in self.__dict__ and self.parser_pool is not None:
+            self.parser_pool.shutdown(cancel_futures=True)
+        if "io_pool" in self.__dict__:
+            self.io_pool.shutdown(cancel_futures=True)
@@ -1,7 +1,15 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
+from typing import AsyncIterator, Iterable, Optional
 
+from domain.file_data.model.extract_queue import ExtractQueueItem
+from domain.file_data.model.extracted_file import ExtractedFile
+from domain.file_data.model.extraction_cache import (
+    ExtractionCacheClaim,
+    ExtractionCacheEntry,
+)
 from domain.file_data.model.file_sync_info import NotExtractedFile
+from domain.file_data.model.sync_checkpoint import SyncCheckpoint
 
 
 class FileRepositoryInterface(ABC):
@@ -14,3 +22,84 @@ class FileRepositoryInterface(ABC):
         sync_time: datetime,
     ) -> None:
         ...
+
+    @abstractmethod
+    async def insert_new_many(
+        self,
+        files: list[NotExtractedFile],
+        sync_time: datetime,
+    ) -> None:
+        ...
+
+    @abstractmethod
+    async def delete_missing(
+        self,
+        prefix: str,
+        pages: AsyncIterator[list[NotExtractedFile]],
+        synced_before: datetime,
+    ) -> int:
+        ...
+
+
+class SyncCheckpointRepositoryInterface(ABC):
+    @abstractmethod
+    async def get(self, shard: str) -> Optional[SyncCheckpoint]:
+        ...
+
+    @abstractmethod
+    async def save(self, checkpoint: SyncCheckpoint) -> None:
+        ...
+
+
+class ExtractedFileRepositoryInterface(ABC):
+    @abstractmethod
+    async def upsert_many(self, files: Iterable[ExtractedFile]) -> None:
+        ...
+
+
+class ExtractionCacheRepositoryInterface(ABC):
+    @abstractmethod
+    async def claim(self, hash: str) -> ExtractionCacheClaim:
+        ...
+
+    @abstractmethod
+    async def store(self, entry: ExtractionCacheEntry) -> None:
+        ...
+
+    @abstractmethod
+    async def release(self, hash: str) -> None:
+        ...
+
+
+class ExtractQueueRepositoryInterface(ABC):
+    @abstractmethod
+    async def listen(self) -> None:
+        ...
+
+    @abstractmethod
+    async def close(self) -> None:
+        ...
+
+    @abstractmethod
+    async def wait(self, timeout: float) -> None:
+        ...
+
+    @abstractmethod
+    async def claim(self, limit: int) -> list[ExtractQueueItem]:
+        ...
+
+    @abstractmethod
+    async def complete(self, items: list[ExtractQueueItem]) -> None:
+        ...
+
+
+class ExtractCandidateRepositoryInterface(ABC):
+    @abstractmethod
+    async def get_unprocessed_many(
+        self, quotas: dict[bool, int]
+    ) -> list[NotExtractedFile]:
+        ...
+
+    @abstractmethod
+    async def get_extracted_by_hashes(self, hashes: list[str]) -> list[ExtractedFile]:
+        ...
@@ -0,0 +1,20 @@
+from pyspark import Row
+
+from domain.file_data.model.extracted_file import ExtractedFile
+
+
+class SparkRowMapper:
+    @staticmethod
+    def to_extracted_file(row: Row) -> ExtractedFile:
+        return ExtractedFile(
+            name=row.name,
+            hash=row.hash,
+            size=row.size,
+            architecture=row.architecture,
+            num_imports=row.num_imports,
+            num_exports=row.num_exports,
+            type=row.type,
+            status=row.status,
+            malicious=row.malicious,
+            created_at=row.created_at,
+        )
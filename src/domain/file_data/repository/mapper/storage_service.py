@@ -1,3 +1,5 @@
+from typing import Optional
+
 from domain.file_data.model.file_sync_info import NotExtractedFile
 
 
@@ -9,4 +11,15 @@ class StorageServiceFileMapper:
             hash=s3_file["ETag"].strip('"'),
             size=s3_file["Size"],
             malicious=malicious,
+            last_modified=s3_file.get("LastModified"),
         )
+
+    @classmethod
+    def to_domain_many(
+        cls, s3_files: list[dict], malicious: bool, end_at: Optional[str] = None
+    ) -> list[NotExtractedFile]:
+        return [
+            cls.to_domain(s3_file=s3_file, malicious=malicious)
+            for s3_file in s3_files
+            if end_at is None or s3_file["Key"] <= end_at
+        ]
@@ -1,17 +1,33 @@
 from abc import ABC, abstractmethod
 from io import IOBase
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
+from domain.file_data.model.file_range import FileRange
 from domain.file_data.model.file_sync_info import NotExtractedFile
 
 
 class StorageServiceInterface(ABC):
+    async def initialize(self) -> None:
+        ...
+
+    async def close(self) -> None:
+        ...
+
     @abstractmethod
     async def paginate_by_prefix(
-        self, prefix: str, page_size: int, malicious: bool
+        self,
+        prefix: str,
+        page_size: int,
+        malicious: bool,
+        start_after: Optional[str] = None,
+        end_at: Optional[str] = None,
     ) -> AsyncGenerator[list[NotExtractedFile], None]:
         ...
 
     @abstractmethod
     async def get_streaming_body_by_key(self, file_key: str) -> IOBase:
         ...
+
+    @abstractmethod
+    async def get_range_by_key(self, file_key: str, start: int, end: int) -> FileRange:
+        ...
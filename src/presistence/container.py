@@ -1,23 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
 from functools import cached_property
+from typing import Optional
 
-from common.pgsql import PSQLDatabase
+from common.pgsql import PgsqlSettings, PSQLDatabase
 from common.settings import WorkerSettings
+from domain.file_data.service.file_storage_service import StorageServiceInterface
+from presistence.repository.extract_candidate import PgSqlExtractCandidateRepository
+from presistence.repository.extract_queue import PgSqlExtractQueueRepository
+from presistence.repository.extracted_file import PgSqlExtractedFileRepository
+from presistence.repository.extraction_cache import PgSqlExtractionCacheRepository
 from presistence.repository.file import PgSqlFileRepository
+from presistence.repository.sync_checkpoint import PgSqlSyncCheckpointRepository
+from presistence.service.aio_s3 import AioS3FileService
 from presistence.service.s3 import S3FileService
 
 
 class PersistentLayerContainer:
-    database: PSQLDatabase
+    io_pool: ThreadPoolExecutor
     settings: WorkerSettings
 
     @cached_property
-    def storage_service(self) -> S3FileService:
+    def pgsql_settings(self) -> PgsqlSettings:
+        return PgsqlSettings(
+            host=self.settings.PGSQL_SERVER,
+            port=self.settings.PGSQL_PORT,
+            database=self.settings.PGSQL_DATABASE,
+            user=self.settings.PGSQL_USER,
+            password=self.settings.PGSQL_PASSWORD,
+            pool_max_size=self.settings.PGSQL_POOL_MAX_SIZE,
+        )
+
+    @cached_property
+    def database(self) -> PSQLDatabase:
+        return PSQLDatabase(self.pgsql_settings)
+
+    @cached_property
+    def max_pool_connections(self) -> int:
+        return self.settings.S3_MAX_POOL_CONNECTIONS or max(
+            10, self.settings.SYNC_MAX_LISTERS, self.settings.EXTRACT_CONCURRENCY
+        )
+
+    @cached_property
+    def storage_service(self) -> StorageServiceInterface:
+        if self.settings.S3_BACKEND == "aiobotocore":
+            return AioS3FileService(
+                bucket_name=self.settings.AWS_BUCKET_NAME,
+                max_pool_connections=self.max_pool_connections,
+                endpoint_url=self.settings.S3_ENDPOINT_URL,
+            )
         return S3FileService(
             bucket_name=self.settings.AWS_BUCKET_NAME,
+            pool=self.io_pool,
+            max_pool_connections=self.max_pool_connections,
+            endpoint_url=self.settings.S3_ENDPOINT_URL,
         )
 
     @cached_property
     def file_repository(self) -> PgSqlFileRepository:
         return PgSqlFileRepository(
-            psql_database=self.database, table="storage_file_metadata"
+            psql_database=self.database,
+            table="storage_file_metadata",
+            upsert_method=self.settings.SYNC_UPSERT_METHOD,
+            batch_size=self.settings.SYNC_UPSERT_BATCH_SIZE,
+            queue_table="extract_queue" if self.settings.SYNC_PUBLISH_QUEUE else None,
+        )
+
+    @cached_property
+    def checkpoint_repository(self) -> PgSqlSyncCheckpointRepository:
+        return PgSqlSyncCheckpointRepository(
+            psql_database=self.database, table="storage_sync_checkpoint"
+        )
+
+    @cached_property
+    def extracted_file_repository(self) -> PgSqlExtractedFileRepository:
+        return PgSqlExtractedFileRepository(
+            psql_database=self.database,
+            table="extracted_file_metadata",
+            batch_size=self.settings.EXTRACT_WRITE_BATCH_SIZE,
+        )
+
+    @cached_property
+    def extraction_cache(self) -> Optional[PgSqlExtractionCacheRepository]:
+        if not self.settings.EXTRACTION_CACHE_ENABLED:
+            return None
+        return PgSqlExtractionCacheRepository(
+            psql_database=self.database,
+            table="extracted_file_cache",
+            claim_timeout=self.settings.EXTRACTION_CACHE_CLAIM_TIMEOUT_SECONDS,
+        )
+
+    @cached_property
+    def extract_queue(self) -> PgSqlExtractQueueRepository:
+        return PgSqlExtractQueueRepository(
+            psql_database=self.database,
+            table="extract_queue",
+            lease=self.settings.EXTRACT_STREAM_LEASE_SECONDS,
+        )
+
+    @cached_property
+    def extract_candidate_repository(self) -> PgSqlExtractCandidateRepository:
+        return PgSqlExtractCandidateRepository(
+            psql_database=self.database,
+            source_table="storage_file_metadata",
+            target_table="extracted_file_metadata",
         )
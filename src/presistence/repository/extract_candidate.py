@@ -0,0 +1,56 @@
+from common.pgsql import PSQLDatabase
+from domain.file_data.model.extracted_file import ExtractedFile
+from domain.file_data.model.file_sync_info import NotExtractedFile
+from domain.file_data.repository.interface import ExtractCandidateRepositoryInterface
+from presistence.repository.mapper.extract_candidate import ExtractCandidateSQLMapper
+from presistence.repository.query.extract_candidate import ExtractCandidateQuery
+
+
+class PgSqlExtractCandidateRepository(ExtractCandidateRepositoryInterface):
+    __slots__ = ("_source_table", "_target_table", "_psql_database", "_query")
+
+    def __init__(
+        self, source_table: str, target_table: str, psql_database: PSQLDatabase
+    ):
+        self._source_table = source_table
+        self._target_table = target_table
+        self._psql_database = psql_database
+        self._query = ExtractCandidateQuery(
+            source_table=source_table,
+            target_table=target_table,
+            fields=ExtractCandidateSQLMapper.Fields,
+        )
+
+    async def get_unprocessed_many(
+        self, quotas: dict[bool, int]
+    ) -> list[NotExtractedFile]:
+        quotas = {malicious: num for malicious, num in quotas.items() if num > 0}
+        if not quotas:
+            return []
+
+        async with self._psql_database.pool.acquire() as connection:
+            records = await connection.fetch(self._query.quota(quotas=quotas))
+        return [ExtractCandidateSQLMapper.map_file_from(record) for record in records]
+
+    async def get_extracted_by_hashes(self, hashes: list[str]) -> list[ExtractedFile]:
+        _ = ExtractCandidateSQLMapper.Fields
+        if not hashes:
+            return []
+
+        async with self._psql_database.pool.acquire() as connection:
+            records = await connection.fetch(
+                f"""
+                SELECT e.*
+                FROM {self._target_table} AS e
+                WHERE e.{_.ID} IN (
+                    SELECT min(m.{_.ID})
+                    FROM {self._target_table} AS m
+                    WHERE m.{_.HASH} = ANY($1::text[])
+                    GROUP BY m.{_.HASH}
+                )
+                """,
+                list(set(hashes)),
+            )
+        return [
+            ExtractCandidateSQLMapper.map_extracted_from(record) for record in records
+        ]
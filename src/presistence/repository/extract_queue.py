@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from typing import Any, Optional
+
+from asyncpg import Connection
+
+from common.pgsql import PSQLDatabase
+from domain.file_data.model.extract_queue import ExtractQueueItem
+from domain.file_data.repository.interface import ExtractQueueRepositoryInterface
+from presistence.repository.mapper.extract_queue import ExtractQueueSQLMapper
+
+
+logger = logging.getLogger(__name__)
+
+
+class PgSqlExtractQueueRepository(ExtractQueueRepositoryInterface):
+    __slots__ = ("_table", "_psql_database", "_lease", "_listener", "_notified")
+
+    def __init__(self, table: str, psql_database: PSQLDatabase, lease: float = 600):
+        self._table = table
+        self._psql_database = psql_database
+        self._lease = lease
+        self._listener: Optional[Connection] = None
+        self._notified = asyncio.Event()
+
+    async def listen(self) -> None:
+        if self._listener is None:
+            self._listener = await self._psql_database.pool.acquire()
+            await self._listener.add_listener(self._table, self._on_notification)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            await self._listener.remove_listener(self._table, self._on_notification)
+            await self._psql_database.pool.release(self._listener)
+            self._listener = None
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._notified.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._notified.clear()
+
+    async def claim(self, limit: int) -> list[ExtractQueueItem]:
+        _ = ExtractQueueSQLMapper.Fields
+
+        async with self._psql_database.pool.acquire() as connection:
+            records = await connection.fetch(
+                f"""
+                UPDATE {self._table}
+                SET {_.CLAIMED_AT} = now()
+                WHERE {_.ID} IN (
+                    SELECT {_.ID}
+                    FROM {self._table}
+                    WHERE {_.CLAIMED_AT} IS NULL
+                    OR {_.CLAIMED_AT} < now() - make_interval(secs => $2)
+                    ORDER BY {_.ID}
+                    LIMIT $1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {_.ID}, {_.NAME}, {_.HASH}, {_.SIZE}, {_.MALICIOUS}
+                """,
+                limit,
+                float(self._lease),
+            )
+
+        return sorted(
+            (ExtractQueueSQLMapper.map_from(record) for record in records),
+            key=lambda item: item.id,
+        )
+
+    async def complete(self, items: list[ExtractQueueItem]) -> None:
+        _ = ExtractQueueSQLMapper.Fields
+
+        async with self._psql_database.pool.acquire() as connection:
+            await connection.execute(
+                f"DELETE FROM {self._table} WHERE {_.ID} = ANY($1::bigint[])",
+                [item.id for item in items],
+            )
+
+    def _on_notification(self, *args: Any) -> None:
+        self._notified.set()
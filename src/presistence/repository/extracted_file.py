@@ -0,0 +1,77 @@
+import logging
+from itertools import islice
+from typing import Iterable
+
+from common.metrics import metrics
+from common.pgsql import PSQLDatabase
+from domain.file_data.model.extracted_file import ExtractedFile
+from domain.file_data.repository.interface import ExtractedFileRepositoryInterface
+from presistence.repository.mapper.extracted_file import ExtractedFileSQLMapper
+
+
+logger = logging.getLogger(__name__)
+
+
+class PgSqlExtractedFileRepository(ExtractedFileRepositoryInterface):
+    __slots__ = ("_table", "_psql_database", "_batch_size")
+
+    def __init__(
+        self, table: str, psql_database: PSQLDatabase, batch_size: int = 10_000
+    ):
+        self._table = table
+        self._psql_database = psql_database
+        self._batch_size = batch_size
+
+    async def upsert_many(self, files: Iterable[ExtractedFile]) -> None:
+        _ = ExtractedFileSQLMapper.Fields
+        columns = ExtractedFileSQLMapper.COLUMNS
+        updates = ", ".join(
+            f"{column} = EXCLUDED.{column}"
+            for column in columns
+            if column not in (_.NAME, _.HASH)
+        )
+        staging_table = f"{self._table}_staging"
+        records = (ExtractedFileSQLMapper.map_to(file=file) for file in files)
+        num_records = 0
+
+        async with self._psql_database.pool.acquire() as connection:
+            while batch := list(islice(records, self._batch_size)):
+                with metrics.timer("db_upsert_batch_seconds", table=self._table):
+                    async with connection.transaction():
+                        await connection.execute(
+                            f"""
+                            CREATE TEMPORARY TABLE IF NOT EXISTS {staging_table} (
+                                {_.NAME} TEXT NOT NULL,
+                                {_.HASH} TEXT NOT NULL,
+                                {_.SIZE} INT NOT NULL,
+                                {_.ARCHITECTURE} TEXT,
+                                {_.NUM_IMPORTS} INT,
+                                {_.NUM_EXPORTS} INT,
+                                {_.TYPE} TEXT,
+                                {_.STATUS} TEXT NOT NULL,
+                                {_.MALICIOUS} BOOLEAN NOT NULL,
+                                {_.CREATED_AT} TIMESTAMP WITH TIME ZONE NOT NULL
+                            ) ON COMMIT DELETE ROWS
+                            """
+                        )
+                        await connection.copy_records_to_table(
+                            staging_table,
+                            records=batch,
+                            columns=columns,
+                        )
+                        await connection.execute(
+                            f"""
+                            INSERT INTO
+                            {self._table}
+                            ({", ".join(columns)})
+                            SELECT DISTINCT ON ({_.NAME}, {_.HASH})
+                                {", ".join(columns)}
+                            FROM {staging_table}
+                            ON CONFLICT ({_.NAME}, {_.HASH})
+                            DO UPDATE SET {updates}
+                            """
+                        )
+                metrics.inc("db_upsert_rows_total", len(batch), table=self._table)
+                num_records += len(batch)
+
+        logger.info(f"Upserted {num_records} extracted files")
@@ -0,0 +1,101 @@
+import logging
+
+from common.pgsql import PSQLDatabase
+from domain.file_data.model.extraction_cache import (
+    ExtractionCacheClaim,
+    ExtractionCacheEntry,
+)
+from domain.file_data.repository.interface import ExtractionCacheRepositoryInterface
+from presistence.repository.mapper.extraction_cache import ExtractionCacheSQLMapper
+
+
+logger = logging.getLogger(__name__)
+
+
+class PgSqlExtractionCacheRepository(ExtractionCacheRepositoryInterface):
+    __slots__ = ("_table", "_psql_database", "_claim_timeout")
+
+    PENDING = "PENDING"
+
+    def __init__(
+        self, table: str, psql_database: PSQLDatabase, claim_timeout: float = 300
+    ):
+        self._table = table
+        self._psql_database = psql_database
+        self._claim_timeout = claim_timeout
+
+    async def claim(self, hash: str) -> ExtractionCacheClaim:
+        _ = ExtractionCacheSQLMapper.Fields
+
+        async with self._psql_database.pool.acquire() as connection:
+            record = await connection.fetchrow(
+                f"""
+                WITH claimed AS (
+                    INSERT INTO
+                    {self._table}
+                    ({_.HASH}, {_.STATUS}, {_.UPDATED_AT})
+                    VALUES ($1, '{self.PENDING}', now())
+                    ON CONFLICT ({_.HASH})
+                    DO UPDATE SET {_.UPDATED_AT} = EXCLUDED.{_.UPDATED_AT}
+                    WHERE {self._table}.{_.STATUS} = '{self.PENDING}'
+                    AND {self._table}.{_.UPDATED_AT}
+                        < now() - make_interval(secs => $2)
+                    RETURNING {_.HASH}
+                )
+                SELECT
+                    $1 AS {_.HASH},
+                    EXISTS (SELECT 1 FROM claimed) AS {_.CLAIMED},
+                    cache.{_.STATUS},
+                    cache.{_.ARCHITECTURE},
+                    cache.{_.NUM_IMPORTS},
+                    cache.{_.NUM_EXPORTS},
+                    cache.{_.TYPE}
+                FROM (SELECT 1) AS one
+                LEFT JOIN {self._table} AS cache
+                ON cache.{_.HASH} = $1 AND cache.{_.STATUS} <> '{self.PENDING}'
+                """,
+                hash,
+                float(self._claim_timeout),
+            )
+
+        return ExtractionCacheSQLMapper.map_claim_from(record)
+
+    async def store(self, entry: ExtractionCacheEntry) -> None:
+        _ = ExtractionCacheSQLMapper.Fields
+
+        async with self._psql_database.pool.acquire() as connection:
+            await connection.execute(
+                f"""
+                INSERT INTO
+                {self._table}
+                ({_.HASH}, {_.ARCHITECTURE}, {_.NUM_IMPORTS}, {_.NUM_EXPORTS},
+                    {_.TYPE}, {_.STATUS}, {_.UPDATED_AT})
+                VALUES ($1, $2, $3, $4, $5, $6, now())
+                ON CONFLICT ({_.HASH})
+                DO UPDATE SET
+                    {_.ARCHITECTURE} = EXCLUDED.{_.ARCHITECTURE},
+                    {_.NUM_IMPORTS} = EXCLUDED.{_.NUM_IMPORTS},
+                    {_.NUM_EXPORTS} = EXCLUDED.{_.NUM_EXPORTS},
+                    {_.TYPE} = EXCLUDED.{_.TYPE},
+                    {_.STATUS} = EXCLUDED.{_.STATUS},
+                    {_.UPDATED_AT} = EXCLUDED.{_.UPDATED_AT}
+                """,
+                entry.hash,
+                entry.architecture,
+                entry.num_imports,
+                entry.num_exports,
+                entry.type,
+                entry.status,
+            )
+
+    async def release(self, hash: str) -> None:
+        _ = ExtractionCacheSQLMapper.Fields
+
+        async with self._psql_database.pool.acquire() as connection:
+            await connection.execute(
+                f"""
+                DELETE FROM {self._table}
+                WHERE {_.HASH} = $1 AND {_.STATUS} = '{self.PENDING}'
+                """,
+                hash,
+            )
@@ -1,6 +1,10 @@
 import datetime
 import logging
+from typing import Any, AsyncIterator, Optional
 
+from asyncpg import Connection
+
+from common.metrics import metrics
 from common.pgsql import PSQLDatabase
 from domain.file_data.model.file_sync_info import NotExtractedFile
 from domain.file_data.repository.interface import FileRepositoryInterface
@@ -12,45 +16,249 @@ logger = logging.getLogger(__name__)
 
 
 class PgSqlFileRepository(FileRepositoryInterface):
-    __slots__ = ("_table", "_psql_database")
+    __slots__ = (
+        "_table",
+        "_psql_database",
+        "_upsert_method",
+        "_batch_size",
+        "_queue_table",
+    )
 
     def __init__(
         self,
         table: str,
         psql_database: PSQLDatabase,
+        upsert_method: str = "executemany",
+        batch_size: int = 10_000,
+        queue_table: Optional[str] = None,
     ):
         self._table = table
         self._psql_database = psql_database
+        self._upsert_method = upsert_method
+        self._batch_size = batch_size
+        self._queue_table = queue_table
 
     async def upsert_many(
         self, files: list[NotExtractedFile], sync_time: datetime.datetime
+    ) -> None:
+        _ = FileRepositoryFields
+        await self._write_many(
+            files=files,
+            sync_time=sync_time,
+            on_conflict=f"DO UPDATE SET {_.SYNC_TIME} = EXCLUDED.{_.SYNC_TIME}",
+        )
+
+    async def insert_new_many(
+        self,
+        files: list[NotExtractedFile],
+        sync_time: datetime.datetime,
+    ) -> None:
+        await self._write_many(
+            files=files, sync_time=sync_time, on_conflict="DO NOTHING"
+        )
+
+    async def delete_missing(
+        self,
+        prefix: str,
+        pages: AsyncIterator[list[NotExtractedFile]],
+        synced_before: datetime.datetime,
+    ) -> int:
+        _ = FileRepositoryFields
+        listed_table = f"{self._table}_listed"
+
+        async with self._psql_database.pool.acquire() as connection:
+            await connection.execute(
+                f"""
+                CREATE TEMPORARY TABLE {listed_table} (
+                    {_.NAME} TEXT NOT NULL,
+                    {_.HASH} TEXT NOT NULL
+                )
+                """
+            )
+            try:
+                async for files in pages:
+                    await connection.copy_records_to_table(
+                        listed_table,
+                        records=[(file.name, file.hash) for file in files],
+                        columns=[_.NAME, _.HASH],
+                    )
+                await connection.execute(
+                    f"CREATE INDEX ON {listed_table} ({_.NAME}, {_.HASH})"
+                )
+                await connection.execute(f"ANALYZE {listed_table}")
+                deleted = await self._delete_unlisted(
+                    connection=connection,
+                    listed_table=listed_table,
+                    prefix=prefix,
+                    synced_before=synced_before,
+                )
+            finally:
+                await connection.execute(f"DROP TABLE IF EXISTS {listed_table}")
+
+        logger.info(f"Deleted {deleted} files missing from storage, prefix: {prefix}")
+        return deleted
+
+    async def _delete_unlisted(
+        self,
+        connection: Connection,
+        listed_table: str,
+        prefix: str,
+        synced_before: datetime.datetime,
+    ) -> int:
+        _ = FileRepositoryFields
+        deleted = 0
+        last_id = 0
+
+        while True:
+            record = await connection.fetchrow(
+                f"""
+                WITH scanned AS (
+                    SELECT {_.ID}, {_.NAME}, {_.HASH}
+                    FROM {self._table}
+                    WHERE {_.ID} > $3
+                    AND starts_with({_.NAME}, $1)
+                    AND {_.SYNC_TIME} < $2
+                    ORDER BY {_.ID}
+                    LIMIT $4
+                ), deleted AS (
+                    DELETE FROM {self._table} AS stored
+                    USING scanned
+                    WHERE stored.{_.ID} = scanned.{_.ID}
+                    AND NOT EXISTS (
+                        SELECT 1 FROM {listed_table} AS listed
+                        WHERE listed.{_.NAME} = scanned.{_.NAME}
+                        AND listed.{_.HASH} = scanned.{_.HASH}
+                    )
+                    RETURNING 1
+                )
+                SELECT
+                    (SELECT max({_.ID}) FROM scanned) AS last_id,
+                    (SELECT count(*) FROM deleted) AS deleted
+                """,
+                prefix,
+                synced_before,
+                last_id,
+                self._batch_size,
+            )
+            if record["last_id"] is None:
+                return deleted
+            deleted += record["deleted"]
+            last_id = record["last_id"]
+
+    async def _write_many(
+        self,
+        files: list[NotExtractedFile],
+        sync_time: datetime.datetime,
+        on_conflict: str,
     ) -> None:
         _ = FileRepositoryFields
         mapped_files = [
             StorageFileSQLMapper.map_to(file=file, sync_time=sync_time)
             for file in files
         ]
+        records = [
+            (
+                file[_.NAME],
+                file[_.HASH],
+                file[_.SIZE],
+                file[_.MALICIOUS],
+                file[_.SYNC_TIME],
+            )
+            for file in mapped_files
+        ]
 
         async with self._psql_database.pool.acquire() as connection:
-            async with connection.transaction():
-                await connection.executemany(
-                    f"""
-                    INSERT INTO
-                    {self._table}
-                    ({_.NAME}, {_.HASH}, {_.SIZE}, {_.MALICIOUS}, {_.SYNC_TIME})
-                    VALUES ($1, $2, $3, $4, $5)
-                    ON CONFLICT ({_.NAME}, {_.HASH})
-                    DO UPDATE SET
-                        {_.SYNC_TIME} = EXCLUDED.{_.SYNC_TIME}
-                    """,
-                    [
-                        (
-                            file[_.NAME],
-                            file[_.HASH],
-                            file[_.SIZE],
-                            file[_.MALICIOUS],
-                            file[_.SYNC_TIME],
-                        )
-                        for file in mapped_files
-                    ],
+            for start in range(0, len(records), self._batch_size):
+                batch = records[start : start + self._batch_size]
+                with metrics.timer("db_upsert_batch_seconds", table=self._table):
+                    await self._write_batch(
+                        connection=connection, records=batch, on_conflict=on_conflict
+                    )
+                metrics.inc("db_upsert_rows_total", len(batch), table=self._table)
+
+    async def _write_batch(
+        self, connection: Connection, records: list[tuple[Any, ...]], on_conflict: str
+    ) -> None:
+        async with connection.transaction():
+            if self._upsert_method == "copy":
+                await self._copy_upsert(
+                    connection=connection, records=records, on_conflict=on_conflict
                 )
+            else:
+                await self._executemany_upsert(
+                    connection=connection, records=records, on_conflict=on_conflict
+                )
+
+    async def _executemany_upsert(
+        self, connection: Connection, records: list[tuple[Any, ...]], on_conflict: str
+    ) -> None:
+        _ = FileRepositoryFields
+        await connection.executemany(
+            self._publish_inserted(
+                f"""
+                INSERT INTO
+                {self._table}
+                ({_.NAME}, {_.HASH}, {_.SIZE}, {_.MALICIOUS}, {_.SYNC_TIME})
+                VALUES ($1, $2, $3, $4, $5)
+                ON CONFLICT ({_.NAME}, {_.HASH})
+                {on_conflict}
+                """
+            ),
+            records,
+        )
+
+    async def _copy_upsert(
+        self, connection: Connection, records: list[tuple[Any, ...]], on_conflict: str
+    ) -> None:
+        _ = FileRepositoryFields
+        staging_table = f"{self._table}_staging"
+
+        await connection.execute(
+            f"""
+            CREATE TEMPORARY TABLE IF NOT EXISTS {staging_table} (
+                {_.NAME} TEXT NOT NULL,
+                {_.HASH} TEXT NOT NULL,
+                {_.SIZE} INT NOT NULL,
+                {_.MALICIOUS} BOOLEAN NOT NULL,
+                {_.SYNC_TIME} TIMESTAMP WITH TIME ZONE NOT NULL
+            ) ON COMMIT DELETE ROWS
+            """
+        )
+        await connection.copy_records_to_table(
+            staging_table,
+            records=records,
+            columns=[_.NAME, _.HASH, _.SIZE, _.MALICIOUS, _.SYNC_TIME],
+        )
+        await connection.execute(
+            self._publish_inserted(
+                f"""
+                INSERT INTO
+                {self._table}
+                ({_.NAME}, {_.HASH}, {_.SIZE}, {_.MALICIOUS}, {_.SYNC_TIME})
+                SELECT DISTINCT ON ({_.NAME}, {_.HASH})
+                    {_.NAME}, {_.HASH}, {_.SIZE}, {_.MALICIOUS}, {_.SYNC_TIME}
+                FROM {staging_table}
+                ON CONFLICT ({_.NAME}, {_.HASH})
+                {on_conflict}
+                """
+            )
+        )
+
+    def _publish_inserted(self, insert_query: str) -> str:
+        if self._queue_table is None:
+            return insert_query
+
+        _ = FileRepositoryFields
+        columns = f"{_.NAME}, {_.HASH}, {_.SIZE}, {_.MALICIOUS}"
+        return f"""
+            WITH written AS (
+                {insert_query}
+                RETURNING {columns}, xmax = 0 AS inserted
+            ), published AS (
+                INSERT INTO {self._queue_table} ({columns})
+                SELECT {columns} FROM written WHERE inserted
+                ON CONFLICT ({_.NAME}, {_.HASH}) DO NOTHING
+                RETURNING 1
+            )
+            SELECT pg_notify('{self._queue_table}', '') FROM published LIMIT 1
+        """
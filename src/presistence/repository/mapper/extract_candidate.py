@@ -0,0 +1,38 @@
+from asyncpg import Record
+
+from domain.file_data.model.extracted_file import ExtractedFile
+from domain.file_data.model.file_sync_info import NotExtractedFile
+from presistence.repository.mapper.fields.file import FileRepositoryFields
+
+
+class ExtractCandidateSQLMapper:
+    class Fields(FileRepositoryFields):
+        pass
+
+    @classmethod
+    def map_file_from(cls, record: Record) -> NotExtractedFile:
+        _ = cls.Fields
+
+        return NotExtractedFile(
+            name=record[_.NAME],
+            hash=record[_.HASH],
+            size=record[_.SIZE],
+            malicious=record[_.MALICIOUS],
+        )
+
+    @classmethod
+    def map_extracted_from(cls, record: Record) -> ExtractedFile:
+        _ = cls.Fields
+
+        return ExtractedFile(
+            name=record[_.NAME],
+            hash=record[_.HASH],
+            size=record[_.SIZE],
+            architecture=record[_.ARCHITECTURE],
+            num_imports=record[_.NUM_IMPORTS],
+            num_exports=record[_.NUM_EXPORTS],
+            type=record[_.TYPE],
+            status=record[_.STATUS],
+            malicious=record[_.MALICIOUS],
+            created_at=record[_.CREATED_AT],
+        )
@@ -0,0 +1,23 @@
+from asyncpg import Record
+
+from domain.file_data.model.extract_queue import ExtractQueueItem
+from presistence.repository.mapper.fields.extract_queue import (
+    ExtractQueueRepositoryFields,
+)
+
+
+class ExtractQueueSQLMapper:
+    class Fields(ExtractQueueRepositoryFields):
+        pass
+
+    @classmethod
+    def map_from(cls, record: Record) -> ExtractQueueItem:
+        _ = cls.Fields
+
+        return ExtractQueueItem(
+            id=record[_.ID],
+            name=record[_.NAME],
+            hash=record[_.HASH],
+            size=record[_.SIZE],
+            malicious=record[_.MALICIOUS],
+        )
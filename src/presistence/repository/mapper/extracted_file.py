@@ -0,0 +1,35 @@
+from domain.file_data.model.extracted_file import ExtractedFile
+from presistence.repository.mapper.fields.file import FileRepositoryFields
+
+
+class ExtractedFileSQLMapper:
+    class Fields(FileRepositoryFields):
+        pass
+
+    COLUMNS = (
+        Fields.NAME,
+        Fields.HASH,
+        Fields.SIZE,
+        Fields.ARCHITECTURE,
+        Fields.NUM_IMPORTS,
+        Fields.NUM_EXPORTS,
+        Fields.TYPE,
+        Fields.STATUS,
+        Fields.MALICIOUS,
+        Fields.CREATED_AT,
+    )
+
+    @classmethod
+    def map_to(cls, file: ExtractedFile) -> tuple:
+        return (
+            file.name,
+            file.hash,
+            file.size,
+            file.architecture,
+            file.num_imports,
+            file.num_exports,
+            file.type,
+            file.status,
+            file.malicious,
+            file.created_at,
+        )
@@ -0,0 +1,32 @@
+from asyncpg import Record
+
+from domain.file_data.model.extraction_cache import (
+    ExtractionCacheClaim,
+    ExtractionCacheEntry,
+)
+from presistence.repository.mapper.fields.extraction_cache import (
+    ExtractionCacheRepositoryFields,
+)
+
+
+class ExtractionCacheSQLMapper:
+    class Fields(ExtractionCacheRepositoryFields):
+        pass
+
+    @classmethod
+    def map_claim_from(cls, record: Record) -> ExtractionCacheClaim:
+        _ = cls.Fields
+
+        if record[_.CLAIMED] or record[_.STATUS] is None:
+            return ExtractionCacheClaim(claimed=bool(record[_.CLAIMED]))
+        return ExtractionCacheClaim(
+            claimed=False,
+            entry=ExtractionCacheEntry(
+                hash=record[_.HASH],
+                status=record[_.STATUS],
+                architecture=record[_.ARCHITECTURE],
+                num_imports=record[_.NUM_IMPORTS],
+                num_exports=record[_.NUM_EXPORTS],
+                type=record[_.TYPE],
+            ),
+        )
@@ -0,0 +1,7 @@
+class ExtractQueueRepositoryFields:
+    ID = "id"
+    NAME = "name"
+    HASH = "hash"
+    SIZE = "size"
+    MALICIOUS = "malicious"
+    CLAIMED_AT = "claimed_at"
@@ -0,0 +1,9 @@
+class ExtractionCacheRepositoryFields:
+    HASH = "hash"
+    ARCHITECTURE = "architecture"
+    NUM_IMPORTS = "num_imports"
+    NUM_EXPORTS = "num_exports"
+    TYPE = "type"
+    STATUS = "status"
+    UPDATED_AT = "updated_at"
+    CLAIMED = "claimed"
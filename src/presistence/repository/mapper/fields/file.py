@@ -1,4 +1,5 @@
 class FileRepositoryFields:
+    ID = "id"
     HASH = "hash"
     NAME = "name"
     SIZE = "size"
@@ -0,0 +1,6 @@
+class SyncCheckpointRepositoryFields:
+    SHARD = "shard"
+    COMPLETED = "completed"
+    LAST_KEY = "last_key"
+    WATERMARK = "watermark"
+    UPDATED_AT = "updated_at"
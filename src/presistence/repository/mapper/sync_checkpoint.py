@@ -0,0 +1,22 @@
+from asyncpg import Record
+
+from domain.file_data.model.sync_checkpoint import SyncCheckpoint
+from presistence.repository.mapper.fields.sync_checkpoint import (
+    SyncCheckpointRepositoryFields,
+)
+
+
+class SyncCheckpointSQLMapper:
+    class Fields(SyncCheckpointRepositoryFields):
+        pass
+
+    @classmethod
+    def map_from(cls, record: Record) -> SyncCheckpoint:
+        _ = cls.Fields
+
+        return SyncCheckpoint(
+            shard=record[_.SHARD],
+            completed=record[_.COMPLETED],
+            last_key=record[_.LAST_KEY],
+            watermark=record[_.WATERMARK],
+        )
@@ -0,0 +1,56 @@
+from typing import Optional
+
+from presistence.repository.mapper.fields.file import FileRepositoryFields
+
+
+class ExtractCandidateQuery:
+    __slots__ = ("_source_table", "_target_table", "_fields")
+
+    def __init__(
+        self,
+        source_table: str,
+        target_table: str,
+        fields: type[FileRepositoryFields] = FileRepositoryFields,
+    ):
+        self._source_table = source_table
+        self._target_table = target_table
+        self._fields = fields
+
+    def quota(self, quotas: dict[bool, int]) -> str:
+        return self.union(
+            [
+                self.unprocessed_files(malicious=malicious, num_files=num_files)
+                for malicious, num_files in sorted(quotas.items())
+            ]
+        )
+
+    @staticmethod
+    def union(queries: list[str]) -> str:
+        return " UNION ALL ".join(
+            f"SELECT * FROM ({query}) AS q{index}"
+            for index, query in enumerate(queries)
+        )
+
+    def unprocessed_files(
+        self,
+        malicious: bool,
+        num_files: Optional[int] = None,
+        max_id: Optional[int] = None,
+    ) -> str:
+        _ = self._fields
+        id_filter = f"AND s.{_.ID} <= {int(max_id)}" if max_id is not None else ""
+        limit = (
+            f"ORDER BY s.{_.ID} LIMIT {int(num_files)}" if num_files is not None else ""
+        )
+
+        return f"""
+            SELECT s.{_.ID}, s.{_.NAME}, s.{_.HASH}, s.{_.SIZE}, s.{_.MALICIOUS}
+            FROM {self._source_table} AS s
+            WHERE s.{_.MALICIOUS} = {str(malicious).upper()}
+            {id_filter}
+            AND NOT EXISTS (
+                SELECT 1 FROM {self._target_table} AS e
+                WHERE e.{_.NAME} = s.{_.NAME} AND e.{_.HASH} = s.{_.HASH}
+            )
+            {limit}
+        """
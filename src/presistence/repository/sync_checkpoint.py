@@ -0,0 +1,60 @@
+import logging
+from typing import Optional
+
+from common.pgsql import PSQLDatabase
+from domain.file_data.model.sync_checkpoint import SyncCheckpoint
+from domain.file_data.repository.interface import SyncCheckpointRepositoryInterface
+from presistence.repository.mapper.fields.sync_checkpoint import (
+    SyncCheckpointRepositoryFields,
+)
+from presistence.repository.mapper.sync_checkpoint import SyncCheckpointSQLMapper
+
+
+logger = logging.getLogger(__name__)
+
+
+class PgSqlSyncCheckpointRepository(SyncCheckpointRepositoryInterface):
+    __slots__ = ("_table", "_psql_database")
+
+    def __init__(self, table: str, psql_database: PSQLDatabase):
+        self._table = table
+        self._psql_database = psql_database
+
+    async def get(self, shard: str) -> Optional[SyncCheckpoint]:
+        _ = SyncCheckpointRepositoryFields
+
+        async with self._psql_database.pool.acquire() as connection:
+            record = await connection.fetchrow(
+                f"""
+                SELECT {_.SHARD}, {_.COMPLETED}, {_.LAST_KEY}, {_.WATERMARK}
+                FROM {self._table}
+                WHERE {_.SHARD} = $1
+                """,
+                shard,
+            )
+
+        return SyncCheckpointSQLMapper.map_from(record) if record else None
+
+    async def save(self, checkpoint: SyncCheckpoint) -> None:
+        _ = SyncCheckpointRepositoryFields
+
+        async with self._psql_database.pool.acquire() as connection:
+            await connection.execute(
+                f"""
+                INSERT INTO
+                {self._table}
+                ({_.SHARD}, {_.COMPLETED}, {_.LAST_KEY}, {_.WATERMARK},
+                    {_.UPDATED_AT})
+                VALUES ($1, $2, $3, $4, now())
+                ON CONFLICT ({_.SHARD})
+                DO UPDATE SET
+                    {_.COMPLETED} = EXCLUDED.{_.COMPLETED},
+                    {_.LAST_KEY} = EXCLUDED.{_.LAST_KEY},
+                    {_.WATERMARK} = EXCLUDED.{_.WATERMARK},
+                    {_.UPDATED_AT} = EXCLUDED.{_.UPDATED_AT}
+                """,
+                checkpoint.shard,
+                checkpoint.completed,
+                checkpoint.last_key,
+                checkpoint.watermark,
+            )
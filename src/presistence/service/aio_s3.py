@@ -0,0 +1,113 @@
+from contextlib import AsyncExitStack
+from typing import Any, AsyncGenerator, Optional
+
+from aiobotocore.config import AioConfig
+from aiobotocore.response import StreamingBody
+from aiobotocore.session import get_session
+from botocore import UNSIGNED
+
+from common.metrics import metrics
+from domain.file_data.model.file_range import FileRange
+from domain.file_data.model.file_sync_info import NotExtractedFile
+from domain.file_data.repository.mapper.storage_service import StorageServiceFileMapper
+from domain.file_data.service.file_storage_service import StorageServiceInterface
+from presistence.service.s3 import raise_on_throttling
+
+
+class AioS3FileService(StorageServiceInterface):
+    __slots__ = (
+        "_session",
+        "_config",
+        "_endpoint_url",
+        "_bucket_name",
+        "_client",
+        "_exit_stack",
+    )
+
+    def __init__(
+        self,
+        bucket_name: str,
+        max_pool_connections: int = 10,
+        endpoint_url: Optional[str] = None,
+    ):
+        self._session = get_session()
+        self._config = AioConfig(
+            signature_version=UNSIGNED,
+            max_pool_connections=max_pool_connections,
+            tcp_keepalive=True,
+        )
+        self._endpoint_url = endpoint_url
+        self._bucket_name = bucket_name
+        self._client: Any = None
+        self._exit_stack = AsyncExitStack()
+
+    async def initialize(self) -> None:
+        if self._client is None:
+            self._client = await self._exit_stack.enter_async_context(
+                self._session.create_client(
+                    "s3", config=self._config, endpoint_url=self._endpoint_url
+                )
+            )
+
+    async def close(self) -> None:
+        await self._exit_stack.aclose()
+        self._client = None
+
+    async def paginate_by_prefix(
+        self,
+        prefix: str,
+        malicious: bool,
+        page_size: int = 1_000,
+        start_after: Optional[str] = None,
+        end_at: Optional[str] = None,
+    ) -> AsyncGenerator[list[NotExtractedFile], None]:
+        paginator = self._client.get_paginator("list_objects_v2")
+        page_iterator = paginator.paginate(
+            Bucket=self._bucket_name,
+            Prefix=prefix,
+            PaginationConfig={"PageSize": page_size},
+            **({"StartAfter": start_after} if start_after is not None else {}),
+        )
+
+        pages = aiter(page_iterator)
+        while True:
+            with metrics.timer("s3_request_seconds", operation="list_objects"):
+                page = await anext(pages, None)
+            if page is None:
+                return
+
+            s3_files = page.get("Contents", [])
+            files = StorageServiceFileMapper.to_domain_many(
+                s3_files=s3_files, malicious=malicious, end_at=end_at
+            )
+            if files:
+                yield files
+            if end_at is not None and s3_files and s3_files[-1]["Key"] > end_at:
+                return
+
+    async def get_streaming_body_by_key(self, file_key: str) -> StreamingBody:
+        with metrics.timer(
+            "s3_request_seconds", operation="get_object"
+        ), raise_on_throttling("get_object"):
+            file_obj = await self._client.get_object(
+                Bucket=self._bucket_name, Key=file_key
+            )
+        metrics.inc("s3_bytes_total", file_obj["ContentLength"], operation="get_object")
+        return file_obj["Body"]
+
+    async def get_range_by_key(self, file_key: str, start: int, end: int) -> FileRange:
+        with metrics.timer(
+            "s3_request_seconds", operation="get_range"
+        ), raise_on_throttling("get_range"):
+            file_obj = await self._client.get_object(
+                Bucket=self._bucket_name, Key=file_key, Range=f"bytes={start}-{end}"
+            )
+            async with file_obj["Body"] as body:
+                data = await body.read()
+        metrics.inc("s3_bytes_total", len(data), operation="get_range")
+
+        return FileRange(
+            data=data,
+            start=start,
+            total_size=int(file_obj["ContentRange"].rsplit("/", 1)[1]),
+        )
@@ -1,23 +1,65 @@
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
-from typing import Any, AsyncGenerator
+from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Iterator, Optional
 
 import boto3
 from botocore import UNSIGNED
 from botocore.client import Config
+from botocore.exceptions import ClientError
 from botocore.response import StreamingBody
 
+from common.metrics import metrics
+from domain.file_data.exception.storage import StorageThrottledError
+from domain.file_data.model.file_range import FileRange
 from domain.file_data.model.file_sync_info import NotExtractedFile
 from domain.file_data.repository.mapper.storage_service import StorageServiceFileMapper
 from domain.file_data.service.file_storage_service import StorageServiceInterface
 
 
+THROTTLING_ERROR_CODES = frozenset(
+    {
+        "SlowDown",
+        "Throttling",
+        "ThrottlingException",
+        "RequestLimitExceeded",
+        "TooManyRequestsException",
+        "503",
+    }
+)
+
+
+@contextmanager
+def raise_on_throttling(operation: str) -> Iterator[None]:
+    try:
+        yield
+    except ClientError as error:
+        code = error.response.get("Error", {}).get("Code")
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if code not in THROTTLING_ERROR_CODES and status != 503:
+            raise
+        metrics.inc("s3_throttled_total", operation=operation)
+        raise StorageThrottledError(f"S3 {operation} throttled: {error}") from error
+
+
 class S3FileService(StorageServiceInterface):
     __slots__ = ("_pool", "_client", "_bucket_name")
 
-    def __init__(self, bucket_name: str):
-        self._pool = ThreadPoolExecutor()
-        self._client = boto3.client("s3", config=Config(signature_version=UNSIGNED))
+    def __init__(
+        self,
+        bucket_name: str,
+        pool: Optional[ThreadPoolExecutor] = None,
+        max_pool_connections: int = 10,
+        endpoint_url: Optional[str] = None,
+    ):
+        self._pool = pool or ThreadPoolExecutor()
+        self._client = boto3.client(
+            "s3",
+            config=Config(
+                signature_version=UNSIGNED, max_pool_connections=max_pool_connections
+            ),
+            endpoint_url=endpoint_url,
+        )
         self._bucket_name = bucket_name
 
     async def paginate_by_prefix(
@@ -25,29 +67,73 @@ class S3FileService(StorageServiceInterface):
         prefix: str,
         malicious: bool,
         page_size: int = 1_000,
+        start_after: Optional[str] = None,
+        end_at: Optional[str] = None,
     ) -> AsyncGenerator[list[NotExtractedFile], None]:
         loop = asyncio.get_event_loop()
         paginator = self._client.get_paginator("list_objects_v2")
-        page_iterator = paginator.paginate(
-            Bucket=self._bucket_name,
-            Prefix=prefix,
-            PaginationConfig={"PageSize": page_size},
+        page_iterator = iter(
+            paginator.paginate(
+                Bucket=self._bucket_name,
+                Prefix=prefix,
+                PaginationConfig={"PageSize": page_size},
+                **({"StartAfter": start_after} if start_after is not None else {}),
+            )
         )
 
-        def get_page(page: dict[str, Any]) -> list[NotExtractedFile]:
-            return [
-                StorageServiceFileMapper.to_domain(s3_file=s3_file, malicious=malicious)
-                for s3_file in page["Contents"]
-            ]
+        while True:
+            page = await loop.run_in_executor(
+                self._pool, self._next_page, page_iterator
+            )
+            if page is None:
+                return
 
-        for page in page_iterator:
-            result = await loop.run_in_executor(self._pool, get_page, page)
-            yield result
+            s3_files = page.get("Contents", [])
+            files = StorageServiceFileMapper.to_domain_many(
+                s3_files=s3_files, malicious=malicious, end_at=end_at
+            )
+            if files:
+                yield files
+            if end_at is not None and s3_files and s3_files[-1]["Key"] > end_at:
+                return
 
     async def get_streaming_body_by_key(self, file_key: str) -> StreamingBody:
         loop = asyncio.get_event_loop()
         file_obj = await loop.run_in_executor(self._pool, self._get_object, file_key)
         return file_obj["Body"]
 
+    async def close(self) -> None:
+        self._client.close()
+
+    def _next_page(self, page_iterator: Iterator[dict]) -> Optional[dict]:
+        with metrics.timer("s3_request_seconds", operation="list_objects"):
+            return next(page_iterator, None)
+
     def _get_object(self, file_key: str) -> dict[str, Any]:
-        return self._client.get_object(Bucket=self._bucket_name, Key=file_key)
+        with metrics.timer(
+            "s3_request_seconds", operation="get_object"
+        ), raise_on_throttling("get_object"):
+            file_obj = self._client.get_object(Bucket=self._bucket_name, Key=file_key)
+        metrics.inc("s3_bytes_total", file_obj["ContentLength"], operation="get_object")
+        return file_obj
+
+    async def get_range_by_key(self, file_key: str, start: int, end: int) -> FileRange:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._pool, self._read_range, file_key, start, end
+        )
+
+    def _read_range(self, file_key: str, start: int, end: int) -> FileRange:
+        with metrics.timer(
+            "s3_request_seconds", operation="get_range"
+        ), raise_on_throttling("get_range"):
+            file_obj = self._client.get_object(
+                Bucket=self._bucket_name, Key=file_key, Range=f"bytes={start}-{end}"
+            )
+            data = file_obj["Body"].read()
+        metrics.inc("s3_bytes_total", len(data), operation="get_range")
+        return FileRange(
+            data=data,
+            start=start,
+            total_size=int(file_obj["ContentRange"].rsplit("/", 1)[1]),
+        )
@@ -25,21 +25,52 @@ class WorkerExtract(Worker):
         signal.signal(signal.SIGINT, self.signal_int)
         await self.container.database.initialize()
 
+        if self.settings.EXTRACT_MODE == "stream":
+            await self.run_stream()
+            return
+        if self.settings.EXTRACT_ENGINE == "local":
+            await self.run_local()
+            return
+
         num_files = self.num_files
         logger.info(f"Extracting Number of files: {num_files}")
         try:
             start_time = datetime.datetime.now()
             self.container.extract_command.execute(
-                malicious=False, num_files=num_files // 2
+                quotas={False: num_files // 2, True: num_files // 2}
             )
-            self.container.extract_command.execute(
-                malicious=True, num_files=num_files // 2
+            end_time = datetime.datetime.now()
+            logger.info(f"Time taken: {end_time - start_time}")
+
+        finally:
+            await self.container.close()
+
+    async def run_local(self) -> None:
+        num_files = self.num_files
+        logger.info(f"Extracting Number of files locally: {num_files}")
+        await self.container.storage_service.initialize()
+
+        try:
+            start_time = datetime.datetime.now()
+            await self.container.local_extract_command.execute(
+                quotas={False: num_files // 2, True: num_files // 2}
             )
             end_time = datetime.datetime.now()
             logger.info(f"Time taken: {end_time - start_time}")
+        finally:
+            await self.container.storage_service.close()
+            await self.container.close()
 
+    async def run_stream(self) -> None:
+        await self.container.storage_service.initialize()
+
+        try:
+            await self.container.stream_extract_command.execute(
+                should_stop=lambda: self.terminated or self.interrupted
+            )
         finally:
-            self.container.close()
+            await self.container.storage_service.close()
+            await self.container.close()
 
     def signal_term(self, *args: Any) -> None:
         logger.info("Received signal terminate")
@@ -23,12 +23,18 @@ class SyncWorker(Worker):
         signal.signal(signal.SIGTERM, self.signal_term)
         signal.signal(signal.SIGINT, self.signal_int)
         await self.container.database.initialize()
+        await self.container.storage_service.initialize()
 
         try:
             await asyncio.gather(
-                self.container.sync_command.execute("0", malicious=False),
-                self.container.sync_command.execute("1", malicious=True),
+                self.container.sync_command.execute("0/", malicious=False),
+                self.container.sync_command.execute("1/", malicious=True),
             )
+            if self.settings.SYNC_DETECT_DELETIONS:
+                await asyncio.gather(
+                    self.container.sync_command.prune("0/", malicious=False),
+                    self.container.sync_command.prune("1/", malicious=True),
+                )
         finally:
             await self.container.close()
 
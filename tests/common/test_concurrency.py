@@ -0,0 +1,81 @@
+from common.concurrency import AdaptiveConcurrencyLimiter
+from common.metrics import metrics
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestAdaptiveConcurrencyLimiter:
+    def test_grows_until_max_limit_while_latency_is_healthy(self):
+        # Given
+        limiter = AdaptiveConcurrencyLimiter(name="test", min_limit=2, max_limit=8)
+
+        # When
+        for _ in range(20):
+            limiter.on_success(latency=0.1)
+
+        # Then
+        assert limiter.limit == 8
+
+    def test_throttle_halves_limit_once_per_cooldown(self):
+        # Given
+        clock = Clock()
+        limiter = AdaptiveConcurrencyLimiter(
+            name="test", min_limit=1, max_limit=32, clock=clock
+        )
+        for _ in range(15):
+            limiter.on_success(latency=1.0)
+
+        # When
+        limiter.on_throttle()
+        limiter.on_throttle()
+        throttled_limit = limiter.limit
+        clock.now = 1.5
+        limiter.on_overload()
+
+        # Then
+        assert throttled_limit == 8
+        assert limiter.limit == 4
+        assert {
+            (gauge["labels"]["limiter"], gauge["value"])
+            for gauge in metrics.snapshot()["gauges"]
+            if gauge["name"] == "concurrency_limit"
+        } >= {("test", 4)}
+
+    def test_grows_additively_after_first_decrease(self):
+        # Given
+        limiter = AdaptiveConcurrencyLimiter(name="test", min_limit=1, max_limit=32)
+        for _ in range(7):
+            limiter.on_success(latency=0.1)
+        limiter.on_throttle()
+
+        # When
+        limits = []
+        for _ in range(5):
+            limiter.on_success(latency=0.1)
+            limits.append(limiter.limit)
+
+        # Then
+        assert limits == [4, 4, 4, 4, 5]
+
+    def test_backs_off_when_latency_exceeds_baseline(self):
+        # Given
+        clock = Clock()
+        limiter = AdaptiveConcurrencyLimiter(
+            name="test", min_limit=2, max_limit=32, latency_tolerance=2.0, clock=clock
+        )
+        for _ in range(10):
+            limiter.on_success(latency=0.1)
+
+        # When
+        for _ in range(10):
+            clock.now += 10
+            limiter.on_success(latency=2.0)
+
+        # Then
+        assert limiter.limit == 2
@@ -0,0 +1,111 @@
+import json
+import urllib.request
+from pathlib import Path
+
+from common.metrics import MetricsExporter, MetricsRegistry
+
+
+class TestMetricsRegistry:
+    def test_render_prometheus(self):
+        # Given
+        registry = MetricsRegistry()
+        registry.inc("s3_bytes_total", 10, operation="get_object")
+        registry.inc("s3_bytes_total", 5, operation="get_object")
+        registry.add_gauge("file_processor_in_flight", 2)
+        registry.observe("pe_parse_seconds", 0.02)
+        registry.observe("pe_parse_seconds", 100)
+
+        # When
+        text = registry.render_prometheus()
+
+        # Then
+        assert "# TYPE s3_bytes_total counter" in text
+        assert 's3_bytes_total{operation="get_object"} 15' in text
+        assert "file_processor_in_flight 2" in text
+        assert 'pe_parse_seconds_bucket{le="0.01"} 0.0' in text
+        assert 'pe_parse_seconds_bucket{le="0.025"} 1.0' in text
+        assert 'pe_parse_seconds_bucket{le="+Inf"} 2.0' in text
+        assert "pe_parse_seconds_count 2.0" in text
+
+    def test_drained_metrics_merge_into_another_registry(self):
+        # Given
+        executor_registry = MetricsRegistry()
+        executor_registry.inc("extract_errors_total", cause="PEFormatError")
+        executor_registry.observe("spark_task_seconds", 0.5, stage="process")
+        driver_registry = MetricsRegistry()
+        driver_registry.inc("extract_errors_total", cause="PEFormatError")
+
+        # When
+        driver_registry.merge(executor_registry.drain())
+
+        # Then
+        snapshot = driver_registry.snapshot()
+        assert snapshot["counters"] == [
+            {
+                "name": "extract_errors_total",
+                "labels": {"cause": "PEFormatError"},
+                "value": 2,
+            }
+        ]
+        assert snapshot["histograms"][0]["count"] == 1
+        assert executor_registry.snapshot()["counters"] == []
+
+    def test_set_gauge_replaces_value(self):
+        # Given
+        registry = MetricsRegistry()
+
+        # When
+        registry.set_gauge("concurrency_limit", 8, limiter="file_processor")
+        registry.set_gauge("concurrency_limit", 4, limiter="file_processor")
+
+        # Then
+        assert 'concurrency_limit{limiter="file_processor"} 4' in (
+            registry.render_prometheus()
+        )
+
+    def test_in_flight_gauge_returns_to_zero(self):
+        # Given
+        registry = MetricsRegistry()
+
+        # When
+        with registry.in_flight("file_processor_in_flight"):
+            during = registry.snapshot()["gauges"][0]["value"]
+
+        # Then
+        assert during == 1
+        assert registry.snapshot()["gauges"][0]["value"] == 0
+
+
+class TestMetricsExporter:
+    def test_dumps_json_on_stop(self, tmp_path: Path):
+        # Given
+        registry = MetricsRegistry()
+        registry.inc("db_upsert_rows_total", 3, table="extracted_file_metadata")
+        dump_path = tmp_path / "metrics.json"
+        exporter = MetricsExporter(
+            registry=registry, port=0, dump_path=str(dump_path), dump_interval=60
+        )
+
+        # When
+        exporter.start()
+        exporter.stop()
+
+        # Then
+        assert json.loads(dump_path.read_text())["counters"][0]["value"] == 3
+
+    def test_serves_prometheus_text(self):
+        # Given
+        registry = MetricsRegistry()
+        registry.inc("db_upsert_rows_total", 3, table="storage_file_metadata")
+        exporter = MetricsExporter(registry=registry, port=19_091)
+
+        # When
+        exporter.start()
+        try:
+            with urllib.request.urlopen("http://127.0.0.1:19091/metrics") as response:
+                body = response.read().decode()
+        finally:
+            exporter.stop()
+
+        # Then
+        assert 'db_upsert_rows_total{table="storage_file_metadata"} 3' in body
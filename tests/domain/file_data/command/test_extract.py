@@ -1,9 +1,15 @@
 from datetime import datetime, timezone
+from typing import Iterator
 from unittest.mock import Mock, patch
 
+import pyarrow as pa
 import pytest
 from pyspark.sql import Row, SparkSession
+from pyspark.sql.functions import col
+from pyspark.sql.functions import hash as hash_
+from pyspark.sql.functions import lit, pmod
 
+from common.metrics import metrics
 from domain.file_data.command.extract import ExtractCommand
 from presistence.repository.mapper.fields.file import FileRepositoryFields
 
@@ -48,28 +54,19 @@ def extract_command(
 
 
 class TestExtractCommand:
-    def test_extract_unprocessed_files_when_there_is_processed_file(
+    def test_unprocessed_files_query_skips_processed_files(
         self, spark_session: SparkSession, extract_command: ExtractCommand
     ):
         # Given
         source_data = [
-            Row(
-                name="name1",
-                hash="hash1",
-                size=1,
-                malicious=True,
-                sync_time=datetime.now(timezone.utc),
-            ),
-            Row(
-                name="name2",
-                hash="hash2",
-                size=2,
-                malicious=True,
-                sync_time=datetime.now(timezone.utc),
-            ),
+            Row(id=1, name="name1", hash="hash1", size=1, malicious=True),
+            Row(id=2, name="name2", hash="hash2", size=2, malicious=True),
+            Row(id=3, name="name3", hash="hash3", size=3, malicious=False),
+            Row(id=4, name="name4", hash="hash4", size=4, malicious=True),
         ]
         target_data = [
             Row(
+                id=1,
                 name="name1",
                 hash="hash1",
                 size=1,
@@ -81,13 +78,16 @@ class TestExtractCommand:
                 created_at=datetime.now(timezone.utc),
             ),
         ]
-
-        source_df = spark_session.createDataFrame(source_data)
-        target_df = spark_session.createDataFrame(target_data)
+        spark_session.createDataFrame(source_data).createOrReplaceTempView(
+            "source_table"
+        )
+        spark_session.createDataFrame(target_data).createOrReplaceTempView(
+            "target_table"
+        )
 
         # When
-        unprocessed_files_df = extract_command._extract_unprocessed_files(
-            storage_df=source_df, extracted_df=target_df, malicious=True, num_files=1
+        unprocessed_files_df = spark_session.sql(
+            extract_command._query.unprocessed_files(malicious=True, num_files=1)
         )
 
         # Then
@@ -95,64 +95,164 @@ class TestExtractCommand:
         assert unprocessed_files_df.first().name == "name2"
         assert unprocessed_files_df.first().hash == "hash2"
 
-    def test_extract_unprocessed_files_when_there_is_no_processed_file(
+    def test_unprocessed_files_query_when_there_is_no_processed_file(
         self, spark_session: SparkSession, extract_command: ExtractCommand
     ):
         # Given
         source_data = [
-            Row(
-                name="name1",
-                hash="hash1",
-                size=1,
-                malicious=True,
-                sync_time=datetime.now(timezone.utc),
-            ),
-            Row(
-                name="name2",
-                hash="hash2",
-                size=2,
-                malicious=True,
-                sync_time=datetime.now(timezone.utc),
-            ),
+            Row(id=1, name="name1", hash="hash1", size=1, malicious=True),
+            Row(id=2, name="name2", hash="hash2", size=2, malicious=True),
         ]
-        target_data = []
-
-        source_df = spark_session.createDataFrame(source_data)
-        target_df = spark_session.createDataFrame(target_data, extract_command._schema)
+        spark_session.createDataFrame(source_data).createOrReplaceTempView(
+            "source_table"
+        )
+        spark_session.createDataFrame(
+            [], "id INT, name STRING, hash STRING"
+        ).createOrReplaceTempView("target_table")
 
         # When
-        unprocessed_files_df = extract_command._extract_unprocessed_files(
-            storage_df=source_df, extracted_df=target_df, malicious=True, num_files=2
+        unprocessed_files_df = spark_session.sql(
+            extract_command._query.unprocessed_files(malicious=True, num_files=2)
         )
 
         # Then
         assert unprocessed_files_df.count() == 2
 
-    def test_get_unique_rows_with_matching_hashes(
+    def test_unprocessed_files_query_with_max_id(
         self, spark_session: SparkSession, extract_command: ExtractCommand
     ):
         # Given
         source_data = [
-            Row(
-                name="name1",
-                hash="hash1",
-                size=1,
-                malicious=True,
-                sync_time=datetime.now(timezone.utc),
-            ),
-            Row(
-                name="name2",
-                hash="hash1",
-                size=1,
-                malicious=True,
-                sync_time=datetime.now(timezone.utc),
-            ),
+            Row(id=1, name="name1", hash="hash1", size=1, malicious=True),
+            Row(id=2, name="name2", hash="hash2", size=2, malicious=True),
+            Row(id=3, name="name3", hash="hash3", size=3, malicious=True),
+        ]
+        spark_session.createDataFrame(source_data).createOrReplaceTempView(
+            "source_table"
+        )
+        spark_session.createDataFrame(
+            [Row(id=1, name="name1", hash="hash1")]
+        ).createOrReplaceTempView("target_table")
+
+        # When
+        unprocessed_files_df = spark_session.sql(
+            extract_command._query.unprocessed_files(malicious=True, max_id=2)
+        )
+
+        # Then
+        assert [row.name for row in unprocessed_files_df.collect()] == ["name2"]
+
+    def test_quota_query_selects_each_class_in_one_query(
+        self, spark_session: SparkSession, extract_command: ExtractCommand
+    ):
+        # Given
+        source_data = [
+            Row(id=i, name=f"name{i}", hash=f"hash{i}", size=i, malicious=i % 3 == 0)
+            for i in range(1, 10)
+        ]
+        spark_session.createDataFrame(source_data).createOrReplaceTempView(
+            "source_table"
+        )
+        spark_session.createDataFrame(
+            [Row(id=1, name="name1", hash="hash1")]
+        ).createOrReplaceTempView("target_table")
+
+        # When
+        unprocessed_files_df = spark_session.sql(
+            extract_command._query.quota(quotas={False: 3, True: 1})
+        )
+
+        # Then
+        assert sorted(row.id for row in unprocessed_files_df.collect()) == [
+            2,
+            3,
+            4,
+            5,
+        ]
+
+    def test_execute_without_quotas_does_nothing(self, extract_command: ExtractCommand):
+        with patch.object(ExtractCommand, "_create_spark_session") as spark:
+            extract_command.execute(quotas={False: 0, True: 0})
+
+        spark.assert_not_called()
+
+    def test_load_unprocessed_files_partitions_by_id_bounds(
+        self, extract_command: ExtractCommand
+    ):
+        # Given
+        spark = Mock()
+        spark.sparkContext.defaultParallelism = 4
+        reader = spark.read.format.return_value
+        reader.option.return_value = reader
+        reader.load.return_value.collect.return_value = [
+            Row(malicious=False, lower_bound=10, upper_bound=11),
+            Row(malicious=True, lower_bound=8, upper_bound=9),
         ]
 
+        # When
+        extract_command._load_unprocessed_files(spark=spark, quotas={False: 2, True: 2})
+
+        # Then
+        options = dict(call.args for call in reader.option.call_args_list)
+        assert options["partitionColumn"] == "id"
+        assert options["lowerBound"] == 8
+        assert options["upperBound"] == 12
+        assert options["numPartitions"] == 4
+        assert options["fetchsize"] == 10_000
+        assert "<= 11" in options["dbtable"]
+        assert "<= 9" in options["dbtable"]
+
+    def test_load_unprocessed_files_without_candidates(
+        self, extract_command: ExtractCommand
+    ):
+        # Given
+        spark = Mock()
+        reader = spark.read.format.return_value
+        reader.option.return_value = reader
+        reader.load.return_value.collect.return_value = []
+
+        # When
+        extract_command._load_unprocessed_files(spark=spark, quotas={True: 2})
+
+        # Then
+        options = [call.args[0] for call in reader.option.call_args_list]
+        assert "partitionColumn" not in options
+
+    def test_load_extracted_files_filters_by_candidate_hashes(
+        self, spark_session: SparkSession, extract_command: ExtractCommand
+    ):
+        # Given
+        spark = Mock()
+        reader = spark.read.format.return_value
+        reader.option.return_value = reader
+        unprocessed_files_df = spark_session.createDataFrame(
+            [
+                Row(name="name1", hash="hash2"),
+                Row(name="name2", hash="hash1"),
+                Row(name="name3", hash="hash1"),
+            ]
+        )
+
+        # When
+        extract_command._load_extracted_files(
+            spark=spark, unprocessed_files_df=unprocessed_files_df
+        )
+
+        # Then
+        options = dict(call.args for call in reader.option.call_args_list)
+        assert "partitionColumn" not in options
+        assert "IN ('hash1', 'hash2')" in options["dbtable"]
+        assert "source_table" not in options["dbtable"]
+
+    def test_extracted_rows_query_selects_first_row_per_matching_hash(
+        self, spark_session: SparkSession, extract_command: ExtractCommand
+    ):
+        # Given
         target_data = [
             Row(
-                name="name1",
-                hash="hash1",
+                id=id_,
+                name=name,
+                hash=file_hash,
                 size=1,
                 malicious=True,
                 architecture="x64",
@@ -161,35 +261,30 @@ class TestExtractCommand:
                 type="dll",
                 status="EXTRACTED",
                 created_at=datetime.now(timezone.utc),
-            ),
-            Row(
-                name="name2",
-                hash="hash2",
-                size=2,
-                malicious=True,
-                architecture="x64",
-                num_imports=1,
-                num_exports=1,
-                type="dll",
-                status="EXTRACTED",
-                created_at=datetime.now(timezone.utc),
-            ),
+            )
+            for id_, name, file_hash in [
+                (3, "name3", "hash1"),
+                (1, "name1", "hash1"),
+                (2, "name2", "hash2"),
+                (4, "name4", "hash3"),
+            ]
         ]
-
-        source_df = spark_session.createDataFrame(source_data)
-        target_df = spark_session.createDataFrame(target_data)
+        spark_session.createDataFrame(target_data).createOrReplaceTempView(
+            "target_table"
+        )
 
         # When
-        matching_rows_df = (
-            extract_command._get_unique_extracted_rows_with_matching_hashes(
-                unprocessed_files_df=source_df, extracted_df=target_df
+        matching_rows_df = spark_session.sql(
+            extract_command._get_extracted_rows_with_matching_hashes_query(
+                hashes=["hash1", "hash3", "hash4"]
             )
         )
 
         # Then
-        assert matching_rows_df.count() == 1
-        assert matching_rows_df.first().name == "name1"
-        assert matching_rows_df.first().hash == "hash1"
+        assert sorted((row.name, row.hash) for row in matching_rows_df.collect()) == [
+            ("name1", "hash1"),
+            ("name4", "hash3"),
+        ]
 
     def test_join_unprocessed_and_matched_data(
         self, spark_session: SparkSession, extract_command: ExtractCommand
@@ -215,10 +310,10 @@ class TestExtractCommand:
 
         matching_rows_data = [
             Row(
-                name="name1",
+                name="name0",
                 hash="hash1",
                 size=1,
-                malicious=True,
+                malicious=False,
                 architecture="x64",
                 num_imports=1,
                 num_exports=1,
@@ -249,6 +344,7 @@ class TestExtractCommand:
         assert unprocessed_files_matching_rows_df.first().num_imports == 1
         assert unprocessed_files_matching_rows_df.first().num_exports == 1
         assert unprocessed_files_matching_rows_df.first().status == "EXTRACTED"
+        assert unprocessed_files_matching_rows_df.first().malicious is True
         assert unprocessed_files_matching_rows_df.first().created_at is not None
 
     def test_get_unprocessed_files(
@@ -333,9 +429,9 @@ class TestExtractCommand:
         # When
 
         with patch(
-            "domain.file_data.command.extract.process_partition"
-        ) as mock_process_partition:
-            mock_process_partition.return_value = [
+            "domain.file_data.command.extract.process_record_batches"
+        ) as mock_process_record_batches:
+            processed_rows = [
                 Row(
                     name="name1",
                     hash="hash1",
@@ -361,6 +457,11 @@ class TestExtractCommand:
                     created_at=datetime.now(timezone.utc),
                 ),
             ]
+            mock_process_record_batches.side_effect = lambda schema, batches: [
+                pa.RecordBatch.from_pylist(
+                    [row.asDict() for row in processed_rows], schema=schema
+                )
+            ]
             processed_files_df = (
                 extract_command._process_distinct_files_and_update_metadata(
                     unprocessed_files_df=unprocessed_files_df, spark=spark_session
@@ -379,3 +480,241 @@ class TestExtractCommand:
         assert processed_files_df.first().status == "EXTRACTED"
         assert processed_files_df.first().malicious is True
         assert processed_files_df.first().created_at is not None
+
+    def test_process_partitions_by_hash_without_join(
+        self, spark_session: SparkSession, extract_command: ExtractCommand
+    ):
+        # Given
+        unprocessed_files_df = spark_session.createDataFrame(
+            [
+                Row(name="name1", hash="hash1", size=10, malicious=True),
+                Row(name="name2", hash="hash1", size=10, malicious=True),
+                Row(name="name3", hash="hash2", size=15, malicious=True),
+            ]
+        )
+        extract_command._partition_target_bytes = 10
+
+        # When
+        processed_files_df = (
+            extract_command._process_distinct_files_and_update_metadata(
+                unprocessed_files_df=unprocessed_files_df,
+                spark=spark_session,
+                num_bytes=35,
+            )
+        )
+
+        # Then
+        plan = processed_files_df._jdf.queryExecution().executedPlan().toString()
+        assert plan.count("Exchange") == 1
+        assert "hashpartitioning(hash#" in plan
+        assert "Join" not in plan
+        assert processed_files_df.columns == extract_command._schema.names
+        assert extract_command._get_process_partitions(spark_session, 35) == 4
+        extract_command._process_partitions = 2
+        assert extract_command._get_process_partitions(spark_session, 35) == 2
+
+    def test_process_packs_partitions_by_size(
+        self, spark_session: SparkSession, extract_command: ExtractCommand
+    ):
+        # Given
+        unprocessed_files_df = spark_session.createDataFrame(
+            [
+                Row(name="name1", hash="hash1", size=90, malicious=True),
+                Row(name="name2", hash="hash1", size=90, malicious=True),
+                Row(name="name3", hash="hash2", size=60, malicious=True),
+                Row(name="name4", hash="hash3", size=30, malicious=True),
+                Row(name="name5", hash="hash4", size=30, malicious=False),
+                Row(name="name6", hash="hash5", size=500, malicious=False),
+            ]
+        )
+        extract_command._partitioner = "size"
+        extract_command._process_partitions = 2
+        extract_command._isolate_file_bytes = 500
+
+        # When
+        files_df = extract_command._pack_by_size(
+            files_df=unprocessed_files_df, spark=spark_session, num_partitions=2
+        )
+
+        # Then
+        partitions = files_df.rdd.glom().collect()
+        assert len(partitions) == 3
+        assert sorted(
+            sorted(row.name for row in partition) for partition in partitions
+        ) == [["name1", "name2", "name4"], ["name3", "name5"], ["name6"]]
+        assert set(files_df.columns) == set(unprocessed_files_df.columns)
+
+    def test_pack_by_size_treats_missing_sizes_as_empty(
+        self, spark_session: SparkSession, extract_command: ExtractCommand
+    ):
+        # Given
+        unprocessed_files_df = spark_session.createDataFrame(
+            [("name1", "hash1", None, True), ("name2", "hash2", 10, False)],
+            "name string, hash string, size int, malicious boolean",
+        )
+
+        # When
+        files_df = extract_command._pack_by_size(
+            files_df=unprocessed_files_df, spark=spark_session, num_partitions=2
+        )
+
+        # Then
+        partitions = files_df.rdd.glom().collect()
+        assert sorted(
+            sorted(row.name for row in partition) for partition in partitions
+        ) == [["name1"], ["name2"]]
+
+    def test_pack_by_size_falls_back_to_hash_partitioning_above_cap(
+        self, spark_session: SparkSession, extract_command: ExtractCommand
+    ):
+        # Given
+        unprocessed_files_df = spark_session.createDataFrame(
+            [
+                Row(name=f"name{i}", hash=f"hash{i}", size=i, malicious=True)
+                for i in range(3)
+            ]
+        )
+        extract_command._pack_max_hashes = 2
+
+        # When
+        files_df = extract_command._pack_by_size(
+            files_df=unprocessed_files_df, spark=spark_session, num_partitions=2
+        )
+
+        # Then
+        plan = files_df._jdf.queryExecution().executedPlan().toString()
+        assert "hashpartitioning(hash#" in plan
+        assert "Join" not in plan
+        assert files_df.count() == 3
+
+    def test_get_partition_keys_covers_every_partition(
+        self, spark_session: SparkSession, extract_command: ExtractCommand
+    ):
+        # When
+        partition_keys = extract_command._get_partition_keys(spark_session, 7)
+
+        # Then
+        assert sorted(partition_keys) == list(range(7))
+        assert {
+            row.key: row.partition
+            for row in spark_session.createDataFrame(
+                [(key,) for key in partition_keys.values()], "key int"
+            )
+            .select("key", pmod(hash_(col("key")), lit(7)).alias("partition"))
+            .collect()
+        } == {key: partition for partition, key in partition_keys.items()}
+
+    def test_execute_scans_each_jdbc_source_once(
+        self, spark_session: SparkSession, extract_command: ExtractCommand
+    ):
+        # Given
+        loads: list[str] = []
+        scans = {
+            source: spark_session.sparkContext.accumulator(0)
+            for source in ("candidates", "extracted")
+        }
+        sources = {
+            "bounds": [Row(malicious=True, lower_bound=1, upper_bound=3)],
+            "candidates": [
+                Row(id=1, name="name1", hash="hash1", size=1, malicious=True),
+                Row(id=2, name="name2", hash="hash2", size=2, malicious=True),
+                Row(id=3, name="name3", hash="hash2", size=2, malicious=True),
+            ],
+            "extracted": [
+                Row(
+                    id=7,
+                    name="name0",
+                    hash="hash1",
+                    size=1,
+                    architecture="x64",
+                    num_imports=1,
+                    num_exports=1,
+                    status="EXTRACTED",
+                    malicious=True,
+                    type="dll",
+                    created_at=datetime.now(timezone.utc),
+                )
+            ],
+        }
+
+        queries: dict[str, str] = {}
+
+        def load_data(spark, query, id_bounds=None):
+            if "lower_bound" in query:
+                source = "bounds"
+            elif "source_table" in query:
+                source = "candidates"
+            else:
+                source = "extracted"
+            loads.append(source)
+            queries[source] = query
+            if source not in scans:
+                return spark.createDataFrame(sources[source])
+            accumulator = scans[source]
+
+            def count_scan(rows: Iterator[Row]) -> Iterator[Row]:
+                accumulator.add(1)
+                yield from rows
+
+            rdd = spark.sparkContext.parallelize(sources[source], 1)
+            return spark.createDataFrame(
+                rdd.mapPartitions(count_scan), spark.createDataFrame(rdd).schema
+            )
+
+        def process_record_batches(
+            schema: pa.Schema, batches: Iterator[pa.RecordBatch]
+        ) -> Iterator[pa.RecordBatch]:
+            for batch in batches:
+                yield pa.RecordBatch.from_pylist(
+                    [
+                        {
+                            **row,
+                            "architecture": "x32",
+                            "num_imports": 0,
+                            "num_exports": 0,
+                            "type": "dll",
+                            "status": "EXTRACTED",
+                            "created_at": datetime.now(timezone.utc),
+                        }
+                        for row in batch.to_pylist()
+                    ],
+                    schema=schema,
+                )
+
+        written: list[list[Row]] = []
+
+        # When
+        with patch.object(
+            ExtractCommand, "_create_spark_session", return_value=spark_session
+        ), patch.object(
+            ExtractCommand, "_load_data", side_effect=load_data
+        ), patch.object(
+            ExtractCommand,
+            "_write_to_database",
+            side_effect=lambda dataframe, metrics_accumulator: written.append(
+                dataframe.collect()
+            ),
+        ), patch(
+            "domain.file_data.command.extract.process_record_batches",
+            process_record_batches,
+        ):
+            extract_command.execute(quotas={False: 3, True: 3})
+
+        # Then
+        assert sorted(loads) == ["bounds", "candidates", "extracted"]
+        assert "IN ('hash1', 'hash2')" in queries["extracted"]
+        assert {source: scan.value for source, scan in scans.items()} == {
+            "candidates": 1,
+            "extracted": 1,
+        }
+        assert {
+            (histogram["name"], histogram["labels"]["stage"])
+            for histogram in metrics.snapshot()["histograms"]
+            if histogram["name"].startswith("spark_")
+        } >= {("spark_stage_seconds", "select"), ("spark_task_seconds", "process")}
+        assert len(written) == 1
+        assert sorted((row.name, row.architecture) for row in written[0]) == [
+            ("name1", "x64"),
+            ("name2", "x32"),
+            ("name3", "x32"),
+        ]
@@ -0,0 +1,141 @@
+import datetime
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from domain.file_data.command.local_extract import LocalExtractCommand
+from domain.file_data.file_processor import FileProcessor
+from domain.file_data.model.extracted_file import ExtractedFile
+from domain.file_data.model.file_sync_info import NotExtractedFile
+from domain.file_data.model.pe_file_data import PeFileData
+
+
+@pytest.fixture
+def pe_file_handler() -> Mock:
+    return Mock(
+        execute=AsyncMock(
+            return_value=PeFileData(
+                file_type="dll", arch="x64", num_imports=1, num_exports=2
+            )
+        )
+    )
+
+
+@pytest.fixture
+def file_processor(pe_file_handler: Mock) -> FileProcessor:
+    s3_file_service = Mock()
+    s3_file_service.get_streaming_body_by_key = AsyncMock(return_value=Mock())
+    return FileProcessor(
+        s3_file_service=s3_file_service, pe_file_handler=pe_file_handler
+    )
+
+
+class TestLocalExtractCommand:
+    @pytest.mark.asyncio
+    async def test_execute_reuses_matching_hashes_and_extracts_each_hash_once(
+        self, file_processor: FileProcessor, pe_file_handler: Mock
+    ):
+        # Given
+        unprocessed_files = [
+            NotExtractedFile(name="a", hash="known", size=1, malicious=True),
+            NotExtractedFile(name="b", hash="new", size=2, malicious=False),
+            NotExtractedFile(name="c", hash="new", size=2, malicious=True),
+        ]
+        extract_candidate_repository = Mock(
+            get_unprocessed_many=AsyncMock(return_value=unprocessed_files),
+            get_extracted_by_hashes=AsyncMock(
+                return_value=[
+                    ExtractedFile(
+                        name="old",
+                        hash="known",
+                        size=1,
+                        architecture="x32",
+                        num_imports=3,
+                        num_exports=0,
+                        type="exe",
+                        status="EXTRACTED",
+                        malicious=False,
+                        created_at=datetime.datetime(2020, 1, 1),
+                    )
+                ]
+            ),
+        )
+        extracted_file_repository = Mock(upsert_many=AsyncMock())
+        command = LocalExtractCommand(
+            extract_candidate_repository=extract_candidate_repository,
+            extracted_file_repository=extracted_file_repository,
+            file_processor=file_processor,
+        )
+
+        # When
+        await command.execute(quotas={False: 1, True: 2})
+
+        # Then
+        extract_candidate_repository.get_unprocessed_many.assert_awaited_once_with(
+            quotas={False: 1, True: 2}
+        )
+        assert pe_file_handler.execute.await_count == 1
+        (call,) = extracted_file_repository.upsert_many.call_args_list
+        written = {file.name: file for file in call.kwargs["files"]}
+        assert sorted(written) == ["a", "b", "c"]
+        assert written["a"].architecture == "x32"
+        assert written["a"].created_at > datetime.datetime(
+            2020, 1, 1, tzinfo=datetime.timezone.utc
+        )
+        assert written["b"].architecture == written["c"].architecture == "x64"
+        assert {name: file.malicious for name, file in written.items()} == {
+            "a": True,
+            "b": False,
+            "c": True,
+        }
+
+    @pytest.mark.asyncio
+    async def test_execute_writes_in_batches(self, file_processor: FileProcessor):
+        # Given
+        unprocessed_files = [
+            NotExtractedFile(name=f"name{i}", hash=f"hash{i}", size=i, malicious=False)
+            for i in range(5)
+        ]
+        extracted_file_repository = Mock(upsert_many=AsyncMock())
+        command = LocalExtractCommand(
+            extract_candidate_repository=Mock(
+                get_unprocessed_many=AsyncMock(return_value=unprocessed_files),
+                get_extracted_by_hashes=AsyncMock(return_value=[]),
+            ),
+            extracted_file_repository=extracted_file_repository,
+            file_processor=file_processor,
+            write_batch_size=2,
+        )
+
+        # When
+        await command.execute(quotas={False: 5})
+
+        # Then
+        batch_sizes = [
+            len(call.kwargs["files"])
+            for call in extracted_file_repository.upsert_many.call_args_list
+        ]
+        assert batch_sizes == [2, 2, 1]
+
+    @pytest.mark.asyncio
+    async def test_execute_without_unprocessed_files_writes_nothing(
+        self, file_processor: FileProcessor
+    ):
+        # Given
+        extract_candidate_repository = Mock(
+            get_unprocessed_many=AsyncMock(return_value=[]),
+            get_extracted_by_hashes=AsyncMock(),
+        )
+        extracted_file_repository = Mock(upsert_many=AsyncMock())
+        command = LocalExtractCommand(
+            extract_candidate_repository=extract_candidate_repository,
+            extracted_file_repository=extracted_file_repository,
+            file_processor=file_processor,
+        )
+
+        # When
+        await command.execute(quotas={False: 5, True: 5})
+
+        # Then
+        extract_candidate_repository.get_extracted_by_hashes.assert_not_awaited()
+        extracted_file_repository.upsert_many.assert_not_awaited()
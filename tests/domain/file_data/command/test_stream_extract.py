@@ -0,0 +1,153 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from domain.file_data.command.stream_extract import StreamExtractCommand
+from domain.file_data.file_processor import FileProcessor
+from domain.file_data.model.extract_queue import ExtractQueueItem
+from domain.file_data.model.pe_file_data import PeFileData
+
+
+class InMemoryExtractQueue:
+    def __init__(self, items: list[ExtractQueueItem]):
+        self.items = items
+        self.claimed: list[ExtractQueueItem] = []
+        self.completed: list[ExtractQueueItem] = []
+        self.waits = 0
+        self.listening = False
+
+    async def listen(self) -> None:
+        self.listening = True
+
+    async def close(self) -> None:
+        self.listening = False
+
+    async def wait(self, timeout: float) -> None:
+        self.waits += 1
+
+    async def claim(self, limit: int) -> list[ExtractQueueItem]:
+        items, self.items = self.items[:limit], self.items[limit:]
+        self.claimed.extend(items)
+        return items
+
+    async def complete(self, items: list[ExtractQueueItem]) -> None:
+        self.completed.extend(items)
+
+
+@pytest.fixture
+def file_processor() -> FileProcessor:
+    pe_file_handler = Mock()
+    pe_file_handler.execute = AsyncMock(
+        return_value=PeFileData(
+            file_type="dll", arch="x64", num_imports=1, num_exports=2
+        )
+    )
+    s3_file_service = Mock()
+    s3_file_service.get_streaming_body_by_key = AsyncMock(return_value=Mock())
+    return FileProcessor(
+        s3_file_service=s3_file_service, pe_file_handler=pe_file_handler
+    )
+
+
+class TestStreamExtractCommand:
+    @pytest.mark.asyncio
+    async def test_execute_processes_queue_in_micro_batches(
+        self, file_processor: FileProcessor
+    ):
+        # Given
+        items = [
+            ExtractQueueItem(
+                id=i, name=f"name{i}", hash=f"hash{i}", size=i, malicious=bool(i % 2)
+            )
+            for i in range(5)
+        ]
+        extract_queue = InMemoryExtractQueue(items)
+        extracted_file_repository = Mock(upsert_many=AsyncMock())
+        command = StreamExtractCommand(
+            extract_queue=extract_queue,
+            file_processor=file_processor,
+            extracted_file_repository=extracted_file_repository,
+            batch_size=2,
+        )
+
+        # When
+        await command.execute(should_stop=lambda: extract_queue.waits > 0)
+
+        # Then
+        batches = [
+            sorted(file.name for file in call.kwargs["files"])
+            for call in extracted_file_repository.upsert_many.call_args_list
+        ]
+        assert batches == [["name0", "name1"], ["name2", "name3"], ["name4"]]
+        assert extract_queue.completed == items
+        assert not extract_queue.listening
+
+    @pytest.mark.asyncio
+    async def test_execute_records_error_for_missing_object(
+        self, file_processor: FileProcessor
+    ):
+        # Given
+        items = [
+            ExtractQueueItem(
+                id=i, name=f"name{i}", hash=f"hash{i}", size=i, malicious=False
+            )
+            for i in range(3)
+        ]
+
+        async def get_streaming_body_by_key(file_key: str) -> Mock:
+            if file_key == "name1":
+                raise ClientError(
+                    {"Error": {"Code": "NoSuchKey", "Message": "Not Found"}},
+                    "GetObject",
+                )
+            return Mock()
+
+        file_processor._s3_file_service.get_streaming_body_by_key = (
+            get_streaming_body_by_key
+        )
+        extract_queue = InMemoryExtractQueue(items)
+        extracted_file_repository = Mock(upsert_many=AsyncMock())
+        command = StreamExtractCommand(
+            extract_queue=extract_queue,
+            file_processor=file_processor,
+            extracted_file_repository=extracted_file_repository,
+        )
+
+        # When
+        await command.execute(should_stop=lambda: extract_queue.waits > 0)
+
+        # Then
+        (call,) = extracted_file_repository.upsert_many.call_args_list
+        assert sorted((file.name, file.status) for file in call.kwargs["files"]) == [
+            ("name0", "EXTRACTED"),
+            ("name1", "ERROR"),
+            ("name2", "EXTRACTED"),
+        ]
+        assert extract_queue.completed == items
+
+    @pytest.mark.asyncio
+    async def test_execute_keeps_items_claimed_when_write_fails(
+        self, file_processor: FileProcessor
+    ):
+        # Given
+        items = [
+            ExtractQueueItem(id=1, name="name1", hash="hash1", size=1, malicious=False)
+        ]
+        extract_queue = InMemoryExtractQueue(items)
+        command = StreamExtractCommand(
+            extract_queue=extract_queue,
+            file_processor=file_processor,
+            extracted_file_repository=Mock(
+                upsert_many=AsyncMock(side_effect=RuntimeError("database is down"))
+            ),
+        )
+
+        # When
+        with pytest.raises(RuntimeError):
+            await command.execute(should_stop=lambda: False)
+
+        # Then
+        assert extract_queue.claimed == items
+        assert extract_queue.completed == []
+        assert not extract_queue.listening
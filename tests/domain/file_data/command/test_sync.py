@@ -0,0 +1,304 @@
+import asyncio
+import datetime
+from typing import AsyncGenerator, Optional
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from domain.file_data.command.sync import SyncCommand
+from domain.file_data.model.file_sync_info import NotExtractedFile
+from domain.file_data.model.sync_checkpoint import SyncCheckpoint
+
+
+class InMemoryStorageService:
+    def __init__(
+        self,
+        keys: list[str],
+        last_modified: Optional[dict[str, datetime.datetime]] = None,
+    ):
+        self.keys = sorted(keys)
+        self.last_modified = last_modified or {}
+        self.listers = 0
+        self.max_listers = 0
+
+    async def paginate_by_prefix(
+        self,
+        prefix: str,
+        malicious: bool,
+        page_size: int,
+        start_after: Optional[str] = None,
+        end_at: Optional[str] = None,
+    ) -> AsyncGenerator[list[NotExtractedFile], None]:
+        self.listers += 1
+        self.max_listers = max(self.max_listers, self.listers)
+        try:
+            keys = [
+                key
+                for key in self.keys
+                if key.startswith(prefix)
+                and (start_after is None or key > start_after)
+                and (end_at is None or key <= end_at)
+            ]
+            for i in range(0, len(keys), 2):
+                await asyncio.sleep(0)
+                yield [
+                    NotExtractedFile(
+                        name=key,
+                        hash=key,
+                        size=1,
+                        malicious=malicious,
+                        last_modified=self.last_modified.get(key),
+                    )
+                    for key in keys[i : i + 2]
+                ]
+        finally:
+            self.listers -= 1
+
+
+class InMemoryCheckpointRepository:
+    def __init__(self, checkpoints: Optional[list[SyncCheckpoint]] = None):
+        self.checkpoints = {
+            checkpoint.shard: checkpoint for checkpoint in checkpoints or []
+        }
+        self.saved: list[SyncCheckpoint] = []
+
+    async def get(self, shard: str) -> Optional[SyncCheckpoint]:
+        return self.checkpoints.get(shard)
+
+    async def save(self, checkpoint: SyncCheckpoint) -> None:
+        self.checkpoints[checkpoint.shard] = checkpoint
+        self.saved.append(checkpoint)
+
+
+@pytest.fixture
+def file_repository() -> Mock:
+    file_repository = Mock()
+    file_repository.upsert_many = AsyncMock()
+    file_repository.insert_new_many = AsyncMock()
+    return file_repository
+
+
+def upserted_names(file_repository: Mock) -> list[str]:
+    return [
+        file.name
+        for call in file_repository.upsert_many.call_args_list
+        for file in call.kwargs["files"]
+    ]
+
+
+def inserted_names(file_repository: Mock) -> list[str]:
+    return [
+        file.name
+        for call in file_repository.insert_new_many.call_args_list
+        for file in call.kwargs["files"]
+    ]
+
+
+class TestSyncCommand:
+    def test_get_shards_cover_whole_prefix(self, file_repository: Mock):
+        sync_command = SyncCommand(
+            storage_service=Mock(),
+            file_repository=file_repository,
+            shard_alphabet="ba",
+            shard_depth=1,
+        )
+
+        assert sync_command._get_shards(prefix="0/") == [
+            (None, "0/a"),
+            ("0/a", "0/b"),
+            ("0/b", None),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_execute_without_shards(self, file_repository: Mock):
+        keys = ["0/a", "0/b", "0/c", "1/a"]
+        sync_command = SyncCommand(
+            storage_service=InMemoryStorageService(keys),
+            file_repository=file_repository,
+        )
+
+        await sync_command.execute(prefix="0/", malicious=False)
+
+        assert upserted_names(file_repository) == ["0/a", "0/b", "0/c"]
+
+    @pytest.mark.asyncio
+    async def test_execute_with_shards_lists_every_key_once(
+        self, file_repository: Mock
+    ):
+        keys = [
+            f"0/{first}{second}"
+            for first in "0123456789abcdefXYZ_"
+            for second in "05af"
+        ] + ["0/", "0/0", "0/f", "1/00"]
+        storage_service = InMemoryStorageService(keys)
+        sync_command = SyncCommand(
+            storage_service=storage_service,
+            file_repository=file_repository,
+            shard_alphabet="0123456789abcdef",
+            shard_depth=2,
+            max_listers=3,
+        )
+
+        await sync_command.execute(prefix="0/", malicious=False)
+
+        names = upserted_names(file_repository)
+        assert sorted(names) == sorted(key for key in keys if key.startswith("0/"))
+        assert len(names) == len(set(names))
+        assert storage_service.max_listers == 3
+
+    @pytest.mark.asyncio
+    async def test_execute_overlaps_listing_and_upserts(self):
+        keys = [f"0/{i:03}" for i in range(40)]
+        storage_service = InMemoryStorageService(keys)
+        in_flight = 0
+        max_in_flight = 0
+        upserted: list[str] = []
+
+        async def upsert_many(files, sync_time):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.001)
+            upserted.extend(file.name for file in files)
+            in_flight -= 1
+
+        file_repository = Mock()
+        file_repository.upsert_many = upsert_many
+        sync_command = SyncCommand(
+            storage_service=storage_service,
+            file_repository=file_repository,
+            queue_depth=2,
+            upsert_workers=3,
+        )
+
+        await sync_command.execute(prefix="0/", malicious=False)
+
+        assert sorted(upserted) == keys
+        assert max_in_flight == 3
+
+    @pytest.mark.asyncio
+    async def test_execute_propagates_upsert_errors(self, file_repository: Mock):
+        keys = [f"0/{i:03}" for i in range(40)]
+        file_repository.upsert_many.side_effect = RuntimeError("database is down")
+        sync_command = SyncCommand(
+            storage_service=InMemoryStorageService(keys),
+            file_repository=file_repository,
+            queue_depth=1,
+            upsert_workers=1,
+        )
+
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(
+                sync_command.execute(prefix="0/", malicious=False), timeout=5
+            )
+
+    @pytest.mark.asyncio
+    async def test_execute_incremental_skips_files_below_watermark(
+        self, file_repository: Mock
+    ):
+        watermark = datetime.datetime(2023, 12, 1, tzinfo=datetime.timezone.utc)
+        last_modified = {
+            "0/a": watermark - datetime.timedelta(days=2),
+            "0/b": watermark - datetime.timedelta(minutes=5),
+            "0/c": watermark + datetime.timedelta(days=1),
+        }
+        checkpoint_repository = InMemoryCheckpointRepository(
+            [SyncCheckpoint(shard="0/||", completed=True, watermark=watermark)]
+        )
+        sync_command = SyncCommand(
+            storage_service=InMemoryStorageService(
+                ["0/a", "0/b", "0/c", "0/d"], last_modified
+            ),
+            file_repository=file_repository,
+            checkpoint_repository=checkpoint_repository,
+            mode="incremental",
+            watermark_lag=datetime.timedelta(hours=1),
+        )
+
+        await sync_command.execute(prefix="0/", malicious=False)
+
+        assert inserted_names(file_repository) == ["0/b", "0/c", "0/d"]
+        file_repository.upsert_many.assert_not_called()
+        assert checkpoint_repository.checkpoints["0/||"] == SyncCheckpoint(
+            shard="0/||", completed=True, watermark=last_modified["0/c"]
+        )
+
+    @pytest.mark.asyncio
+    async def test_execute_incremental_resumes_incomplete_shard(
+        self, file_repository: Mock
+    ):
+        keys = [f"0/{i:03}" for i in range(10)]
+        checkpoint_repository = InMemoryCheckpointRepository(
+            [SyncCheckpoint(shard="0/||", completed=False, last_key="0/005")]
+        )
+        sync_command = SyncCommand(
+            storage_service=InMemoryStorageService(keys),
+            file_repository=file_repository,
+            checkpoint_repository=checkpoint_repository,
+            mode="incremental",
+        )
+
+        await sync_command.execute(prefix="0/", malicious=False)
+
+        assert inserted_names(file_repository) == keys[6:]
+        assert checkpoint_repository.checkpoints["0/||"].completed
+
+    @pytest.mark.asyncio
+    async def test_execute_incremental_checkpoints_only_written_pages(self):
+        keys = [f"0/{i:03}" for i in range(10)]
+        checkpoint_repository = InMemoryCheckpointRepository()
+        written = 0
+
+        async def insert_new_many(files, sync_time):
+            nonlocal written
+            if written == 2:
+                raise RuntimeError("database is down")
+            written += 1
+
+        file_repository = Mock()
+        file_repository.insert_new_many = insert_new_many
+        sync_command = SyncCommand(
+            storage_service=InMemoryStorageService(keys),
+            file_repository=file_repository,
+            checkpoint_repository=checkpoint_repository,
+            mode="incremental",
+            queue_depth=1,
+        )
+
+        with pytest.raises(RuntimeError):
+            await sync_command.execute(prefix="0/", malicious=False)
+
+        checkpoint = checkpoint_repository.checkpoints["0/||"]
+        assert not checkpoint.completed
+        assert checkpoint.last_key is not None
+        assert checkpoint.last_key <= keys[2 * written - 1]
+
+    @pytest.mark.asyncio
+    async def test_prune_streams_all_shards_to_repository(self):
+        keys = [f"0/{first}{second}" for first in "0af" for second in "05"]
+        listed: list[str] = []
+
+        async def delete_missing(prefix, pages, synced_before):
+            async for files in pages:
+                listed.extend(file.name for file in files)
+            return 2
+
+        file_repository = Mock()
+        file_repository.delete_missing = delete_missing
+        sync_command = SyncCommand(
+            storage_service=InMemoryStorageService(keys + ["1/00"]),
+            file_repository=file_repository,
+            shard_alphabet="0123456789abcdef",
+            max_listers=2,
+        )
+
+        assert await sync_command.prune(prefix="0/", malicious=False) == 2
+        assert sorted(listed) == keys
+
+    def test_incremental_requires_checkpoint_repository(self, file_repository: Mock):
+        with pytest.raises(ValueError):
+            SyncCommand(
+                storage_service=Mock(),
+                file_repository=file_repository,
+                mode="incremental",
+            )
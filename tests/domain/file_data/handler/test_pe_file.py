@@ -1,4 +1,5 @@
 import io
+from concurrent.futures import ProcessPoolExecutor
 
 import pytest
 from botocore.response import StreamingBody
@@ -49,3 +50,69 @@ class TestPeFileHandler:
         streaming_body = StreamingBody(io.BytesIO(file_content), len(file_content))
         with pytest.raises(ExtractingFileError):
             await pe_file_handler.execute(streaming_body)
+
+    @pytest.mark.asyncio
+    async def test_execute_with_parser_pool(self):
+        with open(
+            "/app/tests/fixtures/01nCLd7AG7XAlI0JH9G2E3rFbuahjIaD.dll", "rb"
+        ) as file:
+            file_content = file.read()
+        streaming_body = StreamingBody(io.BytesIO(file_content), len(file_content))
+
+        with ProcessPoolExecutor(max_workers=1) as parser_pool:
+            pe_file_handler = PeFileHandler(parser_pool=parser_pool)
+            pe_file_data = await pe_file_handler.execute(streaming_body)
+
+        assert pe_file_data.file_type == "dll"
+        assert pe_file_data.arch == "x64"
+        assert pe_file_data.num_imports == 7
+        assert pe_file_data.num_exports == 6
+
+    @pytest.mark.asyncio
+    async def test_execute_with_parser_pool_and_invalid_data(self):
+        file_content = b"invalid"
+        streaming_body = StreamingBody(io.BytesIO(file_content), len(file_content))
+
+        with ProcessPoolExecutor(max_workers=1) as parser_pool:
+            pe_file_handler = PeFileHandler(parser_pool=parser_pool)
+            with pytest.raises(ExtractingFileError):
+                await pe_file_handler.execute(streaming_body)
+
+    @pytest.mark.parametrize("spill_threshold", [1, 64 * 1024, 10 * 1024 * 1024])
+    @pytest.mark.asyncio
+    async def test_execute_spills_large_files(self, tmp_path, spill_threshold):
+        with open(
+            "/app/tests/fixtures/01nCLd7AG7XAlI0JH9G2E3rFbuahjIaD.dll", "rb"
+        ) as file:
+            file_content = file.read()
+        streaming_body = StreamingBody(io.BytesIO(file_content), len(file_content))
+        pe_file_handler = PeFileHandler(
+            spill_threshold=spill_threshold,
+            spill_dir=str(tmp_path),
+            chunk_size=16 * 1024,
+        )
+
+        pe_file_data = await pe_file_handler.execute(streaming_body)
+
+        assert pe_file_data.file_type == "dll"
+        assert pe_file_data.arch == "x64"
+        assert pe_file_data.num_imports == 7
+        assert pe_file_data.num_exports == 6
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_execute_with_parser_pool_and_spilled_invalid_data(self, tmp_path):
+        file_content = b"invalid" * 1024
+        streaming_body = StreamingBody(io.BytesIO(file_content), len(file_content))
+
+        with ProcessPoolExecutor(max_workers=1) as parser_pool:
+            pe_file_handler = PeFileHandler(
+                parser_pool=parser_pool,
+                spill_threshold=1024,
+                spill_dir=str(tmp_path),
+                chunk_size=512,
+            )
+            with pytest.raises(ExtractingFileError):
+                await pe_file_handler.execute(streaming_body)
+
+        assert list(tmp_path.iterdir()) == []
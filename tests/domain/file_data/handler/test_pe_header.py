@@ -0,0 +1,89 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from domain.file_data.exception.pe_file import ExtractingFileError
+from domain.file_data.exception.storage import StorageThrottledError
+from domain.file_data.handler.pe_file import PeFileHandler
+from domain.file_data.handler.pe_header import PeHeaderFileHandler, SparseFileImage
+from domain.file_data.model.file_range import FileRange
+
+
+class InMemoryStorageService:
+    def __init__(self, content: bytes):
+        self.content = content
+        self.bytes_read = 0
+
+    async def get_range_by_key(self, file_key: str, start: int, end: int) -> FileRange:
+        data = self.content[start : end + 1]
+        self.bytes_read += len(data)
+        return FileRange(data=data, start=start, total_size=len(self.content))
+
+
+class TestPeHeaderFileHandler:
+    @pytest.mark.parametrize(
+        "pe_file",
+        [
+            "/app/tests/fixtures/01nCLd7AG7XAlI0JH9G2E3rFbuahjIaD.dll",
+            "/app/tests/fixtures/4NJVWj81OrKmou0ndXnK5jdJgA09eQwQ.exe",
+        ],
+    )
+    @pytest.mark.asyncio
+    async def test_execute_matches_full_parse(self, pe_file):
+        with open(pe_file, "rb") as file:
+            file_content = file.read()
+        storage_service = InMemoryStorageService(file_content)
+        pe_header_handler = PeHeaderFileHandler(storage_service=storage_service)
+
+        pe_file_data = await pe_header_handler.execute(file_key=pe_file)
+
+        assert pe_file_data == PeFileHandler.parse(file_content)
+        assert storage_service.bytes_read < len(file_content) // 4
+
+    @pytest.mark.asyncio
+    async def test_execute_with_invalid_data(self):
+        storage_service = InMemoryStorageService(b"invalid")
+        pe_header_handler = PeHeaderFileHandler(storage_service=storage_service)
+
+        with pytest.raises(ExtractingFileError):
+            await pe_header_handler.execute(file_key="invalid")
+
+    @pytest.mark.asyncio
+    async def test_execute_over_budget(self):
+        with open(
+            "/app/tests/fixtures/01nCLd7AG7XAlI0JH9G2E3rFbuahjIaD.dll", "rb"
+        ) as file:
+            file_content = file.read()
+        storage_service = InMemoryStorageService(file_content)
+        pe_header_handler = PeHeaderFileHandler(
+            storage_service=storage_service, max_bytes=8_192
+        )
+
+        with pytest.raises(ExtractingFileError):
+            await pe_header_handler.execute(file_key="dll")
+
+    @pytest.mark.asyncio
+    async def test_execute_when_throttled(self):
+        storage_service = AsyncMock()
+        storage_service.get_range_by_key.side_effect = StorageThrottledError("SlowDown")
+        pe_header_handler = PeHeaderFileHandler(storage_service=storage_service)
+
+        with pytest.raises(ExtractingFileError) as error:
+            await pe_header_handler.execute(file_key="throttled")
+
+        assert error.value.cause == "StorageThrottledError"
+
+
+class TestSparseFileImage:
+    def test_records_only_unfetched_ranges(self):
+        image = SparseFileImage(size=100)
+        image.write(10, b"a" * 10)
+        image.write(30, b"b" * 10)
+
+        assert image[12:18] == b"a" * 6
+        assert image.missing == []
+
+        image[0:50]
+
+        assert image.missing == [(0, 10), (20, 30), (40, 50)]
+        image.close()
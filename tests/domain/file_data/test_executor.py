@@ -0,0 +1,210 @@
+from datetime import datetime, timezone
+from typing import Iterable
+from unittest.mock import AsyncMock, Mock
+
+import pyarrow as pa
+import pytest
+from pyspark import Row
+
+from common.settings import WorkerSettings
+from domain.file_data import executor
+from domain.file_data.executor import (
+    ExecutorContainer,
+    get_executor_container,
+    process_record_batches,
+    write_partition,
+)
+from domain.file_data.file_processor import FileProcessor
+from domain.file_data.model.extracted_file import ExtractedFile
+from domain.file_data.model.pe_file_data import PeFileData
+
+
+@pytest.fixture
+def settings() -> WorkerSettings:
+    return WorkerSettings(
+        PGSQL_SERVER="localhost",
+        PGSQL_USER="user",
+        PGSQL_PASSWORD="password",
+        PGSQL_DATABASE="metadata",
+        PGSQL_PORT=5432,
+        AWS_BUCKET_NAME="bucket",
+        SPARK_MASTER_URL="local",
+        EXTRACT_CONCURRENCY=8,
+        EXTRACT_HEADERS_ONLY=True,
+        EXTRACT_RESULT_BATCH_SIZE=2,
+    )
+
+
+class TestExecutorContainer:
+    def test_services_share_pools(self, settings: WorkerSettings):
+        container = ExecutorContainer(settings)
+
+        assert container.max_pool_connections == 8
+        assert container.io_pool._max_workers == 8
+        assert container.file_processor is container.file_processor
+        assert container.pe_header_handler._storage_service is (
+            container.storage_service
+        )
+        assert container.parser_pool is None
+        assert container.storage_service._pool is container.io_pool
+
+        container.close()
+
+    def test_get_executor_container_is_created_once(
+        self, settings: WorkerSettings, monkeypatch: pytest.MonkeyPatch
+    ):
+        monkeypatch.setattr(executor, "_executor_container", None)
+        monkeypatch.setattr(executor, "WorkerSettings", Mock(return_value=settings))
+
+        container = get_executor_container()
+
+        assert get_executor_container() is container
+        executor.WorkerSettings.assert_called_once()
+        container.close()
+
+    def test_write_partition_streams_rows_to_repository(
+        self, settings: WorkerSettings, monkeypatch: pytest.MonkeyPatch
+    ):
+        written: list[list[str]] = []
+
+        async def upsert_many(files: Iterable[ExtractedFile]) -> None:
+            written.append([file.name for file in files])
+
+        container = ExecutorContainer(settings)
+        container.extracted_file_repository = Mock(upsert_many=upsert_many)
+        monkeypatch.setattr(executor, "_executor_container", container)
+        rows = [
+            Row(
+                name=f"name{i}",
+                hash=f"hash{i}",
+                size=i,
+                architecture="x64",
+                num_imports=1,
+                num_exports=0,
+                type="dll",
+                status="EXTRACTED",
+                malicious=False,
+                created_at=datetime.now(timezone.utc),
+            )
+            for i in range(5)
+        ]
+
+        write_partition(iter(rows))
+
+        assert written == [[f"name{i}" for i in range(5)]]
+        container.close()
+
+    def test_process_record_batches_emits_result_batches(
+        self, settings: WorkerSettings, monkeypatch: pytest.MonkeyPatch
+    ):
+        container = ExecutorContainer(settings)
+        container.file_processor = FileProcessor(
+            s3_file_service=Mock(get_streaming_body_by_key=AsyncMock()),
+            pe_file_handler=Mock(
+                execute=AsyncMock(
+                    return_value=PeFileData(
+                        file_type="dll", arch="x64", num_imports=1, num_exports=2
+                    )
+                )
+            ),
+            concurrency=1,
+        )
+        monkeypatch.setattr(executor, "_executor_container", container)
+        schema = pa.schema(
+            [
+                ("name", pa.string()),
+                ("hash", pa.string()),
+                ("architecture", pa.string()),
+                ("num_imports", pa.int32()),
+                ("status", pa.string()),
+                ("malicious", pa.bool_()),
+            ]
+        )
+        batches = [
+            pa.RecordBatch.from_pylist(
+                [
+                    {
+                        "name": f"name{i}",
+                        "hash": f"hash{i}",
+                        "size": i,
+                        "malicious": True,
+                    }
+                    for i in range(start, stop)
+                ]
+            )
+            for start, stop in ((0, 1), (1, 3))
+        ]
+
+        results = list(process_record_batches(schema, iter(batches)))
+
+        assert [batch.schema for batch in results] == [schema, schema]
+        assert [batch.to_pylist() for batch in results] == [
+            [
+                {
+                    "name": f"name{i}",
+                    "hash": f"hash{i}",
+                    "architecture": "x64",
+                    "num_imports": 1,
+                    "status": "EXTRACTED",
+                    "malicious": True,
+                }
+                for i in indexes
+            ]
+            for indexes in ((0, 1), (2,))
+        ]
+        container.close()
+
+    def test_process_record_batches_fans_out_duplicate_hashes(
+        self, settings: WorkerSettings, monkeypatch: pytest.MonkeyPatch
+    ):
+        container = ExecutorContainer(settings)
+        pe_file_handler = Mock(
+            execute=AsyncMock(
+                return_value=PeFileData(
+                    file_type="dll", arch="x64", num_imports=1, num_exports=2
+                )
+            )
+        )
+        container.file_processor = FileProcessor(
+            s3_file_service=Mock(get_streaming_body_by_key=AsyncMock()),
+            pe_file_handler=pe_file_handler,
+        )
+        monkeypatch.setattr(executor, "_executor_container", container)
+        schema = pa.schema(
+            [
+                ("name", pa.string()),
+                ("hash", pa.string()),
+                ("status", pa.string()),
+                ("malicious", pa.bool_()),
+            ]
+        )
+        files = [
+            ("name0", "hashA", False),
+            ("name1", "hashA", True),
+            ("name3", "hashA", True),
+            ("name2", "hashB", False),
+        ]
+        batches = [
+            pa.RecordBatch.from_pylist(
+                [
+                    {"name": name, "hash": hash, "size": 1, "malicious": malicious}
+                    for name, hash, malicious in files[start:stop]
+                ]
+            )
+            for start, stop in ((0, 1), (1, 4))
+        ]
+
+        results = list(process_record_batches(schema, iter(batches)))
+
+        assert sorted(
+            (record["name"], record["hash"], record["status"], record["malicious"])
+            for batch in results
+            for record in batch.to_pylist()
+        ) == [
+            ("name0", "hashA", "EXTRACTED", False),
+            ("name1", "hashA", "EXTRACTED", True),
+            ("name2", "hashB", "EXTRACTED", False),
+            ("name3", "hashA", "EXTRACTED", True),
+        ]
+        assert pe_file_handler.execute.await_count == 2
+        container.close()
@@ -0,0 +1,442 @@
+import asyncio
+from typing import Iterator
+from unittest.mock import AsyncMock, Mock
+
+import pyarrow as pa
+import pytest
+from pyspark.sql import Row
+
+from common.concurrency import AdaptiveConcurrencyLimiter
+from domain.file_data.exception.pe_file import ExtractingFileError
+from domain.file_data.exception.storage import StorageThrottledError
+from domain.file_data.file_processor import FileProcessor
+from domain.file_data.model.extraction_cache import (
+    ExtractionCacheClaim,
+    ExtractionCacheEntry,
+)
+from domain.file_data.model.pe_file_data import PeFileData
+
+
+def make_file_rows(count: int) -> list[Row]:
+    return [
+        Row(name=f"name{i}", hash=f"hash{i}", size=i, malicious=False)
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def pe_file_handler() -> Mock:
+    handler = Mock()
+    handler.execute = AsyncMock(
+        return_value=PeFileData(
+            file_type="dll", arch="x64", num_imports=1, num_exports=2
+        )
+    )
+    return handler
+
+
+class TestFileProcessor:
+    def test_stream_never_exceeds_concurrency(self, pe_file_handler: Mock):
+        # Given
+        in_flight = 0
+        max_in_flight = 0
+
+        async def get_streaming_body_by_key(file_key: str) -> Mock:
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            return Mock()
+
+        s3_file_service = Mock()
+        s3_file_service.get_streaming_body_by_key = get_streaming_body_by_key
+        processor = FileProcessor(
+            s3_file_service=s3_file_service,
+            pe_file_handler=pe_file_handler,
+            concurrency=3,
+        )
+
+        # When
+        results = list(processor.stream(make_file_rows(20)))
+
+        # Then
+        assert len(results) == 20
+        assert max_in_flight == 3
+        assert {row.name for row in results} == {f"name{i}" for i in range(20)}
+        assert all(row.status == "EXTRACTED" for row in results)
+
+    def test_stream_consumes_partition_lazily(self, pe_file_handler: Mock):
+        # Given
+        consumed = 0
+
+        def partition() -> Iterator[Row]:
+            nonlocal consumed
+            for row in make_file_rows(100):
+                consumed += 1
+                yield row
+
+        s3_file_service = Mock()
+        s3_file_service.get_streaming_body_by_key = AsyncMock(return_value=Mock())
+        processor = FileProcessor(
+            s3_file_service=s3_file_service,
+            pe_file_handler=pe_file_handler,
+            concurrency=4,
+        )
+
+        # When
+        results = processor.stream(partition())
+        first = next(results)
+
+        # Then
+        assert first.status == "EXTRACTED"
+        assert consumed == 4
+        results.close()
+
+    def test_stream_uses_cached_extraction_without_download(
+        self, pe_file_handler: Mock
+    ):
+        # Given
+        extraction_cache = Mock()
+        extraction_cache.claim = AsyncMock(
+            return_value=ExtractionCacheClaim(
+                claimed=False,
+                entry=ExtractionCacheEntry(
+                    hash="hash0",
+                    status="EXTRACTED",
+                    architecture="x32",
+                    num_imports=5,
+                    num_exports=0,
+                    type="exe",
+                ),
+            )
+        )
+        extraction_cache.store = AsyncMock()
+        s3_file_service = Mock()
+        s3_file_service.get_streaming_body_by_key = AsyncMock()
+        processor = FileProcessor(
+            s3_file_service=s3_file_service,
+            pe_file_handler=pe_file_handler,
+            extraction_cache=extraction_cache,
+        )
+
+        # When
+        results = processor.execute(make_file_rows(1))
+
+        # Then
+        assert results[0].name == "name0"
+        assert results[0].architecture == "x32"
+        assert results[0].num_imports == 5
+        s3_file_service.get_streaming_body_by_key.assert_not_called()
+        extraction_cache.store.assert_not_called()
+
+    def test_stream_stores_claimed_extraction(self, pe_file_handler: Mock):
+        # Given
+        extraction_cache = Mock()
+        extraction_cache.claim = AsyncMock(
+            return_value=ExtractionCacheClaim(claimed=True)
+        )
+        extraction_cache.store = AsyncMock()
+        s3_file_service = Mock()
+        s3_file_service.get_streaming_body_by_key = AsyncMock(return_value=Mock())
+        processor = FileProcessor(
+            s3_file_service=s3_file_service,
+            pe_file_handler=pe_file_handler,
+            extraction_cache=extraction_cache,
+        )
+
+        # When
+        results = processor.execute(make_file_rows(1))
+
+        # Then
+        assert results[0].status == "EXTRACTED"
+        extraction_cache.store.assert_awaited_once_with(
+            entry=ExtractionCacheEntry(
+                hash="hash0",
+                status="EXTRACTED",
+                architecture="x64",
+                num_imports=1,
+                num_exports=2,
+                type="dll",
+            )
+        )
+
+    def test_stream_releases_claim_on_transient_error(self, pe_file_handler: Mock):
+        # Given
+        extraction_cache = Mock()
+        extraction_cache.claim = AsyncMock(
+            return_value=ExtractionCacheClaim(claimed=True)
+        )
+        extraction_cache.store = AsyncMock()
+        extraction_cache.release = AsyncMock()
+        s3_file_service = Mock()
+        s3_file_service.get_streaming_body_by_key = AsyncMock(return_value=Mock())
+        pe_file_handler.execute.side_effect = ExtractingFileError(
+            "Connection reset", cause="ReadTimeoutError", transient=True
+        )
+        processor = FileProcessor(
+            s3_file_service=s3_file_service,
+            pe_file_handler=pe_file_handler,
+            extraction_cache=extraction_cache,
+        )
+
+        # When
+        results = processor.execute(make_file_rows(1))
+
+        # Then
+        assert results[0].status == "ERROR"
+        extraction_cache.store.assert_not_called()
+        extraction_cache.release.assert_awaited_once_with(hash="hash0")
+
+    def test_stream_releases_claim_when_download_fails(self, pe_file_handler: Mock):
+        # Given
+        extraction_cache = Mock()
+        extraction_cache.claim = AsyncMock(
+            return_value=ExtractionCacheClaim(claimed=True)
+        )
+        extraction_cache.store = AsyncMock()
+        extraction_cache.release = AsyncMock()
+        s3_file_service = Mock()
+        s3_file_service.get_streaming_body_by_key = AsyncMock(
+            side_effect=KeyError("name0")
+        )
+        processor = FileProcessor(
+            s3_file_service=s3_file_service,
+            pe_file_handler=pe_file_handler,
+            extraction_cache=extraction_cache,
+        )
+
+        # When
+        results = processor.execute(make_file_rows(1))
+
+        # Then
+        assert results[0].status == "ERROR"
+        extraction_cache.store.assert_not_called()
+        extraction_cache.release.assert_awaited_once_with(hash="hash0")
+
+    def test_stream_releases_claims_of_cancelled_extractions(
+        self, pe_file_handler: Mock
+    ):
+        # Given
+        extraction_cache = Mock()
+        extraction_cache.claim = AsyncMock(
+            return_value=ExtractionCacheClaim(claimed=True)
+        )
+        extraction_cache.store = AsyncMock()
+        extraction_cache.release = AsyncMock()
+
+        async def get_streaming_body_by_key(file_key: str) -> Mock:
+            if file_key == "name1":
+                await asyncio.Event().wait()
+            return Mock()
+
+        s3_file_service = Mock()
+        s3_file_service.get_streaming_body_by_key = get_streaming_body_by_key
+        processor = FileProcessor(
+            s3_file_service=s3_file_service,
+            pe_file_handler=pe_file_handler,
+            concurrency=2,
+            extraction_cache=extraction_cache,
+        )
+
+        # When
+        results = processor.stream(make_file_rows(2))
+        first = next(results)
+        results.close()
+
+        # Then
+        assert first.name == "name0"
+        assert extraction_cache.store.await_count == 1
+        extraction_cache.release.assert_awaited_once_with(hash="hash1")
+
+    def test_stream_waits_for_extraction_claimed_elsewhere(self, pe_file_handler: Mock):
+        # Given
+        entry = ExtractionCacheEntry(hash="hash0", status="ERROR")
+        extraction_cache = Mock()
+        extraction_cache.claim = AsyncMock(
+            side_effect=[
+                ExtractionCacheClaim(claimed=False),
+                ExtractionCacheClaim(claimed=False),
+                ExtractionCacheClaim(claimed=False, entry=entry),
+            ]
+        )
+        s3_file_service = Mock()
+        s3_file_service.get_streaming_body_by_key = AsyncMock()
+        processor = FileProcessor(
+            s3_file_service=s3_file_service,
+            pe_file_handler=pe_file_handler,
+            extraction_cache=extraction_cache,
+            cache_poll_interval=0,
+        )
+
+        # When
+        results = processor.execute(make_file_rows(1))
+
+        # Then
+        assert results[0].status == "ERROR"
+        assert extraction_cache.claim.await_count == 3
+        s3_file_service.get_streaming_body_by_key.assert_not_called()
+
+    def test_stream_batches_fills_columnar_batches(self, pe_file_handler: Mock):
+        # Given
+        pe_file_handler.execute = AsyncMock(
+            side_effect=[
+                PeFileData(file_type="dll", arch="x64", num_imports=1, num_exports=2),
+                ExtractingFileError("Invalid PE file", cause="PEFormatError"),
+                PeFileData(file_type="exe", arch="x64", num_imports=3, num_exports=0),
+            ]
+        )
+        s3_file_service = Mock()
+        s3_file_service.get_streaming_body_by_key = AsyncMock(return_value=Mock())
+        processor = FileProcessor(
+            s3_file_service=s3_file_service,
+            pe_file_handler=pe_file_handler,
+            concurrency=1,
+        )
+        schema = pa.schema(
+            [
+                ("name", pa.string()),
+                ("size", pa.int32()),
+                ("architecture", pa.dictionary(pa.int32(), pa.string())),
+                ("num_imports", pa.int32()),
+                ("type", pa.string()),
+                ("status", pa.string()),
+                ("created_at", pa.timestamp("us", tz="UTC")),
+            ]
+        )
+
+        # When
+        batches = list(processor.stream_batches(make_file_rows(3), batch_size=2))
+
+        # Then
+        assert [len(batch) for batch in batches] == [2, 1]
+        records = pa.Table.from_batches(
+            [batch.to_arrow(schema) for batch in batches]
+        ).to_pylist()
+        assert [
+            (
+                record["name"],
+                record["size"],
+                record["architecture"],
+                record["num_imports"],
+                record["type"],
+                record["status"],
+            )
+            for record in records
+        ] == [
+            ("name0", 0, "x64", 1, "dll", "EXTRACTED"),
+            ("name1", 1, None, None, None, "ERROR"),
+            ("name2", 2, "x64", 3, "exe", "EXTRACTED"),
+        ]
+        assert all(record["created_at"] is not None for record in records)
+
+    def test_stream_retries_throttled_downloads_with_smaller_window(
+        self, pe_file_handler: Mock
+    ):
+        # Given
+        in_flight = 0
+        max_in_flight = 0
+        throttled = {"name0"}
+
+        async def get_streaming_body_by_key(file_key: str) -> Mock:
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            if file_key in throttled:
+                throttled.remove(file_key)
+                raise StorageThrottledError("SlowDown")
+            return Mock()
+
+        s3_file_service = Mock()
+        s3_file_service.get_streaming_body_by_key = get_streaming_body_by_key
+        pe_file_handler.saturated = False
+        limiter = AdaptiveConcurrencyLimiter(
+            name="test", min_limit=2, max_limit=2, backoff=0.5
+        )
+        processor = FileProcessor(
+            s3_file_service=s3_file_service,
+            pe_file_handler=pe_file_handler,
+            concurrency=8,
+            concurrency_limiter=limiter,
+            throttle_backoff=0,
+        )
+
+        # When
+        results = processor.execute(make_file_rows(10))
+
+        # Then
+        assert len(results) == 10
+        assert all(row.status == "EXTRACTED" for row in results)
+        assert max_in_flight == 2
+        assert pe_file_handler.execute.await_count == 10
+
+    def test_stream_retries_throttled_downloads_without_limiter(
+        self, pe_file_handler: Mock
+    ):
+        # Given
+        s3_file_service = Mock()
+        s3_file_service.get_streaming_body_by_key = AsyncMock(
+            side_effect=[StorageThrottledError("SlowDown"), Mock()]
+        )
+        processor = FileProcessor(
+            s3_file_service=s3_file_service,
+            pe_file_handler=pe_file_handler,
+            throttle_backoff=0,
+        )
+
+        # When
+        results = processor.execute(make_file_rows(1))
+
+        # Then
+        assert [row.status for row in results] == ["EXTRACTED"]
+        assert s3_file_service.get_streaming_body_by_key.await_count == 2
+
+    def test_stream_reports_error_when_throttling_persists(self, pe_file_handler: Mock):
+        # Given
+        async def get_streaming_body_by_key(file_key: str) -> Mock:
+            if file_key == "name0":
+                raise StorageThrottledError("SlowDown")
+            return Mock()
+
+        s3_file_service = Mock()
+        s3_file_service.get_streaming_body_by_key = get_streaming_body_by_key
+        limiter = Mock(limit=4)
+        processor = FileProcessor(
+            s3_file_service=s3_file_service,
+            pe_file_handler=pe_file_handler,
+            concurrency_limiter=limiter,
+            throttle_retries=2,
+            throttle_backoff=0,
+        )
+
+        # When
+        results = processor.execute(make_file_rows(2))
+
+        # Then
+        assert sorted((row.name, row.status) for row in results) == [
+            ("name0", "ERROR"),
+            ("name1", "EXTRACTED"),
+        ]
+        assert limiter.on_throttle.call_count == 3
+
+    def test_stream_backs_off_when_parser_is_saturated(self, pe_file_handler: Mock):
+        # Given
+        s3_file_service = Mock()
+        s3_file_service.get_streaming_body_by_key = AsyncMock(return_value=Mock())
+        pe_file_handler.saturated = True
+        limiter = Mock(limit=4)
+        processor = FileProcessor(
+            s3_file_service=s3_file_service,
+            pe_file_handler=pe_file_handler,
+            concurrency_limiter=limiter,
+        )
+
+        # When
+        processor.execute(make_file_rows(3))
+
+        # Then
+        assert limiter.on_success.call_count == 3
+        assert limiter.on_overload.call_count == 3
+        limiter.on_throttle.assert_not_called()
@@ -0,0 +1,44 @@
+from domain.file_data.partitioner import SizeBalancedPartitioner
+
+
+class TestSizeBalancedPartitioner:
+    def test_assign_balances_bytes_per_partition(self):
+        # Given
+        sizes = [("a", 90), ("b", 60), ("c", 50), ("d", 40), ("e", 30), ("f", 30)]
+
+        # When
+        assignment, num_partitions = SizeBalancedPartitioner(num_partitions=2).assign(
+            sizes
+        )
+
+        # Then
+        assert num_partitions == 2
+        totals = [0, 0]
+        for key, size in sizes:
+            totals[assignment[key]] += size
+        assert max(totals) - min(totals) <= 30
+
+    def test_assign_balances_file_count_with_file_cost(self):
+        # Given
+        sizes = [("large", 100), *[(f"small{i}", 1) for i in range(6)]]
+
+        # When
+        assignment, _ = SizeBalancedPartitioner(
+            num_partitions=2, file_cost_bytes=20
+        ).assign(sizes)
+
+        # Then
+        assert [key for key, index in assignment.items() if index == 0] == ["large"]
+
+    def test_assign_isolates_files_above_threshold(self):
+        # Given
+        sizes = [("a", 1_000), ("b", 10), ("c", 2_000), ("d", 20)]
+
+        # When
+        assignment, num_partitions = SizeBalancedPartitioner(
+            num_partitions=1, isolate_bytes=1_000
+        ).assign(sizes)
+
+        # Then
+        assert num_partitions == 3
+        assert assignment == {"a": 1, "c": 2, "b": 0, "d": 0}
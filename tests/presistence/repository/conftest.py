@@ -0,0 +1,28 @@
+import os
+from typing import AsyncIterator
+
+import pytest
+import pytest_asyncio
+
+from common.pgsql import PgsqlSettings, PSQLDatabase
+
+
+@pytest_asyncio.fixture
+async def psql_database() -> AsyncIterator[PSQLDatabase]:
+    if "PGSQL_SERVER" not in os.environ:
+        pytest.skip("PGSQL_SERVER is not set")
+
+    psql_database = PSQLDatabase(
+        PgsqlSettings(
+            host=os.environ["PGSQL_SERVER"],
+            port=int(os.environ["PGSQL_PORT"]),
+            database=os.environ["PGSQL_DATABASE"],
+            user=os.environ["PGSQL_USER"],
+            password=os.environ["PGSQL_PASSWORD"],
+            pool_min_size=1,
+            pool_max_size=2,
+        )
+    )
+    await psql_database.initialize()
+    yield psql_database
+    await psql_database.pool.close()
@@ -0,0 +1,63 @@
+from typing import AsyncIterator
+
+import pytest
+import pytest_asyncio
+
+from common.pgsql import PSQLDatabase
+from presistence.repository.extract_candidate import PgSqlExtractCandidateRepository
+
+
+SOURCE_TABLE = "test_candidate_storage_file_metadata"
+TARGET_TABLE = "test_candidate_extracted_file_metadata"
+
+
+@pytest_asyncio.fixture
+async def database(psql_database: PSQLDatabase) -> AsyncIterator[PSQLDatabase]:
+    async with psql_database.pool.acquire() as connection:
+        await connection.execute(
+            f"""
+            DROP TABLE IF EXISTS {SOURCE_TABLE}, {TARGET_TABLE};
+            CREATE TABLE {SOURCE_TABLE} (
+                id SERIAL PRIMARY KEY,
+                name TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                size INT NOT NULL,
+                malicious BOOLEAN NOT NULL
+            );
+            CREATE TABLE {TARGET_TABLE} (
+                id SERIAL PRIMARY KEY,
+                name TEXT NOT NULL,
+                hash TEXT NOT NULL
+            );
+            INSERT INTO {SOURCE_TABLE} (name, hash, size, malicious)
+            SELECT 'name' || i, 'hash' || i, i, i % 3 = 0
+            FROM generate_series(1, 9) AS i;
+            INSERT INTO {TARGET_TABLE} (name, hash) VALUES ('name1', 'hash1');
+            """
+        )
+
+    yield psql_database
+
+    async with psql_database.pool.acquire() as connection:
+        await connection.execute(f"DROP TABLE IF EXISTS {SOURCE_TABLE}, {TARGET_TABLE}")
+
+
+class TestPgSqlExtractCandidateRepository:
+    @pytest.mark.asyncio
+    async def test_get_unprocessed_many_fills_each_class_quota(
+        self, database: PSQLDatabase
+    ):
+        repository = PgSqlExtractCandidateRepository(
+            source_table=SOURCE_TABLE,
+            target_table=TARGET_TABLE,
+            psql_database=database,
+        )
+
+        files = await repository.get_unprocessed_many(quotas={False: 3, True: 1})
+
+        assert sorted((file.name, file.malicious) for file in files) == [
+            ("name2", False),
+            ("name3", True),
+            ("name4", False),
+            ("name5", False),
+        ]
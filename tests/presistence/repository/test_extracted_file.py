@@ -0,0 +1,96 @@
+import datetime
+from typing import AsyncIterator, Iterator
+
+import pytest
+import pytest_asyncio
+
+from common.metrics import metrics
+from common.pgsql import PSQLDatabase
+from domain.file_data.model.extracted_file import ExtractedFile
+from presistence.repository.extracted_file import PgSqlExtractedFileRepository
+
+
+TABLE = "test_extracted_file_metadata"
+CREATED_AT = datetime.datetime(2023, 12, 1, tzinfo=datetime.timezone.utc)
+
+
+def make_file(name: str, status: str = "EXTRACTED") -> ExtractedFile:
+    return ExtractedFile(
+        name=name,
+        hash="hash",
+        size=1,
+        architecture="x64",
+        num_imports=1,
+        num_exports=0,
+        type="dll",
+        status=status,
+        malicious=False,
+        created_at=CREATED_AT,
+    )
+
+
+@pytest_asyncio.fixture
+async def database(psql_database: PSQLDatabase) -> AsyncIterator[PSQLDatabase]:
+    async with psql_database.pool.acquire() as connection:
+        await connection.execute(
+            f"""
+            DROP TABLE IF EXISTS {TABLE};
+            CREATE TABLE {TABLE} (
+                id SERIAL PRIMARY KEY,
+                name TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                size INT NOT NULL,
+                architecture TEXT,
+                num_imports INT,
+                num_exports INT,
+                status TEXT NOT NULL,
+                malicious BOOLEAN NOT NULL,
+                type TEXT,
+                created_at TIMESTAMP WITH TIME ZONE NOT NULL
+            );
+            CREATE UNIQUE INDEX {TABLE}_name_hash ON {TABLE} (name, hash);
+            """
+        )
+
+    yield psql_database
+
+    async with psql_database.pool.acquire() as connection:
+        await connection.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class TestPgSqlExtractedFileRepository:
+    @pytest.mark.asyncio
+    async def test_upsert_many_writes_iterable_in_batches(self, database: PSQLDatabase):
+        repository = PgSqlExtractedFileRepository(
+            table=TABLE, psql_database=database, batch_size=2
+        )
+        metrics.drain()
+
+        def files() -> Iterator[ExtractedFile]:
+            for name in ["0/a", "0/b", "0/c", "0/d", "0/e"]:
+                yield make_file(name)
+
+        await repository.upsert_many(files=files())
+        await repository.upsert_many(files=[make_file("0/d", status="ERROR")])
+
+        async with database.pool.acquire() as connection:
+            records = await connection.fetch(
+                f"SELECT name, status FROM {TABLE} ORDER BY name"
+            )
+        assert [(record["name"], record["status"]) for record in records] == [
+            ("0/a", "EXTRACTED"),
+            ("0/b", "EXTRACTED"),
+            ("0/c", "EXTRACTED"),
+            ("0/d", "ERROR"),
+            ("0/e", "EXTRACTED"),
+        ]
+        assert [
+            counter["value"]
+            for counter in metrics.snapshot()["counters"]
+            if counter["name"] == "db_upsert_rows_total"
+        ] == [6]
+        assert [
+            histogram["count"]
+            for histogram in metrics.snapshot()["histograms"]
+            if histogram["name"] == "db_upsert_batch_seconds"
+        ] == [4]
@@ -0,0 +1,174 @@
+import datetime
+from typing import AsyncIterator
+
+import pytest
+import pytest_asyncio
+
+from common.pgsql import PSQLDatabase
+from domain.file_data.model.file_sync_info import NotExtractedFile
+from presistence.repository.file import PgSqlFileRepository
+
+
+TABLE = "test_storage_file_metadata"
+QUEUE_TABLE = "test_extract_queue"
+
+
+def make_files(names: list[str], hash: str = "hash") -> list[NotExtractedFile]:
+    return [
+        NotExtractedFile(name=name, hash=hash, size=1, malicious=False)
+        for name in names
+    ]
+
+
+def sync_time(minutes: int = 0) -> datetime.datetime:
+    return datetime.datetime(
+        2023, 12, 1, tzinfo=datetime.timezone.utc
+    ) + datetime.timedelta(minutes=minutes)
+
+
+@pytest_asyncio.fixture
+async def database(psql_database: PSQLDatabase) -> AsyncIterator[PSQLDatabase]:
+    async with psql_database.pool.acquire() as connection:
+        await connection.execute(
+            f"""
+            DROP TABLE IF EXISTS {TABLE};
+            DROP TABLE IF EXISTS {QUEUE_TABLE};
+            CREATE TABLE {TABLE} (
+                id SERIAL PRIMARY KEY,
+                name TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                size INT NOT NULL,
+                malicious BOOLEAN NOT NULL,
+                sync_time TIMESTAMP WITH TIME ZONE NOT NULL
+            );
+            CREATE UNIQUE INDEX {TABLE}_name_hash ON {TABLE} (name, hash);
+            CREATE TABLE {QUEUE_TABLE} (
+                id BIGSERIAL PRIMARY KEY,
+                name TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                size INT NOT NULL,
+                malicious BOOLEAN NOT NULL,
+                claimed_at TIMESTAMP WITH TIME ZONE
+            );
+            CREATE UNIQUE INDEX {QUEUE_TABLE}_name_hash ON {QUEUE_TABLE} (name, hash);
+            """
+        )
+
+    yield psql_database
+
+    async with psql_database.pool.acquire() as connection:
+        await connection.execute(
+            f"DROP TABLE IF EXISTS {TABLE}; DROP TABLE IF EXISTS {QUEUE_TABLE};"
+        )
+
+
+async def fetch_synced(database: PSQLDatabase) -> list[tuple[str, datetime.datetime]]:
+    async with database.pool.acquire() as connection:
+        records = await connection.fetch(
+            f"SELECT name, sync_time FROM {TABLE} ORDER BY name"
+        )
+    return [(record["name"], record["sync_time"]) for record in records]
+
+
+async def fetch_queued(database: PSQLDatabase) -> list[tuple[str, str]]:
+    async with database.pool.acquire() as connection:
+        records = await connection.fetch(
+            f"SELECT name, hash FROM {QUEUE_TABLE} ORDER BY name, hash"
+        )
+    return [(record["name"], record["hash"]) for record in records]
+
+
+class TestPgSqlFileRepository:
+    @pytest.mark.asyncio
+    async def test_copy_upsert_merges_staged_batches(self, database: PSQLDatabase):
+        repository = PgSqlFileRepository(
+            table=TABLE, psql_database=database, upsert_method="copy", batch_size=2
+        )
+
+        await repository.upsert_many(
+            files=make_files(["0/a", "0/b", "0/b", "0/c"]), sync_time=sync_time()
+        )
+        await repository.upsert_many(
+            files=make_files(["0/c", "0/d"]), sync_time=sync_time(minutes=5)
+        )
+
+        assert await fetch_synced(database) == [
+            ("0/a", sync_time()),
+            ("0/b", sync_time()),
+            ("0/c", sync_time(minutes=5)),
+            ("0/d", sync_time(minutes=5)),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_copy_insert_new_keeps_existing_rows(self, database: PSQLDatabase):
+        repository = PgSqlFileRepository(
+            table=TABLE, psql_database=database, upsert_method="copy"
+        )
+
+        await repository.insert_new_many(
+            files=make_files(["0/a", "0/b"]), sync_time=sync_time()
+        )
+        await repository.insert_new_many(
+            files=make_files(["0/b", "0/c"]), sync_time=sync_time(minutes=5)
+        )
+
+        assert await fetch_synced(database) == [
+            ("0/a", sync_time()),
+            ("0/b", sync_time()),
+            ("0/c", sync_time(minutes=5)),
+        ]
+
+    @pytest.mark.parametrize("upsert_method", ["executemany", "copy"])
+    @pytest.mark.asyncio
+    async def test_upsert_publishes_only_inserted_rows(
+        self, database: PSQLDatabase, upsert_method: str
+    ):
+        repository = PgSqlFileRepository(
+            table=TABLE,
+            psql_database=database,
+            upsert_method=upsert_method,
+            queue_table=QUEUE_TABLE,
+        )
+
+        await repository.upsert_many(
+            files=make_files(["0/a", "0/b"]), sync_time=sync_time()
+        )
+        first_published = await fetch_queued(database)
+        async with database.pool.acquire() as connection:
+            await connection.execute(f"DELETE FROM {QUEUE_TABLE}")
+        await repository.upsert_many(
+            files=make_files(["0/b", "0/c"]) + make_files(["0/a"], hash="changed"),
+            sync_time=sync_time(minutes=5),
+        )
+
+        assert first_published == [("0/a", "hash"), ("0/b", "hash")]
+        assert await fetch_queued(database) == [("0/a", "changed"), ("0/c", "hash")]
+
+    @pytest.mark.asyncio
+    async def test_delete_missing_removes_unlisted_rows(self, database: PSQLDatabase):
+        repository = PgSqlFileRepository(
+            table=TABLE, psql_database=database, batch_size=2
+        )
+        await repository.upsert_many(
+            files=make_files(["0/a", "0/b", "0/c", "0/d", "0/e", "1/a"]),
+            sync_time=sync_time(),
+        )
+        await repository.upsert_many(
+            files=make_files(["0/f"]), sync_time=sync_time(minutes=10)
+        )
+
+        async def pages() -> AsyncIterator[list[NotExtractedFile]]:
+            yield make_files(["0/a"])
+            yield make_files(["0/d"])
+
+        deleted = await repository.delete_missing(
+            prefix="0/", pages=pages(), synced_before=sync_time(minutes=5)
+        )
+
+        assert deleted == 3
+        assert [name for name, _ in await fetch_synced(database)] == [
+            "0/a",
+            "0/d",
+            "0/f",
+            "1/a",
+        ]
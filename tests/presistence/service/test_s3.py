@@ -0,0 +1,151 @@
+from typing import AsyncIterator, Iterator
+from unittest.mock import AsyncMock, Mock
+
+import boto3
+import pytest
+import pytest_asyncio
+from botocore.exceptions import ClientError
+from moto.server import ThreadedMotoServer
+
+from domain.file_data.exception.storage import StorageThrottledError
+from domain.file_data.handler.pe_file import PeFileHandler
+from domain.file_data.service.file_storage_service import StorageServiceInterface
+from presistence.service.aio_s3 import AioS3FileService
+from presistence.service.s3 import S3FileService
+
+
+BUCKET_NAME = "files"
+PE_FILE = "/app/tests/fixtures/01nCLd7AG7XAlI0JH9G2E3rFbuahjIaD.dll"
+
+
+@pytest.fixture(scope="module")
+def endpoint_url() -> Iterator[str]:
+    server = ThreadedMotoServer(port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    endpoint_url = f"http://{host}:{port}"
+
+    client = boto3.client(
+        "s3",
+        endpoint_url=endpoint_url,
+        region_name="us-east-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+    )
+    client.create_bucket(Bucket=BUCKET_NAME)
+    with open(PE_FILE, "rb") as file:
+        client.put_object(
+            Bucket=BUCKET_NAME, Key="0/sample.dll", Body=file.read(), ACL="public-read"
+        )
+    for i in range(5):
+        client.put_object(
+            Bucket=BUCKET_NAME, Key=f"1/file{i}", Body=b"x" * i, ACL="public-read"
+        )
+
+    yield endpoint_url
+    server.stop()
+
+
+@pytest_asyncio.fixture(params=["boto3", "aiobotocore"])
+async def storage_service(
+    request: pytest.FixtureRequest, endpoint_url: str
+) -> AsyncIterator[StorageServiceInterface]:
+    service: StorageServiceInterface
+    if request.param == "aiobotocore":
+        service = AioS3FileService(bucket_name=BUCKET_NAME, endpoint_url=endpoint_url)
+    else:
+        service = S3FileService(bucket_name=BUCKET_NAME, endpoint_url=endpoint_url)
+    await service.initialize()
+    yield service
+    await service.close()
+
+
+class TestS3FileServices:
+    @pytest.mark.asyncio
+    async def test_paginate_by_prefix(self, storage_service: StorageServiceInterface):
+        pages = [
+            page
+            async for page in storage_service.paginate_by_prefix(
+                prefix="1/", malicious=True, page_size=2
+            )
+        ]
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        files = [file for page in pages for file in page]
+        assert [file.name for file in files] == [f"1/file{i}" for i in range(5)]
+        assert [file.size for file in files] == list(range(5))
+        assert all(file.malicious for file in files)
+
+    @pytest.mark.asyncio
+    async def test_paginate_by_prefix_within_key_range(
+        self, storage_service: StorageServiceInterface
+    ):
+        pages = [
+            page
+            async for page in storage_service.paginate_by_prefix(
+                prefix="1/",
+                malicious=True,
+                page_size=2,
+                start_after="1/file0",
+                end_at="1/file2",
+            )
+        ]
+
+        assert [file.name for page in pages for file in page] == [
+            "1/file1",
+            "1/file2",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_get_streaming_body_by_key(
+        self, storage_service: StorageServiceInterface
+    ):
+        streaming_body = await storage_service.get_streaming_body_by_key(
+            file_key="0/sample.dll"
+        )
+        pe_file_data = await PeFileHandler().execute(file_data=streaming_body)
+
+        assert pe_file_data.arch == "x64"
+        assert pe_file_data.num_imports == 7
+        assert pe_file_data.num_exports == 6
+
+    @pytest.mark.asyncio
+    async def test_get_range_by_key(self, storage_service: StorageServiceInterface):
+        with open(PE_FILE, "rb") as file:
+            file_content = file.read()
+
+        file_range = await storage_service.get_range_by_key(
+            file_key="0/sample.dll", start=64, end=127
+        )
+
+        assert file_range.start == 64
+        assert file_range.data == file_content[64:128]
+        assert file_range.total_size == len(file_content)
+
+    @pytest.mark.asyncio
+    async def test_throttled_get_object_raises_storage_throttled_error(
+        self, storage_service: StorageServiceInterface, monkeypatch: pytest.MonkeyPatch
+    ):
+        error = ClientError(
+            {
+                "Error": {"Code": "SlowDown", "Message": "Reduce your request rate."},
+                "ResponseMetadata": {"HTTPStatusCode": 503},
+            },
+            "GetObject",
+        )
+        get_object = (
+            AsyncMock(side_effect=error)
+            if isinstance(storage_service, AioS3FileService)
+            else Mock(side_effect=error)
+        )
+        monkeypatch.setattr(storage_service._client, "get_object", get_object)
+
+        with pytest.raises(StorageThrottledError):
+            await storage_service.get_streaming_body_by_key(file_key="0/sample.dll")
+
+    @pytest.mark.asyncio
+    async def test_missing_key_is_not_reported_as_throttling(
+        self, storage_service: StorageServiceInterface
+    ):
+        with pytest.raises(ClientError):
+            await storage_service.get_streaming_body_by_key(file_key="0/missing.dll")
@@ -0,0 +1,42 @@
+import pytest
+
+from common.settings import WorkerSettings
+from domain.file_data.processor_container import FileProcessorContainer
+from presistence.container import PersistentLayerContainer
+
+
+class Container(PersistentLayerContainer, FileProcessorContainer):
+    def __init__(self, settings: WorkerSettings):
+        self.settings = settings
+
+
+@pytest.fixture
+def settings() -> WorkerSettings:
+    return WorkerSettings(
+        PGSQL_SERVER="localhost",
+        PGSQL_USER="user",
+        PGSQL_PASSWORD="password",
+        PGSQL_DATABASE="metadata",
+        PGSQL_PORT=5432,
+        PGSQL_POOL_MAX_SIZE=4,
+        AWS_BUCKET_NAME="bucket",
+        SPARK_MASTER_URL="local",
+        EXTRACT_CONCURRENCY=64,
+    )
+
+
+class TestPersistentLayerContainer:
+    def test_storage_service_downloads_on_io_pool(self, settings: WorkerSettings):
+        container = Container(settings)
+
+        assert container.storage_service._pool is container.io_pool
+        assert container.io_pool._max_workers == 64
+        assert container.pe_file_handler._pool is container.io_pool
+
+        container.shutdown_pools()
+
+    def test_database_uses_pgsql_settings(self, settings: WorkerSettings):
+        container = Container(settings)
+
+        assert container.database.pgsql_settings is container.pgsql_settings
+        assert container.pgsql_settings.pool_max_size == 4
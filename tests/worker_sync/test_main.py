@@ -0,0 +1,113 @@
+import datetime
+from typing import AsyncGenerator, AsyncIterator, Optional
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from common.settings import WorkerSettings
+from domain.file_data.model.file_sync_info import NotExtractedFile
+from worker_sync.main import SyncWorker
+
+
+class RecordingStorageService:
+    def __init__(self, keys: list[str]):
+        self.keys = sorted(keys)
+        self.shards: list[tuple[str, Optional[str], Optional[str]]] = []
+        self.initialize = AsyncMock()
+        self.close = AsyncMock()
+
+    async def paginate_by_prefix(
+        self,
+        prefix: str,
+        malicious: bool,
+        page_size: int,
+        start_after: Optional[str] = None,
+        end_at: Optional[str] = None,
+    ) -> AsyncGenerator[list[NotExtractedFile], None]:
+        keys = [
+            key
+            for key in self.keys
+            if key.startswith(prefix)
+            and (start_after is None or key > start_after)
+            and (end_at is None or key <= end_at)
+        ]
+        if keys:
+            self.shards.append((prefix, start_after, end_at))
+            yield [
+                NotExtractedFile(name=key, hash=key, size=1, malicious=malicious)
+                for key in keys
+            ]
+
+
+class RecordingFileRepository:
+    def __init__(self) -> None:
+        self.upserted: list[str] = []
+        self.listed: dict[str, list[str]] = {}
+
+    async def upsert_many(
+        self, files: list[NotExtractedFile], sync_time: datetime.datetime
+    ) -> None:
+        self.upserted.extend(file.name for file in files)
+
+    async def delete_missing(
+        self,
+        prefix: str,
+        pages: AsyncIterator[list[NotExtractedFile]],
+        synced_before: datetime.datetime,
+    ) -> int:
+        self.listed[prefix] = [file.name async for page in pages for file in page]
+        return 0
+
+
+@pytest.fixture
+def settings() -> WorkerSettings:
+    return WorkerSettings(
+        PGSQL_SERVER="localhost",
+        PGSQL_USER="user",
+        PGSQL_PASSWORD="password",
+        PGSQL_DATABASE="database",
+        PGSQL_PORT=5432,
+        AWS_BUCKET_NAME="bucket",
+        SPARK_MASTER_URL="local",
+        SYNC_SHARD_ALPHABET="0123456789abcdef",
+        SYNC_SHARD_DEPTH=2,
+        SYNC_DETECT_DELETIONS=True,
+    )
+
+
+class TestSyncWorker:
+    @pytest.mark.asyncio
+    async def test_run_spreads_class_prefixes_over_shards(
+        self, settings: WorkerSettings
+    ):
+        # Given
+        keys = [
+            f"{prefix}{first}{second}"
+            for prefix in ("0/", "1/")
+            for first in "0123456789abcdef"
+            for second in "05af"
+        ]
+        storage_service = RecordingStorageService(keys)
+        file_repository = RecordingFileRepository()
+        worker = SyncWorker(settings)
+        worker.container.database = Mock(initialize=AsyncMock(), pool=AsyncMock())
+        worker.container.storage_service = storage_service
+        worker.container.file_repository = file_repository
+        worker.container.checkpoint_repository = None
+
+        # When
+        await worker.run()
+
+        # Then
+        assert sorted(file_repository.upserted) == keys
+        assert {
+            prefix: sorted(names) for prefix, names in file_repository.listed.items()
+        } == {
+            "0/": [key for key in keys if key.startswith("0/")],
+            "1/": [key for key in keys if key.startswith("1/")],
+        }
+        for prefix in ("0/", "1/"):
+            assert (
+                len({shard for shard in storage_service.shards if shard[0] == prefix})
+                == 64
+            )